@@ -0,0 +1,109 @@
+"""
+The brain's action protocol: schema, validation and plan parsing.
+
+A brain reply is either a single action or a short ordered plan:
+
+    {"action": "click", "selector": "#search"}
+    {"plan": [{"action": "type", "selector": "input[name=\\"q\\"]", "value": "Python"},
+              {"action": "click", "selector": "#search", "expect": {"selector": "#search"}},
+              {"action": "scroll"}]}
+
+Each step is validated against ACTION_SCHEMA. A step may carry an "expect"
+block of preconditions (url_contains, selector, text) that the surfer checks
+before running it; click/type steps also require their selector to be
+present and usable. The surfer runs the plan locally and only goes back to
+the brain when the plan is finished or a precondition fails.
+"""
+import os
+
+from utils.json_stream import iter_json
+
+MAX_PLAN_STEPS = int(os.getenv("MAX_PLAN_STEPS", "5"))
+
+# action -> {field: required?}; every field is a string
+ACTION_SCHEMA = {
+    "click": {"selector": True},
+    "type": {"selector": True, "value": True},
+    "navigate": {"url": True},
+    "scroll": {},
+    "done": {"reason": False},
+}
+EXPECT_FIELDS = ("url_contains", "selector", "text")
+
+
+class ActionValidationError(ValueError):
+    """The brain's reply isn't a valid action or plan."""
+
+
+def validate_action(step):
+    """
+    Checks one step against ACTION_SCHEMA and returns it normalised for
+    JobSurfer.execute_action: {"type": ..., <fields>, "expect": {...}}.
+    Raises ActionValidationError.
+    """
+    if not isinstance(step, dict):
+        raise ActionValidationError(f"step is not an object: {step!r}")
+    action_type = step.get("action") or step.get("type")
+    if action_type not in ACTION_SCHEMA:
+        raise ActionValidationError(f"unknown action {action_type!r}")
+
+    action = {"type": action_type}
+    for field, required in ACTION_SCHEMA[action_type].items():
+        value = step.get(field)
+        if value is None:
+            if required:
+                raise ActionValidationError(f"{action_type} needs a {field!r}")
+            continue
+        if not isinstance(value, str) or (required and not value.strip()):
+            raise ActionValidationError(f"{action_type}.{field} must be a non-empty string")
+        action[field] = value
+    if action_type == "navigate" and not action["url"].startswith(("http://", "https://")):
+        raise ActionValidationError(f"navigate url must be http(s): {action['url']!r}")
+
+    expect = step.get("expect") or {}
+    if not isinstance(expect, dict) or any(
+        key not in EXPECT_FIELDS or not isinstance(value, str) for key, value in expect.items()
+    ):
+        raise ActionValidationError(f"invalid expect block: {expect!r}")
+    if expect:
+        action["expect"] = expect
+    return action
+
+
+def validate_plan(value):
+    """Turns a parsed reply (single action, {"plan": [...]} or a bare list) into a list of actions."""
+    if isinstance(value, dict) and "plan" in value:
+        steps = value["plan"]
+    elif isinstance(value, list):
+        steps = value
+    else:
+        steps = [value]
+    if not isinstance(steps, list) or not steps:
+        raise ActionValidationError("plan must be a non-empty list")
+    if len(steps) > MAX_PLAN_STEPS:
+        raise ActionValidationError(f"plan has {len(steps)} steps (max {MAX_PLAN_STEPS})")
+
+    actions = [validate_action(step) for step in steps]
+    if any(a["type"] == "done" for a in actions[:-1]):
+        raise ActionValidationError("done may only be the last step of a plan")
+    return actions
+
+
+def parse_plan(reply):
+    """
+    Extracts and validates the plan in a raw brain reply (prose and code
+    fences allowed around it). Uses the first JSON value that is a valid
+    action or plan. Raises ActionValidationError if there is none.
+    """
+    error = ActionValidationError("no JSON action in reply")
+    for value in iter_json(reply or ""):
+        try:
+            return validate_plan(value)
+        except ActionValidationError as e:
+            error = e
+    raise error
+
+
+def describe_action(action):
+    target = action.get("selector") or action.get("url") or action.get("reason") or ""
+    return f"{action['type']} {target}".strip()
@@ -0,0 +1,21 @@
+"""
+WSGI entry point for the API on its own (XAPPLY_ROLE=api), next to an agent
+worker started with `XAPPLY_ROLE=worker python orchestrator.py`.
+
+    gunicorn -w 4 -k gthread --threads 16 -b 127.0.0.1:5000 api:app
+
+Threaded workers keep long-lived /state/stream connections from tying up
+a whole process. `python api.py` runs a single threaded process instead,
+e.g. on Windows where gunicorn isn't available.
+"""
+import os
+
+os.environ["XAPPLY_ROLE"] = "api"
+
+from database import init_db  # noqa: E402
+from orchestrator import app, run_api  # noqa: E402
+
+init_db()
+
+if __name__ == "__main__":
+    run_api()
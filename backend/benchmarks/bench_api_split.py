@@ -0,0 +1,147 @@
+"""
+Benchmark: API latency while agents are busy, one process vs split.
+
+Simulated agents (pure-Python CPU work plus a log line per step, the way
+observation building and screenshot encoding hold the GIL) run next to
+the API. The client runs in this process and measures /profile, /state and
+/jobs latency from outside, against:
+
+  all    - API threads and agents in one process (XAPPLY_ROLE=all)
+  split  - the API in one process, the agents in a worker process
+           (XAPPLY_ROLE=api + XAPPLY_ROLE=worker, state through SQLite)
+
+Runs against a throwaway database.
+
+Usage:
+    python benchmarks/bench_api_split.py [--requests 300] [--agents 3]
+"""
+import os
+import sys
+import time
+import json
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+
+import requests
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+PATHS = ("/profile", "/state", "/jobs")
+
+
+def fake_agent(orchestrator, agent_id, stop):
+    """CPU-bound steps, each ending in a state update like a real surf step."""
+    orchestrator._log_context.agent_id = agent_id
+    step = 0
+    while not stop.is_set():
+        sum(i * i for i in range(200_000))
+        step += 1
+        orchestrator.agent_state.update_agent(agent_id, status=f"Step {step}")
+        orchestrator.log_event(f"Executed step {step}")
+
+
+def serve(role, port, agents):
+    """Child process: runs the API, the fake agents, or both."""
+    os.environ["XAPPLY_ROLE"] = role
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    from werkzeug.serving import make_server
+    import orchestrator
+
+    orchestrator.init_db()
+    stop = threading.Event()
+    if role in ("all", "worker"):
+        if role == "worker":
+            orchestrator.StateMirror(orchestrator.db, orchestrator.state_stream, orchestrator.agent_state,
+                                     orchestrator.latest_frame, on_command=orchestrator.handle_command,
+                                     stats=orchestrator.worker_stats).start()
+        orchestrator.agent_state["active"] = True
+        for i in range(agents):
+            threading.Thread(target=fake_agent, args=(orchestrator, f"a{i}", stop), daemon=True).start()
+    if role in ("all", "api"):
+        make_server("127.0.0.1", port, orchestrator.app, threaded=True).serve_forever()
+    else:
+        stop.wait()
+
+
+def spawn(role, port, agents):
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", role,
+                             "--port", str(port), "--agents", str(agents)],
+                            stdout=subprocess.DEVNULL, env=os.environ.copy())
+
+
+def wait_ready(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url + "/profile", timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError("API did not start")
+
+
+def measure(url, n):
+    session = requests.Session()
+    results = {}
+    for path in PATHS:
+        latencies = []
+        for _ in range(n):
+            start = time.perf_counter()
+            resp = session.get(url + path, timeout=10)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert resp.status_code == 200, resp.text
+        latencies.sort()
+        results[path] = {
+            "p50": round(statistics.median(latencies), 2),
+            "p99": round(latencies[int(len(latencies) * 0.99) - 1], 2),
+        }
+    return results
+
+
+def run(mode, port, args):
+    procs = [spawn("all" if mode == "all" else "api", port, args.agents)]
+    if mode == "split":
+        procs.append(spawn("worker", port, args.agents))
+    try:
+        url = f"http://127.0.0.1:{port}"
+        wait_ready(url)
+        time.sleep(1)  # let the agents get going
+        return measure(url, args.requests)
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300, help="requests per endpoint")
+    parser.add_argument("--agents", type=int, default=3)
+    parser.add_argument("--serve", choices=("all", "api", "worker"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=5123)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.agents)
+        return
+
+    tmp_dir = tempfile.mkdtemp(prefix="xapply_bench_")
+    os.environ["XAPPLY_DB_PATH"] = os.path.join(tmp_dir, "bench.db")
+    os.environ["TASK_POLL_INTERVAL"] = "3600"
+
+    print(f"[*] {args.requests} requests per endpoint with {args.agents} busy agents")
+    results = {mode: run(mode, args.port + i, args) for i, mode in enumerate(("all", "split"))}
+    print(f"{'endpoint':<12}{'all p50':>10}{'all p99':>10}{'split p50':>11}{'split p99':>11}  (ms)")
+    for path in PATHS:
+        a, s = results["all"][path], results["split"][path]
+        print(f"{path:<12}{a['p50']:>10}{a['p99']:>10}{s['p50']:>11}{s['p99']:>11}")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
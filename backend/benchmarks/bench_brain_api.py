@@ -0,0 +1,85 @@
+"""
+Benchmark: brain call latency against the local mock LLM.
+
+Compares BrainClient (pooled connection, streaming, early stop on a
+complete JSON action) with reading the whole streamed reply, and with a
+naive client that opens a new connection and waits for the full
+non-streamed reply on every call. A last run injects 503s to check the
+retries.
+
+Usage:
+    python benchmarks/bench_brain_api.py [--calls 30] [--first-token-ms 300] [--token-ms 20]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+import requests
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from brain_client import BrainClient  # noqa: E402
+from observations import format_observation  # noqa: E402
+from bench_prompt_tokens import synthetic_session, TASK  # noqa: E402
+from mock_llm import start_mock_llm  # noqa: E402
+
+
+def naive_call(url, prompt):
+    """What a first-cut client does: fresh connection, no streaming, parse the whole reply."""
+    response = requests.post(url, json={"messages": [{"role": "user", "content": prompt}]}, timeout=30)
+    response.raise_for_status()
+    return response.json()["choices"][0]["message"]["content"]
+
+
+def timed(fn, prompts):
+    samples = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        fn(prompt)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=30)
+    parser.add_argument("--first-token-ms", type=int, default=300)
+    parser.add_argument("--token-ms", type=int, default=20)
+    args = parser.parse_args()
+
+    server, url = start_mock_llm(first_token_ms=args.first_token_ms, token_ms=args.token_ms)
+    observations = synthetic_session()
+    prompts = [format_observation(TASK, observations[i % len(observations)]) for i in range(args.calls)]
+    for prompt in prompts[:3]:
+        json.loads(BrainClient(url=url).ask(prompt))  # every reply must parse as a JSON action
+
+    client = BrainClient(url=url, api_key="")
+    results = {
+        "naive (new conn, full)": timed(lambda p: naive_call(url, p), prompts),
+        "stream, full reply": timed(lambda p: client.ask(p, stop_on_json=False), prompts),
+        "stream + early stop": timed(lambda p: client.ask(p), prompts),
+    }
+    client.close()
+    server.shutdown()
+
+    print(f"[*] {args.calls} calls, first token {args.first_token_ms} ms, {args.token_ms} ms/chunk")
+    print(f"{'client':<26}{'p50 ms':>10}{'mean ms':>10}{'max ms':>10}")
+    for name, ms in results.items():
+        print(f"{name:<26}{statistics.median(ms):>10.0f}{statistics.mean(ms):>10.0f}{max(ms):>10.0f}")
+
+    # Every third request fails with a 503; all calls should still succeed
+    server, url = start_mock_llm(first_token_ms=10, token_ms=1, fail_every=3)
+    client = BrainClient(url=url, api_key="")
+    ok = sum(1 for prompt in prompts[:10] if json.loads(client.ask(prompt)))
+    print(f"[*] with a 503 every 3rd request: {ok}/10 calls succeeded ({server.requests} requests)")
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: time for the scouting crawler to find N listings.
+
+Starts several fixture job boards (each on its own port, so each is its
+own host to the per-host limits) and crawls them into a throwaway
+database, with the crawler's real per-host concurrency and rate limits.
+Reports pages and listings per second and the time until `--target`
+listings were stored.
+
+Usage:
+    python benchmarks/bench_crawler.py [--hosts 10] [--rate 2] [--host-concurrency 2] [--target 500]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["XAPPLY_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="xapply_bench_"), "bench.db")
+
+from database import Database, init_db  # noqa: E402
+from crawler import Crawler  # noqa: E402
+from fixture_site import start_fixture_site  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=2.0, help="requests per second per host")
+    parser.add_argument("--host-concurrency", type=int, default=2)
+    parser.add_argument("--target", type=int, default=500)
+    args = parser.parse_args()
+
+    init_db()
+    db = Database()
+    servers = [start_fixture_site() for _ in range(args.hosts)]
+    boards = [f"{url}/" for _, url in servers]
+    reached = {}
+    started = time.perf_counter()
+
+    def log(message, level="info"):
+        # Called right after each batch write, so stats["inserted"] is what is stored so far
+        if crawler.stats["inserted"] >= args.target and "target" not in reached:
+            reached["target"] = time.perf_counter() - started
+        print(f"[{'*' if level == 'info' else '!'}] {message}")
+
+    crawler = Crawler(db, host_rate=args.rate, host_concurrency=args.host_concurrency, log=log)
+    try:
+        stats = crawler.run(boards)
+    finally:
+        for server, _ in servers:
+            server.shutdown()
+
+    print(f"[*] {args.hosts} boards, {args.rate}/s and {args.host_concurrency} in flight per host")
+    print(f"{'pages':<22}{stats['pages']:>10}")
+    print(f"{'listings stored':<22}{stats['inserted']:>10}")
+    print(f"{'seconds':<22}{stats['seconds']:>10}")
+    print(f"{'pages/sec':<22}{stats['pages'] / stats['seconds']:>10.1f}")
+    print(f"{'listings/sec':<22}{stats['jobs'] / stats['seconds']:>10.1f}")
+    target = reached.get("target")
+    print(f"{f'time to {args.target} listings':<22}{f'{target:.1f} s' if target else 'not reached':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark: requests/sec on /profile and /jobs.
+
+Compares the old behaviour (a fresh sqlite connection + schema init per
+request) against the shared connection pool. Runs against a throwaway
+database so the real data/xapply.db is never touched.
+
+Usage:
+    python benchmarks/bench_db_routes.py [--requests 2000]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+TMP_DIR = tempfile.mkdtemp(prefix="xapply_bench_")
+os.environ["XAPPLY_DB_PATH"] = os.path.join(TMP_DIR, "bench.db")
+
+import database  # noqa: E402
+import orchestrator  # noqa: E402
+
+
+class PerRequestDatabase:
+    """Mimics the old routes: every DB call builds a new Database()."""
+    def __getattr__(self, name):
+        fresh = database.Database(pool=database.ConnectionPool(database.DB_PATH))
+        return getattr(fresh, name)
+
+
+def bench(client, path, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        resp = client.get(path)
+        assert resp.status_code == 200, resp.data
+    elapsed = time.perf_counter() - start
+    return n / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--jobs", type=int, default=200, help="rows to seed into the jobs table")
+    args = parser.parse_args()
+
+    shared = orchestrator.db
+    for i in range(args.jobs):
+        shared.add_job({"url": f"https://example.com/job/{i}", "title": f"Job {i}"})
+
+    client = orchestrator.app.test_client()
+    print(f"[*] {args.requests} requests per endpoint, {args.jobs} jobs seeded")
+    print(f"{'endpoint':<12}{'per-request':>14}{'pooled':>14}{'speedup':>10}")
+    for path in ("/profile", "/jobs"):
+        orchestrator.db = PerRequestDatabase()
+        before = bench(client, path, args.requests)
+        orchestrator.db = shared
+        after = bench(client, path, args.requests)
+        print(f"{path:<12}{before:>10.0f} r/s{after:>10.0f} r/s{after / before:>9.1f}x")
+
+    database.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark: /jobs latency with a large jobs table.
+
+Seeds N jobs (default 100k) into a throwaway database and reports p50/p99
+latency for the old "load everything and split in Python" path and for
+keyset-paginated pages (first page and deep pages via the `after` cursor).
+
+Usage:
+    python benchmarks/bench_jobs_pagination.py [--jobs 100000] [--samples 200]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+TMP_DIR = tempfile.mkdtemp(prefix="xapply_bench_")
+os.environ["XAPPLY_DB_PATH"] = os.path.join(TMP_DIR, "bench.db")
+
+import database  # noqa: E402
+import orchestrator  # noqa: E402
+
+
+def seed(n):
+    now = time.time()
+    rows = (
+        (f"https://example.com/job/{i}", f"Job {i}", f"Company {i % 500}", "Remote",
+         "applied" if i % 10 == 0 else "scouted", now - i, now if i % 10 == 0 else None)
+        for i in range(n)
+    )
+    with database.get_pool().connection() as conn:
+        conn.executemany(
+            "INSERT INTO jobs (url, title, company, location, status, scouted_at, applied_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        conn.commit()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return p50 * 1000, p99 * 1000
+
+
+def timed(fn, samples):
+    out = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - start)
+    return percentiles(out)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=100_000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"[*] Seeding {args.jobs} jobs...")
+    seed(args.jobs)
+    db = orchestrator.db
+    client = orchestrator.app.test_client()
+
+    # Collect cursors deep into the listing to sample random pages
+    cursors = []
+    _, cursor = db.get_jobs_page(status="scouted", limit=args.limit)
+    while cursor and len(cursors) < 200:
+        cursors.append(cursor)
+        _, cursor = db.get_jobs_page(status="scouted", after=cursor, limit=args.limit * 10)
+
+    def legacy():
+        jobs = db.get_jobs()
+        [j for j in jobs if j["status"] == "scouted"], [j for j in jobs if j["status"] == "applied"]
+
+    def first_page():
+        assert client.get(f"/jobs?status=scouted&limit={args.limit}").status_code == 200
+
+    def deep_page():
+        after = random.choice(cursors)
+        assert client.get(f"/jobs?status=scouted&limit={args.limit}&after={after}").status_code == 200
+
+    def overview():
+        assert client.get(f"/jobs?limit={args.limit}").status_code == 200
+
+    legacy_samples = max(5, args.samples // 20)
+    print(f"{'path':<40}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, fn, n in (
+        ("legacy full load (Database.get_jobs)", legacy, legacy_samples),
+        ("/jobs (first page of each status)", overview, args.samples),
+        ("/jobs?status=scouted first page", first_page, args.samples),
+        ("/jobs?status=scouted deep page", deep_page, args.samples),
+    ):
+        p50, p99 = timed(fn, n)
+        print(f"{name:<40}{p50:>10.2f}{p99:>10.2f}")
+
+    database.close_pool()
+
+
+if __name__ == "__main__":
+    main()
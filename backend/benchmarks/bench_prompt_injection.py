@@ -0,0 +1,81 @@
+"""
+Benchmark: time to enter a brain prompt into a textarea, by method and prompt size.
+
+Uses the fixture site's /playground page, whose send button only enables
+after the page sees an input event - so each method is also checked for
+being noticed by the page, not just for setting the value. Prompts are
+built from the synthetic observation session, so they look like the real
+thing (page text plus element lists). Needs Chrome installed.
+
+Usage:
+    python benchmarks/bench_prompt_injection.py [--rounds 3] [--headed]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import undetected_chromedriver as uc  # noqa: E402
+from selenium.webdriver.common.by import By  # noqa: E402
+from utils.text_injection import inject_text  # noqa: E402
+from observations import format_observation  # noqa: E402
+from bench_prompt_tokens import synthetic_session, TASK  # noqa: E402
+from fixture_site import start_fixture_site  # noqa: E402
+
+SIZES = [500, 2000, 4000, 8000]
+METHODS = ["native", "cdp", "keys"]
+
+
+def prompt_of_size(size):
+    text = "\n\n".join(format_observation(TASK, obs) for obs in synthetic_session())
+    while len(text) < size:
+        text += "\n" + text
+    return text[:size]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--headed", action="store_true")
+    args = parser.parse_args()
+
+    server, base_url = start_fixture_site()
+    options = uc.ChromeOptions()
+    options.add_argument(f"--user-data-dir={tempfile.mkdtemp(prefix='xapply_bench_profile_')}")
+    if not args.headed:
+        options.add_argument("--headless=new")
+    driver = uc.Chrome(options=options)
+    results = {}
+    try:
+        driver.get(f"{base_url}/playground")
+        for size in SIZES:
+            text = prompt_of_size(size)
+            for method in METHODS:
+                samples, noticed = [], True
+                for _ in range(args.rounds):
+                    textarea = driver.find_element(By.ID, "prompt")
+                    driver.execute_script("arguments[0].value = ''; document.getElementById('send').disabled = true;", textarea)
+                    start = time.perf_counter()
+                    used = inject_text(driver, textarea, text, method=method)
+                    samples.append((time.perf_counter() - start) * 1000)
+                    enabled = driver.find_element(By.ID, "send").is_enabled()
+                    noticed = noticed and used == method and enabled
+                results[(size, method)] = (samples, noticed)
+    finally:
+        driver.quit()
+        server.shutdown()
+
+    print(f"[*] {args.rounds} rounds per size against {base_url}/playground")
+    print(f"{'chars':>7}  {'method':<8}{'p50 ms':>10}{'max ms':>10}  page saw input")
+    for (size, method), (samples, noticed) in results.items():
+        print(f"{size:>7}  {method:<8}{statistics.median(samples):>10.0f}{max(samples):>10.0f}  {'yes' if noticed else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: brain prompt size per step, full observations vs incremental diffs.
+
+Replays recorded sessions - JSONL files written by the orchestrator when
+RECORD_OBSERVATIONS_DIR is set (one capture_state() result per line) -
+through both prompt builders and reports estimated tokens (~4 chars each).
+Without arguments it replays a synthetic session built from the fixture site.
+
+Usage:
+    python benchmarks/bench_prompt_tokens.py [data/recordings/a1_frontend.jsonl ...]
+"""
+import os
+import sys
+import json
+import argparse
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from observations import ObservationTracker, format_observation, format_observation_diff, estimate_tokens  # noqa: E402
+from fixture_site import fixture_job, JOB_COUNT  # noqa: E402
+
+TASK = "Browse the job board for 'Software Engineer' jobs and apply."
+
+
+def _element(index, tag, selector, text, href=None, type_=None):
+    return {"index": index, "tag": tag, "selector": selector, "text": text, "type": type_, "href": href}
+
+
+def synthetic_session(base_url="http://127.0.0.1:8765"):
+    """A listing -> scroll -> featured load -> search -> job page -> apply form walk."""
+    jobs = [fixture_job(i) for i in range(1, JOB_COUNT + 1)]
+    lines = ["Jobs", "Open roles"] + [f"{j['title']} {j['company']} {j['location']}" for j in jobs]
+    elements = [_element(1, "a", "#home", "Jobs", f"{base_url}/"),
+                _element(2, "input", 'input[name="q"]', "Search jobs", type_="text")]
+    elements += [_element(i + 3, "a", f"a.job-link:nth-of-type({i + 1})", j["title"], f"{base_url}/jobs/{j['id']}")
+                 for i, j in enumerate(jobs[:23])]
+
+    def obs(url, text_lines, els):
+        return {"url": url, "text_content": "\n".join(text_lines)[:3000], "interactive_elements": els[:25]}
+
+    listing = obs(f"{base_url}/", lines + ["Loading featured jobs..."], elements)
+    featured = obs(f"{base_url}/", lines + ["Featured: Frontend Developer, Backend Engineer"],
+                   elements[:22] + [_element(23, "a", "a.featured-link", "Frontend Developer", f"{base_url}/jobs/1")])
+    typed = obs(f"{base_url}/", lines + ["Featured: Frontend Developer, Backend Engineer"],
+                [elements[0], _element(2, "input", 'input[name="q"]', "Software Engineer", type_="text")] + featured["interactive_elements"][2:])
+    job = jobs[4]
+    detail_lines = ["Jobs", job["title"], job["company"], job["location"], "Build and ship things.", "Back to jobs"]
+    detail_els = [elements[0], _element(2, "a", "#back", "Back to jobs", f"{base_url}/"), _element(3, "a", "#apply", "Apply now")]
+    detail = obs(f"{base_url}/jobs/5", detail_lines, detail_els)
+    form = obs(f"{base_url}/jobs/5", detail_lines + ["Your name", "Your email", "Submit application"],
+               detail_els + [_element(4, "input", 'input[name="name"]', "Your name", type_="text"),
+                             _element(5, "input", 'input[name="email"]', "Your email", type_="email"),
+                             _element(6, "button", "#submit", "Submit application", type_="submit")])
+    return [listing, listing, featured, typed, typed, detail, form, form]
+
+
+def replay(observations):
+    tracker = ObservationTracker()
+    full_tokens, incremental_tokens, diffs = [], [], 0
+    for observation in observations:
+        full_tokens.append(estimate_tokens(format_observation(TASK, observation)))
+        diff = tracker.update(observation)
+        if diff is None:
+            incremental_tokens.append(full_tokens[-1])
+        else:
+            diffs += 1
+            incremental_tokens.append(estimate_tokens(format_observation_diff(diff)))
+    return full_tokens, incremental_tokens, diffs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sessions", nargs="*", help="recorded observation JSONL files")
+    args = parser.parse_args()
+
+    sessions = {}
+    for path in args.sessions:
+        with open(path, encoding="utf-8") as f:
+            sessions[os.path.basename(path)] = [json.loads(line) for line in f if line.strip()]
+    if not sessions:
+        sessions["synthetic (fixture site)"] = synthetic_session()
+
+    print(f"{'session':<28}{'steps':>7}{'diffs':>7}{'full tok':>10}{'incr tok':>10}{'saved':>8}")
+    for name, observations in sessions.items():
+        full, incremental, diffs = replay(observations)
+        saved = 1 - sum(incremental) / max(1, sum(full))
+        print(f"{name[:27]:<28}{len(observations):>7}{diffs:>7}{sum(full):>10}{sum(incremental):>10}{saved:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
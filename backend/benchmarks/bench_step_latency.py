@@ -0,0 +1,87 @@
+"""
+Benchmark: per-step latency of the surf loop against the local fixture site.
+
+A step is what run_loop does per iteration minus the brain call:
+capture_state() + execute_action(). Compares the old fixed sleeps
+(3 s after navigate, 1 s after every action, 2 s per step) with the
+readiness-based waits in utils/page_waits.py. Needs Chrome installed.
+
+Usage:
+    python benchmarks/bench_step_latency.py [--rounds 3] [--headed]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import surfer as surfer_module  # noqa: E402
+from fixture_site import start_fixture_site  # noqa: E402
+
+
+def legacy_wait(driver, timeout=None, **kwargs):
+    """The old behaviour: 3 s after a navigation, 1 s after any other action."""
+    time.sleep(3 if timeout is None else 1)
+    return True
+
+
+def script(base_url):
+    return [
+        {"type": "navigate", "url": f"{base_url}/"},
+        {"type": "click", "selector": "a.job-link"},
+        {"type": "scroll"},
+        {"type": "click", "selector": "#back"},
+        {"type": "navigate", "url": f"{base_url}/jobs/7"},
+    ]
+
+
+def run(surfer, actions, legacy):
+    timings = []
+    for action in actions:
+        start = time.perf_counter()
+        surfer.capture_state()
+        surfer.execute_action(dict(action))
+        if legacy:
+            time.sleep(2)  # run_loop's old per-step sleep
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--headed", action="store_true")
+    args = parser.parse_args()
+
+    server, base_url = start_fixture_site()
+    # An absolute profile path keeps the benchmark browser out of data/profiles
+    profile = tempfile.mkdtemp(prefix="xapply_bench_profile_")
+    surfer = surfer_module.JobSurfer(headless=not args.headed, start_url=base_url, profile_name=profile)
+    actions = script(base_url)
+    results = {}
+    try:
+        ready_wait = surfer_module.wait_for_page_settled
+        for mode in ("fixed sleeps", "readiness"):
+            surfer_module.wait_for_page_settled = legacy_wait if mode == "fixed sleeps" else ready_wait
+            samples = []
+            for _ in range(args.rounds):
+                samples += run(surfer, actions, legacy=(mode == "fixed sleeps"))
+            results[mode] = samples
+    finally:
+        surfer.close()
+        server.shutdown()
+
+    print(f"[*] {len(actions)} actions x {args.rounds} rounds against {base_url}")
+    print(f"{'mode':<14}{'p50 ms':>10}{'mean ms':>10}{'max ms':>10}")
+    for mode, samples in results.items():
+        ms = [x * 1000 for x in samples]
+        print(f"{mode:<14}{statistics.median(ms):>10.0f}{statistics.mean(ms):>10.0f}{max(ms):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: task pickup latency - time from writing an agent's *_input.txt
+to the orchestrator starting the task.
+
+Runs the real AgentOrchestrator.run_loop against a temporary agents
+directory (no browsers: the task body is stubbed out) in two modes:
+  events - watchdog file events (current behaviour)
+  poll   - fixed 2 s directory polling (previous behaviour)
+Each mode runs in its own subprocess.
+
+Usage:
+    python benchmarks/bench_task_pickup.py [--tasks 20]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def run_mode(mode, tasks):
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ["XAPPLY_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="xapply_bench_"), "bench.db")
+    import orchestrator
+    from task_watcher import TaskWatcher
+
+    agents_dir = tempfile.mkdtemp(prefix="xapply_agents_")
+    orchestrator.AGENTS_DIR = agents_dir
+    if mode == "events":
+        orchestrator.task_watcher = TaskWatcher()
+    else:
+        orchestrator.task_watcher = TaskWatcher(poll_interval=2, use_events=False)
+
+    started = threading.Event()
+    pickup = {}
+
+    orc = orchestrator.AgentOrchestrator()
+    orc.setup_brain = lambda: None
+
+    def fake_task(agent_id, file_path, content):
+        pickup["t"] = time.perf_counter()
+        with open(file_path, "w") as f:
+            f.write("")
+        with orc.running_lock:
+            orc.running.discard(agent_id)
+        started.set()
+
+    orc.run_agent_task = fake_task
+    orchestrator.agent_state["active"] = True
+    threading.Thread(target=orc.run_loop, daemon=True).start()
+    time.sleep(0.5)
+
+    latencies = []
+    input_path = os.path.join(agents_dir, "a1_bench_input.txt")
+    for i in range(tasks):
+        # Land at a random point in the poll cycle
+        time.sleep(random.uniform(0.05, 0.3))
+        started.clear()
+        t0 = time.perf_counter()
+        with open(input_path, "w") as f:
+            f.write(f"task {i}")
+        started.wait(10)
+        latencies.append(pickup["t"] - t0)
+    print(json.dumps(latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--mode", choices=["events", "poll"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.tasks)
+        return
+
+    print(f"[*] {args.tasks} tasks per mode")
+    print(f"{'mode':<10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for mode in ("poll", "events"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--tasks", str(args.tasks)],
+            capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        samples = sorted(x * 1000 for x in json.loads(out))
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        print(f"{mode:<10}{statistics.median(samples):>10.1f}{p99:>10.1f}{samples[-1]:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
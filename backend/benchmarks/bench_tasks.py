@@ -0,0 +1,241 @@
+"""
+Benchmark: whole tasks through the real agent loop, end to end.
+
+Drives AgentOrchestrator.surf with real JobSurfer browsers (or, with
+--surfer http, the browserless HttpSurfer) through full tasks on the local fixture site (search, paginate, open a role, fill in and
+submit the apply form), with benchmarks/fake_brain.py standing in for
+ask_ai so the numbers are the agent's and not a model's. Reports task
+latency, steps/sec (browser actions) and decisions/sec, the per-step split
+between capture / brain / execute from the run ledger, and memory: peak
+RSS of this process and of each agent's Chrome.
+
+Results are saved as JSON; pass an earlier file to --compare to see what
+changed. Runs against a throwaway database and agents directory. Needs
+Chrome unless --surfer http.
+
+Usage:
+    python benchmarks/bench_tasks.py [--surfer chrome|http] [--rounds 2] [--agents 1] [--think-ms 0]
+                                     [--headed] [--output results.json] [--compare previous.json]
+"""
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import statistics
+import subprocess
+import tracemalloc
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+TMP_DIR = tempfile.mkdtemp(prefix="xapply_bench_")
+os.environ["XAPPLY_DB_PATH"] = os.path.join(TMP_DIR, "bench.db")
+
+import orchestrator  # noqa: E402
+from surfer import JobSurfer  # noqa: E402
+from fetcher import PageFetcher  # noqa: E402
+from http_surfer import HttpSurfer  # noqa: E402
+from browser_pool import browser_rss_mb  # noqa: E402
+from fixture_site import start_fixture_site  # noqa: E402
+from fake_brain import ScriptedBrain, TASKS  # noqa: E402
+
+# Summary fields compared by --compare, and whether higher is better
+COMPARED = {
+    "success_rate": True, "steps_per_sec": True, "decisions_per_sec": True,
+    "latency_p50_s": False, "latency_p95_s": False, "step_p50_ms": False,
+    "capture_ms_per_step": False, "execute_ms_per_step": False, "peak_rss_mb": False,
+}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def peak_rss_mb():
+    """This process's peak resident memory (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def make_surfer(base_url, slot, args, fetcher):
+    if args.surfer == "http":
+        return HttpSurfer(fetcher, start_url=base_url)
+    # An absolute profile path keeps the benchmark browsers out of data/profiles
+    profile = tempfile.mkdtemp(prefix=f"xapply_bench_profile_{slot}_")
+    return JobSurfer(headless=not args.headed, start_url=base_url, profile_name=profile)
+
+
+def run_agent(orc, surfer, agent_id, base_url, tasks, results):
+    """One agent thread: runs queued tasks on its own browser, the way run_agent_task does."""
+    orchestrator._log_context.agent_id = agent_id
+    while True:
+        try:
+            task = tasks.get_nowait()
+        except queue.Empty:
+            return
+        surfer.navigate(base_url)  # Every task starts from the board, not where the last one ended
+        started = time.perf_counter()
+        orc.surf(agent_id, task, surfer)
+        latency = time.perf_counter() - started
+        orc.ledger.flush()
+        run = orc.db.get_runs(limit=1, agent_id=agent_id)[0]
+        steps = orc.db.get_run(run["id"])["steps"]
+        results.append({
+            "agent": agent_id,
+            "task": task,
+            "status": run["status"],
+            # Done is only a success if the brain actually got the application through
+            "success": run["status"] == "done" and bool(steps) and "/applied" in (steps[-1]["url"] or ""),
+            "latency_s": round(latency, 3),
+            "actions": run["actions"],
+            "decisions": run["decisions"],
+            "capture_ms": run["capture_ms"],
+            "brain_ms": run["brain_ms"],
+            "execute_ms": run["execute_ms"],
+            "step_ms": [round(s["capture_ms"] + s["brain_ms"] + s["execute_ms"], 1) for s in steps],
+        })
+        print(f"[*] {agent_id}: {run['status']} in {latency:.2f}s, {run['actions']} actions - {task}")
+
+
+def summarize(results, wall_s, surfers, brain, python_peak_mb):
+    latencies = [r["latency_s"] for r in results]
+    actions = sum(r["actions"] for r in results)
+    decisions = sum(r["decisions"] for r in results)
+    step_ms = [ms for r in results for ms in r["step_ms"]]
+    busy_s = sum(latencies)
+    browser_mb = [browser_rss_mb(s) if getattr(s, "driver", None) else None for s in surfers]
+    return {
+        "tasks": len(results),
+        "success_rate": round(sum(r["success"] for r in results) / len(results), 3) if results else None,
+        "wall_s": round(wall_s, 2),
+        "steps_per_sec": round(actions / busy_s, 2) if busy_s else None,
+        "decisions_per_sec": round(decisions / busy_s, 2) if busy_s else None,
+        "throughput_tasks_per_min": round(len(results) / wall_s * 60, 1) if wall_s else None,
+        "latency_p50_s": percentile(latencies, 0.5),
+        "latency_p95_s": percentile(latencies, 0.95),
+        "latency_mean_s": round(statistics.mean(latencies), 3) if latencies else None,
+        "step_p50_ms": percentile(step_ms, 0.5),
+        "step_p95_ms": percentile(step_ms, 0.95),
+        "capture_ms_per_step": round(sum(r["capture_ms"] or 0 for r in results) / decisions, 1) if decisions else None,
+        "brain_ms_per_step": round(sum(r["brain_ms"] or 0 for r in results) / decisions, 1) if decisions else None,
+        "execute_ms_per_step": round(sum(r["execute_ms"] or 0 for r in results) / actions, 1) if actions else None,
+        "brain_calls": brain.calls,
+        "peak_rss_mb": peak_rss_mb(),
+        "python_peak_mb": python_peak_mb,
+        "browser_rss_mb": [round(mb, 1) if mb is not None else None for mb in browser_mb],
+    }
+
+
+def compare(summary, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)["summary"]
+    print(f"[*] Compared with {previous_path}")
+    print(f"{'metric':<24}{'before':>12}{'after':>12}{'change':>10}")
+    for key, higher_is_better in COMPARED.items():
+        before, after = previous.get(key), summary.get(key)
+        if before is None or after is None:
+            continue
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "-"
+        worse = (after < before) if higher_is_better else (after > before)
+        print(f"{key:<24}{before:>12}{after:>12}{change:>10}{'  !' if worse and before and abs(after - before) / before > 0.1 else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--surfer", choices=("chrome", "http"), default="chrome")
+    parser.add_argument("--rounds", type=int, default=2, help="times each task in fake_brain.TASKS is run")
+    parser.add_argument("--agents", type=int, default=1, help="concurrent agents, one browser each")
+    parser.add_argument("--think-ms", type=int, default=0, help="simulated brain latency per decision")
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--trace-memory", action="store_true", help="also report the Python heap peak (slower)")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/tasks-<surfer>-<time>.json)")
+    parser.add_argument("--compare", help="an earlier results file to compare against")
+    args = parser.parse_args()
+
+    orchestrator.AGENTS_DIR = os.path.join(TMP_DIR, "agents")  # surf writes <agent>_output.txt here
+    orchestrator.init_db()
+    orchestrator.agent_state["active"] = True
+    server, base_url = start_fixture_site()
+    brain = ScriptedBrain(think_ms=args.think_ms)
+    orc = orchestrator.AgentOrchestrator()
+    orc.ask_ai = brain.ask_ai
+    orc.ledger.enabled = True  # Per-task numbers come from the run ledger, even with RUN_LEDGER=false
+
+    tasks = queue.Queue()
+    for _ in range(args.rounds):
+        for task in TASKS:
+            tasks.put(task)
+    print(f"[*] {tasks.qsize()} tasks on {args.agents} {args.surfer} agent(s) against {base_url}")
+
+    fetcher = PageFetcher(pool_size=max(args.agents, 1))
+    surfers, results = [], []
+    try:
+        surfers = [make_surfer(base_url, slot, args, fetcher) for slot in range(args.agents)]
+        if args.trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        threads = [threading.Thread(target=run_agent, args=(orc, surfer, f"bench_{slot}", base_url, tasks, results))
+                   for slot, surfer in enumerate(surfers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_s = time.perf_counter() - started
+        python_peak_mb = None
+        if args.trace_memory:
+            python_peak_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            tracemalloc.stop()
+        summary = summarize(results, wall_s, surfers, brain, python_peak_mb)
+        summary["applications"] = len(server.applications)
+        if args.surfer == "http":
+            summary["http_fetches"] = fetcher.stats()
+    finally:
+        for surfer in surfers:
+            surfer.close()
+        orc.ledger.close()
+        server.shutdown()
+
+    report = {
+        "benchmark": "tasks",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {"surfer": args.surfer, "rounds": args.rounds, "agents": args.agents, "think_ms": args.think_ms,
+                   "headless": not args.headed, "tasks": TASKS},
+        "summary": summary,
+        "tasks": results,
+    }
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                         f"tasks-{args.surfer}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'metric':<26}{'value':>12}")
+    for key, value in summary.items():
+        print(f"{key:<26}{str(value):>12}")
+    print(f"[*] Results saved to {output}")
+    if args.compare:
+        compare(summary, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Scripted stand-in for AgentOrchestrator.ask_ai, for offline benchmarks.
+
+Answers observations of the fixture site (benchmarks/fixture_site.py) the
+way a competent brain would, with no model and no network, so a benchmark
+measures the agent loop rather than the LLM. Tasks name what to look for:
+
+    Search for 'python' jobs and apply to the first match
+    Search for 'engineer' jobs and apply to the first match on page 3
+    Browse the listings to page 2 and apply to the first role there
+
+Policy: confirmation page -> done; apply form -> a plan filling and
+submitting it; job page -> click apply; on the wanted results page -> click
+the first job; before it -> next page; a keyword and no results yet ->
+a plan typing it into the search box; anything else -> back to the board.
+
+    brain = ScriptedBrain(think_ms=50)
+    orchestrator.ask_ai = brain.ask_ai
+"""
+import re
+import json
+import time
+import threading
+from urllib.parse import urlsplit
+
+TASKS = [
+    "Search for 'python' jobs and apply to the first match",
+    "Search for 'engineer' jobs and apply to the first match on page 3",
+    "Search for 'london' jobs and apply to the first match on page 2",
+    "Browse the listings to page 2 and apply to the first role there",
+]
+
+APPLICANT = {"name": "Ada Lovelace", "email": "ada@example.com",
+             "cover_letter": "I would love to help build and ship things."}
+
+
+def parse_task(task):
+    """Returns (keyword or None, results page to apply from)."""
+    keyword = re.search(r"['\"]([^'\"]+)['\"]", task)
+    page = re.search(r"page (\d+)", task)
+    return (keyword.group(1) if keyword else None), (int(page.group(1)) if page else 1)
+
+
+def decide(task, observation):
+    """The scripted policy: a JSON-ready action or plan for one fixture site observation."""
+    keyword, wanted_page = parse_task(task)
+    url = urlsplit(observation.get("url") or "")
+    text = observation.get("text_content") or ""
+    selectors = [el.get("selector") for el in observation.get("interactive_elements") or []]
+
+    if "Application received" in text:
+        return {"action": "done", "reason": "Application submitted"}
+    if "#submit-application" in selectors:
+        return {"plan": [
+            {"action": "type", "selector": "#name", "value": APPLICANT["name"], "expect": {"selector": "#name"}},
+            {"action": "type", "selector": "#email", "value": APPLICANT["email"]},
+            {"action": "type", "selector": "#cover-letter", "value": APPLICANT["cover_letter"]},
+            {"action": "click", "selector": "#submit-application"},
+        ]}
+    if "#apply" in selectors:
+        return {"action": "click", "selector": "#apply", "expect": {"url_contains": "/jobs/"}}
+
+    searched = url.path == "/search"
+    if searched or (url.path == "/" and not keyword):
+        page = re.search(r"Page (\d+) of (\d+)", text)
+        current = int(page.group(1)) if page else 1
+        if current < wanted_page and "#next-page" in selectors:
+            return {"action": "click", "selector": "#next-page"}
+        jobs = [s for s in selectors if s and s.startswith("#job-")]
+        if jobs:
+            return {"action": "click", "selector": jobs[0], "expect": {"selector": jobs[0]}}
+        return {"action": "done", "reason": "No matching roles"}
+    if keyword and "#q" in selectors:
+        return {"plan": [
+            {"action": "type", "selector": "#q", "value": keyword, "expect": {"selector": "#search-button"}},
+            {"action": "click", "selector": "#search-button"},
+        ]}
+    base = f"{url.scheme}://{url.netloc}/" if url.netloc else "/"
+    return {"action": "navigate", "url": base}
+
+
+class ScriptedBrain:
+    """Drop-in for ask_ai: replies with decide() after think_ms of simulated model latency."""
+    def __init__(self, think_ms=0):
+        self.think_ms = think_ms
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def ask_ai(self, prompt, context=None, diff=None, keep_conversation=False, use_cache=True):
+        with self._lock:
+            self.calls += 1
+        if self.think_ms:
+            time.sleep(self.think_ms / 1000)
+        if context is None:
+            return "OK"  # Coding mode / plain prompts
+        return json.dumps(decide(prompt, context))
@@ -0,0 +1,249 @@
+"""
+Local fixture job site for offline benchmarks.
+
+Serves a small server-rendered job board from the stdlib HTTP server:
+paginated listings, search (/search?q=), job pages and apply forms that
+POST back and land on a confirmation page. Submitted applications are kept
+on server.applications so a run can check what it actually applied to.
+A little client-side behaviour (a late-rendered block and a delayed fetch)
+gives readiness-based waits something realistic to wait for.
+
+Usage:
+    python benchmarks/fixture_site.py [--port 8765]
+"""
+import json
+import time
+import html
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+JOB_COUNT = 60
+PAGE_SIZE = 10
+API_DELAY = 0.15  # seconds - simulated backend latency for /api/featured
+
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries", "Wayne Enterprises"]
+TITLES = ["Software Engineer", "Frontend Developer", "Backend Engineer", "Data Engineer", "QA Engineer",
+          "Python Developer"]
+LOCATIONS = ["Remote", "London", "Berlin", "New York", "Manchester"]
+
+
+def fixture_job(job_id):
+    return {
+        "id": job_id,
+        "title": TITLES[job_id % len(TITLES)],
+        "company": COMPANIES[job_id % len(COMPANIES)],
+        "location": LOCATIONS[job_id % len(LOCATIONS)],
+    }
+
+
+PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+<nav><a id="home" href="/">Jobs</a></nav>
+{body}
+<div id="featured">Loading featured jobs...</div>
+<script>
+  // Simulates hydration + a slow API call after load
+  setTimeout(() => {{
+    fetch('/api/featured').then(r => r.json()).then(data => {{
+      document.getElementById('featured').innerHTML =
+        data.map(j => `<a class="featured-link" href="/jobs/${{j.id}}">${{j.title}}</a>`).join(' ');
+    }});
+  }}, 100);
+</script>
+</body></html>"""
+
+
+def search_jobs(query=None):
+    jobs = [fixture_job(i) for i in range(1, JOB_COUNT + 1)]
+    if not query:
+        return jobs
+    words = query.lower().split()
+    return [j for j in jobs if all(w in f"{j['title']} {j['company']} {j['location']}".lower() for w in words)]
+
+
+def render_listing(page=1, query=None):
+    """A page of listings (all jobs, or the matches for `query`) with the search form and pagination."""
+    jobs = search_jobs(query)
+    pages = max(1, -(-len(jobs) // PAGE_SIZE))
+    page = min(max(1, page), pages)
+    items = "\n".join(
+        f'<li class="job"><a class="job-link" id="job-{j["id"]}" href="/jobs/{j["id"]}">{j["title"]}</a> '
+        f'<span class="company">{j["company"]}</span> <span class="location">{j["location"]}</span></li>'
+        for j in jobs[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+    ) or '<li class="empty">No roles match your search.</li>'
+
+    base = "/search" if query else "/"
+    def page_url(n):
+        return base + "?" + urlencode({**({"q": query} if query else {}), "page": n})
+    pagination = f'<span class="page-info">Page {page} of {pages}</span>'
+    if page > 1:
+        pagination = f'<a id="prev-page" href="{page_url(page - 1)}">Previous</a> ' + pagination
+    if page < pages:
+        pagination += f' <a id="next-page" href="{page_url(page + 1)}">Next</a>'
+
+    value = html.escape(query or "", quote=True)
+    heading = f"{len(jobs)} roles matching &quot;{html.escape(query)}&quot;" if query else "Open roles"
+    body = (
+        f'<form id="search-form" action="/search" method="get">'
+        f'<input id="q" name="q" placeholder="Search roles" value="{value}">'
+        f'<button id="search-button" type="submit">Search</button></form>'
+        f'<h1>{heading}</h1><ul id="jobs">{items}</ul><nav class="pagination">{pagination}</nav>'
+    )
+    return PAGE.format(title="Fixture Jobs", body=body)
+
+
+def render_job(job_id):
+    j = fixture_job(job_id)
+    body = (
+        f'<h1 class="job-title">{j["title"]}</h1><p class="company">{j["company"]}</p>'
+        f'<p class="location">{j["location"]}</p><p>Build and ship things.</p>'
+        f'<a id="apply" href="/jobs/{job_id}/apply">Apply now</a> '
+        f'<a id="back" href="/">Back to jobs</a>'
+    )
+    return PAGE.format(title=j["title"], body=body)
+
+
+def render_apply_form(job_id, error=None):
+    j = fixture_job(job_id)
+    body = (
+        f'<h1 class="job-title">Apply: {j["title"]} at {j["company"]}</h1>'
+        + (f'<p id="form-error">{html.escape(error)}</p>' if error else "")
+        + f'<form id="application" action="/jobs/{job_id}/apply" method="post">'
+        f'<label>Name <input id="name" name="name"></label>'
+        f'<label>Email <input id="email" name="email" type="email"></label>'
+        f'<label>Cover letter <textarea id="cover-letter" name="cover_letter"></textarea></label>'
+        f'<button id="submit-application" type="submit">Submit application</button></form>'
+        f'<a id="back" href="/jobs/{job_id}">Back to the role</a>'
+    )
+    return PAGE.format(title=f"Apply - {j['title']}", body=body)
+
+
+def render_applied(job_id):
+    j = fixture_job(job_id)
+    body = (
+        f'<h1 id="confirmation">Application received</h1>'
+        f'<p>Thanks for applying to {j["title"]} at {j["company"]}.</p><a id="back" href="/">Back to jobs</a>'
+    )
+    return PAGE.format(title="Application received", body=body)
+
+
+def _job_id(path, suffix=""):
+    """The job id in /jobs/<id><suffix>, or None."""
+    if not (path.startswith("/jobs/") and path.endswith(suffix)):
+        return None
+    value = path[6:len(path) - len(suffix)]
+    if value.isdigit() and 1 <= int(value) <= JOB_COUNT:
+        return int(value)
+    return None
+
+
+# A chat box like the brain playground's: the send button only enables once
+# the page has seen an input event, as with a React-controlled textarea
+PLAYGROUND = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Playground</title></head>
+<body>
+<textarea id="prompt" rows="10" cols="80"></textarea>
+<button id="send" disabled>Send</button>
+<script>
+  const box = document.getElementById('prompt');
+  box.addEventListener('input', () => {
+    document.getElementById('send').disabled = box.value.trim() === '';
+  });
+</script>
+</body></html>"""
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients can reuse connections
+
+    def log_message(self, *args):
+        pass  # Keep benchmark output clean
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8"):
+        data = body.encode("utf-8")
+        # Pages carry an ETag like a real board's, so conditional GETs get a 304
+        etag = f'"{hashlib.blake2b(data, digest_size=8).hexdigest()}"'
+        if status == 200 and self.command == "GET" and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if status == 200:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _page(self, query):
+        try:
+            return int(query.get("page", ["1"])[0])
+        except ValueError:
+            return 1
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path, query = url.path, parse_qs(url.query)
+        if path == "/":
+            self._send(200, render_listing(self._page(query)))
+        elif path == "/search":
+            self._send(200, render_listing(self._page(query), query.get("q", [""])[0].strip() or None))
+        elif _job_id(path) is not None:
+            self._send(200, render_job(_job_id(path)))
+        elif _job_id(path, "/apply") is not None:
+            self._send(200, render_apply_form(_job_id(path, "/apply")))
+        elif _job_id(path, "/applied") is not None:
+            self._send(200, render_applied(_job_id(path, "/applied")))
+        elif path == "/playground":
+            self._send(200, PLAYGROUND)
+        elif path == "/api/featured":
+            time.sleep(API_DELAY)
+            self._send(200, json.dumps([fixture_job(i) for i in (1, 2, 3)]), "application/json")
+        else:
+            self._send(404, "<h1>Not found</h1>")
+
+    def do_POST(self):
+        job_id = _job_id(urlsplit(self.path).path, "/apply")
+        if job_id is None:
+            self._send(404, "<h1>Not found</h1>")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+        if not form.get("name") or "@" not in form.get("email", ""):
+            self._send(400, render_apply_form(job_id, error="Please enter your name and a valid email."))
+            return
+        with self.server.applications_lock:
+            self.server.applications.append({"job_id": job_id, **form})
+        # Post/redirect/get, like a real board
+        self.send_response(303)
+        self.send_header("Location", f"/jobs/{job_id}/applied")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def start_fixture_site(port=0):
+    """Starts the fixture site on a background thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+    server.daemon_threads = True
+    server.applications = []  # Every accepted application form, in order
+    server.applications_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True, name="fixture-site").start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server, url = start_fixture_site(args.port)
+    print(f"[*] Fixture job site running at {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
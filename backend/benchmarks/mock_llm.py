@@ -0,0 +1,132 @@
+"""
+Local mock LLM server for offline runs of the orchestrator and benchmarks.
+
+Speaks the OpenAI chat completions protocol (streamed or not) from the
+stdlib HTTP server. Replies with a JSON action picked from the prompt by a
+tiny scripted policy, streamed a few characters at a time, followed by some
+trailing chatter - the part BrainClient's early stop skips.
+
+Policy: on a job listing, a plan to scroll and click the first job link; on a job page, done;
+otherwise scroll. Any other prompt (coding mode) gets a short text reply.
+
+Usage:
+    python benchmarks/mock_llm.py [--port 8766] [--first-token-ms 300] [--fail-every 0]
+    BRAIN_MODE=api BRAIN_API_URL=http://127.0.0.1:8766/v1/chat/completions python orchestrator.py
+"""
+import re
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+CHUNK_CHARS = 4  # roughly one token per streamed chunk
+TRAILING_TEXT = (
+    "\n\nI picked this action because it moves the task forward: the element is visible, "
+    "its selector is in the list, and nothing on the page suggests the task is finished yet."
+)
+
+
+def choose_action(prompt):
+    """The scripted policy: returns a JSON action for an observation prompt, or None."""
+    if "AVAILABLE INTERACTIVE ELEMENTS" not in prompt and "PAGE UPDATE" not in prompt:
+        return None
+    url = re.search(r"URL: (\S+)", prompt)
+    if url and re.search(r"/jobs/\d+", url.group(1)):
+        return {"action": "done", "reason": "Reached a job page"}
+    link = re.search(r'selector: "([^"]*job-link[^"]*)"', prompt)
+    if link:
+        # A two-step plan: the link must still be there after scrolling
+        return {"plan": [{"action": "scroll"},
+                         {"action": "click", "selector": link.group(1), "expect": {"selector": link.group(1)}}]}
+    return {"action": "scroll"}
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients can reuse connections
+
+    def log_message(self, *args):
+        pass  # Keep benchmark output clean
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+            return self._send_json(404, {"error": "not found"})
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            count = server.requests
+        if server.fail_every and count % server.fail_every == 0:
+            return self._send_json(503, {"error": "simulated overload"})
+
+        prompt = (body.get("messages") or [{}])[-1].get("content", "")
+        action = choose_action(prompt)
+        reply = json.dumps(action) + TRAILING_TEXT if action else "OK - nothing to change."
+        time.sleep(server.first_token_ms / 1000)
+
+        if not body.get("stream"):
+            time.sleep(server.token_ms / 1000 * (len(reply) // CHUNK_CHARS))  # generation time
+            return self._send_json(200, {
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}]
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i in range(0, len(reply), CHUNK_CHARS):
+                delta = {"choices": [{"index": 0, "delta": {"content": reply[i:i + CHUNK_CHARS]}}]}
+                self._write_chunk(f"data: {json.dumps(delta)}\n\n")
+                time.sleep(server.token_ms / 1000)
+            self._write_chunk("data: [DONE]\n\n")
+            self._write_chunk("")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client stopped reading early
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # Clients drop connections after an early stop; that's expected
+
+
+def start_mock_llm(port=0, first_token_ms=300, token_ms=20, fail_every=0):
+    """Starts the mock LLM on a background thread. Returns (server, chat_completions_url)."""
+    server = MockLLMServer(("127.0.0.1", port), MockLLMHandler)
+    server.first_token_ms = first_token_ms
+    server.token_ms = token_ms
+    server.fail_every = fail_every  # answer every Nth request with a 503
+    server.requests = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True, name="mock-llm").start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--first-token-ms", type=int, default=300)
+    parser.add_argument("--token-ms", type=int, default=20)
+    parser.add_argument("--fail-every", type=int, default=0)
+    args = parser.parse_args()
+    server, url = start_mock_llm(args.port, args.first_token_ms, args.token_ms, args.fail_every)
+    print(f"[*] Mock LLM running at {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,166 @@
+"""
+Direct-API brain: an OpenAI-compatible chat completions client.
+
+Used instead of driving the Outlier playground when BRAIN_MODE=api. One
+requests.Session keeps HTTP connections alive between steps, replies are
+streamed and the stream is closed as soon as a complete JSON object has
+arrived, and every call is bounded by connect/read timeouts and an overall
+deadline, with retries on connection errors, 429 and 5xx. Works against any OpenAI-compatible
+endpoint - Gemini's by default, or benchmarks/mock_llm.py offline.
+"""
+import os
+import json
+import time
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.json_stream import JsonScanner
+
+BRAIN_MODE = os.getenv("BRAIN_MODE", "browser").lower()  # 'browser' or 'api'
+BRAIN_API_URL = os.getenv(
+    "BRAIN_API_URL", "https://generativelanguage.googleapis.com/v1beta/openai/chat/completions"
+)
+BRAIN_API_MODEL = os.getenv("BRAIN_API_MODEL", "gemini-2.5-flash")
+BRAIN_CONNECT_TIMEOUT = float(os.getenv("BRAIN_CONNECT_TIMEOUT", "5"))
+BRAIN_READ_TIMEOUT = float(os.getenv("BRAIN_READ_TIMEOUT", "30"))  # max silence between streamed chunks
+BRAIN_TOTAL_TIMEOUT = float(os.getenv("BRAIN_TOTAL_TIMEOUT", "90"))  # max time for a whole call, retries included
+BRAIN_MAX_RETRIES = int(os.getenv("BRAIN_MAX_RETRIES", "2"))
+RETRY_BACKOFF = 0.5  # seconds, doubled on each retry
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class BrainAPIError(Exception):
+    """The brain API failed after all retries, or answered with a non-retryable error."""
+
+
+class BrainClient:
+    """
+    Chat-completions client with per-agent conversations.
+    Thread-safe: agents call it concurrently, each on its own conversation.
+    """
+    def __init__(self, url=BRAIN_API_URL, api_key=None, model=BRAIN_API_MODEL,
+                 connect_timeout=BRAIN_CONNECT_TIMEOUT, read_timeout=BRAIN_READ_TIMEOUT,
+                 total_timeout=BRAIN_TOTAL_TIMEOUT, max_retries=BRAIN_MAX_RETRIES, pool_size=10):
+        self.url = url
+        self.api_key = api_key if api_key is not None else (os.getenv("BRAIN_API_KEY") or os.getenv("GEMINI_API_KEY"))
+        self.model = model
+        self.timeout = (connect_timeout, read_timeout)
+        self.total_timeout = total_timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        # Retries are handled per request below, where a half-read stream can be retried too
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Content-Type"] = "application/json"
+        if self.api_key:
+            self.session.headers["Authorization"] = f"Bearer {self.api_key}"
+        self._conversations = {}  # agent_id -> list of chat messages
+        self._lock = threading.Lock()
+        self._local = threading.local()  # last_timings is per calling thread
+
+    def ask(self, prompt, conversation=None, new_conversation=True, stop_on_json=True):
+        """
+        Sends `prompt` and returns the reply. With stop_on_json the reply is the
+        first complete JSON object (as a string), or the whole text if it has none.
+        With a `conversation` key the exchange is kept so the next call can continue it.
+        """
+        with self._lock:
+            if new_conversation or conversation not in self._conversations:
+                history = []
+            else:
+                history = self._conversations[conversation]
+        messages = history + [{"role": "user", "content": prompt}]
+
+        reply = self._complete(messages, stop_on_json)
+        if conversation is not None:
+            with self._lock:
+                self._conversations[conversation] = messages + [{"role": "assistant", "content": reply}]
+        return reply
+
+    @property
+    def last_timings(self):
+        """Timings of this thread's last call: first_token_ms, total_ms, early_stop."""
+        return getattr(self._local, "timings", {})
+
+    def has_conversation(self, conversation):
+        with self._lock:
+            return conversation in self._conversations
+
+    def end_conversation(self, conversation):
+        with self._lock:
+            self._conversations.pop(conversation, None)
+
+    def _complete(self, messages, stop_on_json):
+        payload = {"model": self.model, "messages": messages, "stream": True, "temperature": 0}
+        delay = RETRY_BACKOFF
+        # The read timeout only bounds the silence between chunks; this bounds the whole call
+        deadline = time.monotonic() + self.total_timeout
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._stream(payload, stop_on_json, deadline)
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                error = e
+            except requests.HTTPError as e:
+                if e.response.status_code not in RETRY_STATUSES:
+                    raise BrainAPIError(f"Brain API returned {e.response.status_code}: {e.response.text[:200]}")
+                error = e
+            if attempt < self.max_retries:
+                if time.monotonic() + delay >= deadline:
+                    raise BrainAPIError(f"Brain API gave no reply within {self.total_timeout}s: {error}")
+                time.sleep(delay)
+                delay *= 2
+        raise BrainAPIError(f"Brain API failed after {self.max_retries + 1} attempts: {error}")
+
+    def _stream(self, payload, stop_on_json, deadline):
+        """
+        One streamed request. Closes the stream early once a JSON object is complete,
+        and aborts it with BrainAPIError once `deadline` (time.monotonic()) has passed.
+        """
+        start = time.perf_counter()
+        first_token = None
+        scanner = JsonScanner()
+        with self.session.post(self.url, json=payload, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if time.monotonic() > deadline:
+                    # Leaving the with-block closes the connection
+                    raise BrainAPIError(f"Brain API reply still streaming after {self.total_timeout}s")
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    event = json.loads(data)
+                except ValueError:
+                    raise BrainAPIError(f"Brain API sent a malformed stream chunk: {data[:200]}")
+                choices = (event.get("choices") if isinstance(event, dict) else None) or [{}]
+                chunk = (choices[0].get("delta") or {}).get("content") or ""
+                if not chunk:
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter()
+                if not stop_on_json:
+                    scanner.text += chunk
+                    continue
+                obj = scanner.feed(chunk)
+                if obj is not None:
+                    # Leaving the with-block closes the connection instead of reading the rest
+                    self._record_timings(start, first_token, early_stop=True)
+                    return json.dumps(obj)
+        self._record_timings(start, first_token, early_stop=False)
+        return scanner.text.strip()
+
+    def _record_timings(self, start, first_token, early_stop):
+        end = time.perf_counter()
+        self._local.timings = {
+            "first_token_ms": round((first_token - start) * 1000, 1) if first_token else None,
+            "total_ms": round((end - start) * 1000, 1),
+            "early_stop": early_stop,
+        }
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,194 @@
+"""
+Warm pool of JobSurfer browsers.
+
+Chrome instances are launched ahead of time, each in its own profile slot,
+and leased to tasks. Instances are health-checked on lease and periodically
+while idle, recycled after too many navigations or too much memory, and
+replaced in the background when they crash - so a new task starts on an
+already-running browser.
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", os.getenv("MAX_CONCURRENT_AGENTS", "3")))
+BROWSER_MAX_NAVIGATIONS = int(os.getenv("BROWSER_MAX_NAVIGATIONS", "200"))
+BROWSER_MAX_RSS_MB = int(os.getenv("BROWSER_MAX_RSS_MB", "1500"))
+BROWSER_HEALTH_INTERVAL = float(os.getenv("BROWSER_HEALTH_INTERVAL", "30"))
+RELAUNCH_DELAY = 5  # seconds before retrying a slot whose launch failed
+
+
+def browser_rss_mb(surfer):
+    """Resident memory of the surfer's Chrome (and its child processes) in MB, or None if unknown."""
+    pid = getattr(surfer.driver, "browser_pid", None)
+    if not pid:
+        return None
+    try:
+        if psutil:
+            proc = psutil.Process(pid)
+            rss = proc.memory_info().rss + sum(
+                child.memory_info().rss for child in proc.children(recursive=True)
+            )
+            return rss / (1024 * 1024)
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except Exception:
+        return None
+    return None
+
+
+class BrowserPool:
+    """Leases pre-launched, profile-isolated browsers to tasks."""
+    def __init__(self, factory, size=BROWSER_POOL_SIZE, max_navigations=BROWSER_MAX_NAVIGATIONS,
+                 max_rss_mb=BROWSER_MAX_RSS_MB, health_interval=BROWSER_HEALTH_INTERVAL):
+        self.factory = factory  # factory(slot) -> JobSurfer
+        self.size = size
+        self.max_navigations = max_navigations
+        self.max_rss_mb = max_rss_mb
+        self.health_interval = health_interval
+        self._idle = []
+        self._leased = set()
+        self._cond = threading.Condition()
+        self._started = False
+        self._closed = False
+
+    def start(self):
+        """Launches every slot in the background. Safe to call more than once."""
+        with self._cond:
+            if self._started:
+                return
+            self._started = True
+        print(f"[*] Warming browser pool ({self.size} instances)...")
+        for slot in range(self.size):
+            self._launch_async(slot)
+        threading.Thread(target=self._health_loop, daemon=True, name="browser-health").start()
+
+    def _launch_async(self, slot, delay=0):
+        def launch():
+            if delay:
+                time.sleep(delay)
+            if self._closed:
+                return
+            try:
+                surfer = self.factory(slot)
+                surfer.pool_slot = slot
+            except Exception as e:
+                print(f"[!] Browser slot {slot} failed to launch: {e}. Retrying in {RELAUNCH_DELAY}s")
+                self._launch_async(slot, delay=RELAUNCH_DELAY)
+                return
+            with self._cond:
+                if self._closed:
+                    surfer.close()
+                    return
+                self._idle.append(surfer)
+                self._cond.notify()
+
+        threading.Thread(target=launch, daemon=True, name=f"browser-launch-{slot}").start()
+
+    def acquire(self, timeout=120):
+        """Leases a healthy browser, waiting up to `timeout` seconds for one to free up."""
+        self.start()
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                while not self._idle:
+                    if self._closed:
+                        raise RuntimeError("Browser pool is closed")
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("No browser available in the pool")
+                    self._cond.wait(remaining)
+                surfer = self._idle.pop()
+                self._leased.add(surfer)
+
+            if self.is_healthy(surfer):
+                # Frame de-duplication must not carry over from the previous lease
+                surfer.screenshots.reset()
+                return surfer
+            self._retire(surfer, "failed health check")
+
+    def release(self, surfer):
+        """Returns a leased browser, recycling it if it is worn out or broken."""
+        with self._cond:
+            self._leased.discard(surfer)
+            closed = self._closed
+        if closed:
+            surfer.close()
+            return
+        reason = self.recycle_reason(surfer)
+        if reason:
+            self._retire(surfer, reason)
+            return
+        with self._cond:
+            self._idle.append(surfer)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout=120):
+        surfer = self.acquire(timeout)
+        try:
+            yield surfer
+        finally:
+            self.release(surfer)
+
+    def is_healthy(self, surfer):
+        """Driver responds to a script and current_url is readable."""
+        try:
+            return surfer.driver.execute_script("return 1") == 1 and surfer.driver.current_url is not None
+        except Exception:
+            return False
+
+    def recycle_reason(self, surfer):
+        if getattr(surfer, "navigations", 0) >= self.max_navigations:
+            return f"{surfer.navigations} navigations"
+        rss = browser_rss_mb(surfer)
+        if rss is not None and rss > self.max_rss_mb:
+            return f"RSS {rss:.0f} MB"
+        if not self.is_healthy(surfer):
+            return "failed health check"
+        return None
+
+    def _retire(self, surfer, reason):
+        """Closes a browser and launches its replacement in the background."""
+        slot = getattr(surfer, "pool_slot", 0)
+        print(f"[*] Recycling browser slot {slot} ({reason})")
+        with self._cond:
+            self._leased.discard(surfer)
+        try:
+            surfer.close()
+        except Exception:
+            pass  # Already dead
+        self._launch_async(slot)
+
+    def _health_loop(self):
+        while not self._closed:
+            time.sleep(self.health_interval)
+            with self._cond:
+                to_check, self._idle = self._idle, []
+            for surfer in to_check:
+                if self.is_healthy(surfer):
+                    with self._cond:
+                        self._idle.append(surfer)
+                        self._cond.notify()
+                else:
+                    self._retire(surfer, "crashed while idle")
+
+    def close(self):
+        """Quits idle browsers now; leased ones are quit when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for surfer in idle:
+            try:
+                surfer.close()
+            except Exception:
+                pass
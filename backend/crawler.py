@@ -0,0 +1,244 @@
+"""
+Scouting crawler: walks the listing pages of job boards and streams the
+postings it finds into the jobs table, without the brain or a browser.
+
+Pages are fetched concurrently on an asyncio event loop. The HTTP itself
+is PageFetcher's (pooled keep-alive connections, conditional GETs), run on
+a thread pool since requests blocks; parsing runs there too. Each host
+gets at most CRAWL_HOST_CONCURRENCY requests in flight, spaced at least
+1 / CRAWL_HOST_RATE seconds apart, and robots.txt is honoured. Postings
+are extracted with fetcher.parse_listings, and pagination is followed
+through fetcher.pagination_links up to CRAWL_MAX_PAGES pages per board.
+Results go to db.add_jobs in batches of CRAWL_BATCH_SIZE as they arrive.
+
+Boards that only render their listings in JavaScript are skipped; the surf
+loop handles those.
+
+Usage:
+    python crawler.py https://board.example/jobs [more board URLs...]
+    (or set CRAWL_BOARDS, comma-separated)
+    POST /control {"command": "crawl", "boards": ["https://board.example/jobs"]}
+"""
+import os
+import sys
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from fetcher import PageFetcher, parse_page, parse_listings, pagination_links, needs_javascript
+from metrics import Counter
+
+CRAWL_BOARDS = [url.strip() for url in os.getenv("CRAWL_BOARDS", "").split(",") if url.strip()]
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "16"))  # pages in flight across all hosts
+CRAWL_HOST_CONCURRENCY = int(os.getenv("CRAWL_HOST_CONCURRENCY", "2"))  # pages in flight per host
+CRAWL_HOST_RATE = float(os.getenv("CRAWL_HOST_RATE", "2"))  # requests per second per host
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "50"))  # listing pages per board
+CRAWL_BATCH_SIZE = int(os.getenv("CRAWL_BATCH_SIZE", "100"))  # jobs per database write
+CRAWL_RESPECT_ROBOTS = os.getenv("CRAWL_RESPECT_ROBOTS", "true").lower() == "true"
+
+CRAWL_PAGES = Counter("xapply_crawl_pages", "Listing pages visited by the crawler", ("result",))
+CRAWL_JOBS = Counter("xapply_crawl_jobs", "Job postings found by the crawler")
+
+
+def print_log(message, level="info"):
+    print(f"[{'*' if level == 'info' else '!'}] {message}")
+
+
+class HostLimiter:
+    """Per-host concurrency cap plus a minimum spacing between request starts."""
+    def __init__(self, concurrency, rate):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        async with self.lock:
+            now = time.monotonic()
+            wait = self.next_start - now
+            self.next_start = max(now, self.next_start) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+        return False
+
+
+class Crawler:
+    """One crawl of a set of boards. Create a new one per crawl."""
+    def __init__(self, db, fetcher=None, concurrency=CRAWL_CONCURRENCY, host_concurrency=CRAWL_HOST_CONCURRENCY,
+                 host_rate=CRAWL_HOST_RATE, max_pages=CRAWL_MAX_PAGES, batch_size=CRAWL_BATCH_SIZE,
+                 respect_robots=CRAWL_RESPECT_ROBOTS, should_stop=None, log=print_log):
+        self.db = db
+        # One pool per host, each as large as the most requests that can be in flight to it
+        self.fetcher = fetcher or PageFetcher(pool_size=max(concurrency, host_concurrency, 1))
+        self.concurrency = concurrency
+        self.host_concurrency = host_concurrency
+        self.host_rate = host_rate
+        self.max_pages = max_pages
+        self.batch_size = batch_size
+        self.respect_robots = respect_robots
+        self.should_stop = should_stop or (lambda: False)
+        self.log = log  # log(message, level="info")
+        self.stats = {"pages": 0, "not_modified": 0, "skipped": 0, "errors": 0, "jobs": 0,
+                      "inserted": 0, "updated": 0}
+        self._limiters = {}
+        self._robots = {}
+        self._board_pages = {}  # board -> pages queued so far
+        self._seen = set()
+        self._pending = []  # jobs waiting for the next batch write
+        self._executor = None
+
+    def run(self, boards):
+        """Crawls `boards` to completion (or until should_stop()) and returns the stats."""
+        return asyncio.run(self.crawl(boards))
+
+    async def crawl(self, boards):
+        started = time.perf_counter()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="crawl")
+        queue = asyncio.Queue()
+        for board in boards:
+            self._enqueue(queue, board, board)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        try:
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await self._flush(force=True)
+            self._executor.shutdown(wait=False)
+        self.stats["seconds"] = round(time.perf_counter() - started, 2)
+        self.stats["stopped"] = bool(self.should_stop())
+        return self.stats
+
+    def _enqueue(self, queue, url, board):
+        if url in self._seen or self._board_pages.get(board, 0) >= self.max_pages:
+            return
+        self._seen.add(url)
+        self._board_pages[board] = self._board_pages.get(board, 0) + 1
+        queue.put_nowait((url, board))
+
+    async def _worker(self, queue):
+        while True:
+            url, board = await queue.get()
+            try:
+                if not self.should_stop():
+                    await self._visit(queue, url, board)
+            except Exception as e:
+                self.stats["errors"] += 1
+                CRAWL_PAGES.inc(result="error")
+                self.log(f"Crawl of {url} failed: {e}", level="warning")
+            finally:
+                queue.task_done()
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _limiter(self, host):
+        if host not in self._limiters:
+            self._limiters[host] = HostLimiter(self.host_concurrency, self.host_rate)
+        return self._limiters[host]
+
+    async def _allowed(self, url):
+        if not self.respect_robots:
+            return True
+        parts = urlsplit(url)
+        if parts.netloc not in self._robots:
+            # One fetch per host; every worker awaits the same task
+            self._robots[parts.netloc] = asyncio.ensure_future(self._load_robots(parts.scheme, parts.netloc))
+        robots = await self._robots[parts.netloc]
+        return robots.can_fetch(self.fetcher.user_agent, url)
+
+    async def _load_robots(self, scheme, host):
+        robots = RobotFileParser()
+        lines = []
+        try:
+            async with self._limiter(host):
+                page = await self._run(self.fetcher.get, f"{scheme}://{host}/robots.txt")
+            if page["status"] == 200:
+                lines = page["html"].splitlines()
+        except requests.RequestException:
+            pass  # No robots.txt to honour
+        robots.parse(lines)
+        return robots
+
+    async def _visit(self, queue, url, board):
+        if not await self._allowed(url):
+            self.stats["skipped"] += 1
+            CRAWL_PAGES.inc(result="disallowed")
+            return
+        async with self._limiter(urlsplit(url).netloc):
+            page = await self._run(self.fetcher.get, url)
+        soup, observation = await self._run(parse_page, page["html"], page["url"])
+        reason = needs_javascript(page, soup, observation)
+        if page["status"] != 200 or reason:
+            self.stats["skipped"] += 1
+            CRAWL_PAGES.inc(result="skipped")
+            self.log(f"Crawl skipped {url}: {reason or 'HTTP ' + str(page['status'])}", level="warning")
+            return
+
+        self.stats["pages"] += 1
+        for link in pagination_links(soup, page["url"]):
+            self._enqueue(queue, link, board)
+        # A 304 only means the fetcher has the page cached - the surfer agents share that
+        # cache, so its postings may never have been stored. add_jobs upserts them either way.
+        if page["not_modified"]:
+            self.stats["not_modified"] += 1
+            CRAWL_PAGES.inc(result="not_modified")
+        else:
+            CRAWL_PAGES.inc(result="ok")
+        jobs = parse_listings(soup, page["url"])
+        self.stats["jobs"] += len(jobs)
+        CRAWL_JOBS.inc(len(jobs))
+        self._pending.extend(jobs)
+        await self._flush()
+
+    async def _flush(self, force=False):
+        if not self._pending or (len(self._pending) < self.batch_size and not force):
+            return
+        batch, self._pending = self._pending, []
+        result = await self._run(self.db.add_jobs, batch)
+        self.stats["inserted"] += result["inserted"]
+        self.stats["updated"] += result["updated"]
+        self.log(f"Crawl stored {len(batch)} jobs ({result['inserted']} new), {self.stats['pages']} pages so far")
+
+
+def start_crawl(db, boards, should_stop=None, log=print_log, on_done=None, **options):
+    """Runs a crawl on a background thread; on_done(stats) is called when it finishes. Returns the thread."""
+    def run():
+        stats = None
+        try:
+            stats = Crawler(db, should_stop=should_stop, log=log, **options).run(boards)
+            log(f"Crawl finished: {stats}")
+        except Exception as e:
+            log(f"Crawl failed: {e}", level="error")
+        finally:
+            if on_done:
+                on_done(stats)
+    thread = threading.Thread(target=run, name="crawler", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    from database import Database, init_db, close_pool
+
+    boards = sys.argv[1:] or CRAWL_BOARDS
+    if not boards:
+        sys.exit("Usage: python crawler.py <board listing URL>... (or set CRAWL_BOARDS)")
+    init_db()
+    try:
+        print(f"[*] Crawling {len(boards)} board(s)")
+        stats = Crawler(Database()).run(boards)
+        print(f"[*] Done: {stats}")
+    finally:
+        close_pool()
@@ -2,188 +2,935 @@ import sqlite3
 import json
 import os
 import time
+import queue
+import threading
+from itertools import islice
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from metrics import Histogram
 
 DB_DIR = os.path.join(os.path.dirname(__file__), "data")
-DB_PATH = os.path.join(DB_DIR, "xapply.db")
+DB_PATH = os.getenv("XAPPLY_DB_PATH", os.path.join(DB_DIR, "xapply.db"))
+DB_POOL_SIZE = int(os.getenv("XAPPLY_DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = 30  # seconds to wait for a free connection when the pool is exhausted
+JOBS_PAGE_MAX = 500
+JOBS_BATCH_SIZE = 500
 
-class Database:
-    def __init__(self):
-        os.makedirs(DB_DIR, exist_ok=True)
-        self.conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
-        self._init_schema()
-
-    def _init_schema(self):
-        """Creates tables if they don't exist."""
-        cursor = self.conn.cursor()
-        
-        # Users table - stores profile as JSON blob for flexibility
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                profile_json TEXT NOT NULL,
-                has_onboarded INTEGER DEFAULT 0,
-                created_at REAL,
-                updated_at REAL
-            )
-        """)
-        
-        # Jobs table - stores job history
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS jobs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                url TEXT,
-                title TEXT,
-                company TEXT,
-                location TEXT,
-                status TEXT DEFAULT 'scouted',
-                scouted_at REAL,
-                applied_at REAL
-            )
-        """)
-        
-        # Auth tokens table - stores OTP codes
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS auth_tokens (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT NOT NULL,
-                otp_code TEXT NOT NULL,
-                expires_at REAL NOT NULL,
-                used INTEGER DEFAULT 0,
-                created_at REAL
-            )
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+DB_CALL_SECONDS = Histogram("xapply_db_call_seconds", "Time per Database method call", ("method",), buckets=DB_BUCKETS)
+DB_POOL_WAIT_SECONDS = Histogram("xapply_db_pool_wait_seconds", "Time spent waiting for a connection when the pool is exhausted",
+                                 buckets=DB_BUCKETS)
+
+# Query params that never change which job a URL points at
+TRACKING_PARAMS = {"ref", "source", "src", "fbclid", "gclid", "trk", "trackingid"}
+
+
+def canonical_url(url):
+    """
+    Normalises a job URL into the key used for de-duplication:
+    lowercase scheme/host, no fragment, no tracking params, sorted query,
+    no trailing slash. Returns None for empty URLs.
+    """
+    url = (url or "").strip()
+    if not url:
+        return None
+    parts = urlsplit(url)
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+def _init_schema(conn):
+    """Creates tables if they don't exist."""
+    cursor = conn.cursor()
+    
+    # Users table - stores profile as JSON blob for flexibility
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            profile_json TEXT NOT NULL,
+            has_onboarded INTEGER DEFAULT 0,
+            created_at REAL,
+            updated_at REAL
+        )
+    """)
+    
+    # Jobs table - stores job history
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT,
+            title TEXT,
+            company TEXT,
+            location TEXT,
+            status TEXT DEFAULT 'scouted',
+            scouted_at REAL,
+            applied_at REAL,
+            url_key TEXT
+        )
+    """)
+    _migrate_job_url_keys(conn)
+    
+    # Auth tokens table - stores OTP codes
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS auth_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL,
+            otp_code TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            used INTEGER DEFAULT 0,
+            created_at REAL
+        )
+    """)
+    
+    # Brain decision cache - one action per (task, normalised observation)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS decision_cache (
+            key TEXT PRIMARY KEY,
+            url TEXT,
+            decision TEXT NOT NULL,
+            hits INTEGER DEFAULT 0,
+            created_at REAL,
+            last_used_at REAL
+        )
+    """)
+    
+    # Parsed resumes by file hash + extraction prompt version
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resume_cache (
+            content_hash TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            profile_json TEXT NOT NULL,
+            created_at REAL,
+            PRIMARY KEY (content_hash, prompt_version)
+        )
+    """)
+    
+    # Background resume parsing jobs; `data` holds the upload until the job finishes
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resume_jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'queued',
+            stage TEXT,
+            filename TEXT,
+            mime_type TEXT,
+            content_hash TEXT,
+            data BLOB,
+            result_json TEXT,
+            cached INTEGER DEFAULT 0,
+            error TEXT,
+            created_at REAL,
+            updated_at REAL
+        )
+    """)
+    
+    # Run ledger: one row per surfing run, one per observe / ask / act cycle
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS runs (
+            id TEXT PRIMARY KEY,
+            agent_id TEXT,
+            task TEXT,
+            status TEXT DEFAULT 'running',
+            actions INTEGER DEFAULT 0,
+            decisions INTEGER DEFAULT 0,
+            last_plan TEXT,
+            started_at REAL,
+            finished_at REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS run_steps (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            step INTEGER,
+            url TEXT,
+            fingerprint TEXT,
+            prompt_chars INTEGER,
+            cached INTEGER DEFAULT 0,
+            plan TEXT,
+            actions TEXT,
+            outcome TEXT,
+            success INTEGER,
+            capture_ms REAL,
+            brain_ms REAL,
+            execute_ms REAL,
+            created_at REAL
+        )
+    """)
+    
+    # State channel between the API and the agent worker when they run as separate processes
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS state_events (
+            seq INTEGER PRIMARY KEY,
+            kind TEXT,
+            frame TEXT,
+            created_at REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS state_snapshot (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            seq INTEGER,
+            state_json TEXT,
+            stats_json TEXT,
+            updated_at REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS state_frame (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            etag TEXT,
+            mime_type TEXT,
+            data BLOB,
+            updated_at REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS event_log (
+            seq INTEGER PRIMARY KEY,
+            ts REAL,
+            level TEXT,
+            agent TEXT,
+            message TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS control_commands (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            command TEXT NOT NULL,
+            payload_json TEXT,
+            created_at REAL
+        )
+    """)
+    
+    # Indexes for the /jobs listing (status filter + keyset on scouted_at, id)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_scouted ON jobs (status, scouted_at DESC, id DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_scouted ON jobs (scouted_at DESC, id DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_url ON jobs (url)")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_url_key ON jobs (url_key) WHERE url_key IS NOT NULL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_decision_cache_used ON decision_cache (last_used_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_decision_cache_created ON decision_cache (created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_resume_jobs_status ON resume_jobs (status, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started_at DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_run_steps_run ON run_steps (run_id, step)")
+    
+    conn.commit()
+    
+    # Ensure at least one user row exists (default profile)
+    cursor.execute("SELECT COUNT(*) FROM users")
+    if cursor.fetchone()[0] == 0:
+        default_profile = {
+            "personalInfo": {
+                "name": "",
+                "title": "",
+                "address": "",
+                "phone": "",
+                "email": ""
+            },
+            "summary": "",
+            "skills": [],
+            "experience": [],
+            "education": []
+        }
+        cursor.execute(
+            "INSERT INTO users (profile_json, has_onboarded, created_at, updated_at) VALUES (?, 0, ?, ?)",
+            (json.dumps(default_profile), time.time(), time.time())
+        )
+        conn.commit()
+
+
+def _migrate_job_url_keys(conn):
+    """
+    Adds jobs.url_key to databases created before URL de-duplication and
+    backfills it. Pre-existing duplicates keep a NULL key on all but the
+    oldest row so the unique index can be built without deleting history.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+    if "url_key" not in columns:
+        conn.execute("ALTER TABLE jobs ADD COLUMN url_key TEXT")
+        conn.create_function("canonical_url", 1, canonical_url, deterministic=True)
+        conn.execute("""
+            UPDATE jobs SET url_key = canonical_url(url)
+            WHERE id IN (SELECT MIN(id) FROM jobs GROUP BY canonical_url(url))
         """)
-        
-        self.conn.commit()
-        
-        # Ensure at least one user row exists (default profile)
-        cursor.execute("SELECT COUNT(*) FROM users")
-        if cursor.fetchone()[0] == 0:
-            default_profile = {
-                "personalInfo": {
-                    "name": "",
-                    "title": "",
-                    "address": "",
-                    "phone": "",
-                    "email": ""
-                },
-                "summary": "",
-                "skills": [],
-                "experience": [],
-                "education": []
-            }
-            cursor.execute(
-                "INSERT INTO users (profile_json, has_onboarded, created_at, updated_at) VALUES (?, 0, ?, ?)",
-                (json.dumps(default_profile), time.time(), time.time())
-            )
-            self.conn.commit()
+        conn.commit()
+
+
+# ========================
+# Connection Pool
+# ========================
+class ConnectionPool:
+    """
+    Process-wide pool of SQLite connections shared by the API threads and
+    the agent loop. The schema is initialised once, on the first connection.
+    """
+    def __init__(self, path=DB_PATH, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self._closed = False
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        conn.row_factory = sqlite3.Row
+        # WAL lets the API read while the agent loop writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._schema_ready:
+            _init_schema(conn)
+            self._schema_ready = True
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            if len(self._all) < self.size:
+                conn = self._connect()
+                self._all.append(conn)
+                return conn
+        # Pool exhausted - wait for another thread to hand one back
+        with DB_POOL_WAIT_SECONDS.time():
+            try:
+                return self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise TimeoutError(f"No database connection free after {self.timeout}s "
+                                   f"(all {self.size} are leased)") from None
+
+    @contextmanager
+    def connection(self):
+        """Leases a connection for the duration of the block."""
+        conn = self._acquire()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    def close(self):
+        """Closes every connection. Leased connections close when returned."""
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._all.clear()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Returns the process-wide connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = ConnectionPool()
+        return _pool
+
+def init_db():
+    """Runs schema init eagerly so the first request doesn't pay for it."""
+    pool = get_pool()
+    with pool.connection():
+        pass
+    return pool
+
+def close_pool():
+    """Closes the process-wide pool. Call once on shutdown."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def _encode_cursor(job: dict) -> str:
+    # Legacy rows may have no scouted_at; they sort last and are paged by id alone
+    scouted_at = "null" if job["scouted_at"] is None else repr(job["scouted_at"])
+    return f"{scouted_at}:{job['id']}"
+
+def _decode_cursor(cursor: str):
+    """Parses a /jobs cursor into (scouted_at or None, id). Raises ValueError if it is malformed."""
+    scouted_at, _, job_id = cursor.rpartition(":")
+    return (None if scouted_at == "null" else float(scouted_at)), int(job_id)
+
+
+def _instrument(cls):
+    """Times every public method as xapply_db_call_seconds{method=...}."""
+    for name, attr in list(vars(cls).items()):
+        if callable(attr) and not name.startswith("_"):
+            setattr(cls, name, DB_CALL_SECONDS.timed(method=name)(attr))
+    return cls
+
+
+@_instrument
+class Database:
+    def __init__(self, pool=None):
+        self.pool = pool or get_pool()
 
     # ========================
     # Profile Methods
     # ========================
     def get_profile(self):
         """Returns the user's profile as a dictionary."""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT profile_json FROM users WHERE id = 1")
-        row = cursor.fetchone()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT profile_json FROM users WHERE id = 1")
+            row = cursor.fetchone()
         if row:
             return json.loads(row["profile_json"])
         return {}
 
     def save_profile(self, profile_data: dict):
         """Saves the user's profile."""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "UPDATE users SET profile_json = ?, updated_at = ? WHERE id = 1",
-            (json.dumps(profile_data), time.time())
-        )
-        self.conn.commit()
+        with self.pool.connection() as conn:
+            conn.execute(
+                "UPDATE users SET profile_json = ?, updated_at = ? WHERE id = 1",
+                (json.dumps(profile_data), time.time())
+            )
+            conn.commit()
 
     def has_onboarded(self) -> bool:
         """Checks if the user has completed onboarding."""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT has_onboarded FROM users WHERE id = 1")
-        row = cursor.fetchone()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT has_onboarded FROM users WHERE id = 1")
+            row = cursor.fetchone()
         return bool(row["has_onboarded"]) if row else False
 
     def set_onboarded(self, status: bool = True):
         """Marks onboarding as complete."""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "UPDATE users SET has_onboarded = ?, updated_at = ? WHERE id = 1",
-            (1 if status else 0, time.time())
-        )
-        self.conn.commit()
+        with self.pool.connection() as conn:
+            conn.execute(
+                "UPDATE users SET has_onboarded = ?, updated_at = ? WHERE id = 1",
+                (1 if status else 0, time.time())
+            )
+            conn.commit()
 
     # ========================
     # Jobs Methods
     # ========================
     def get_jobs(self, status: str = None):
         """Returns jobs, optionally filtered by status."""
-        cursor = self.conn.cursor()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            if status:
+                cursor.execute("SELECT * FROM jobs WHERE status = ? ORDER BY scouted_at DESC", (status,))
+            else:
+                cursor.execute("SELECT * FROM jobs ORDER BY scouted_at DESC")
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_jobs_page(self, status: str = None, after: str = None, limit: int = 50):
+        """
+        Returns one keyset-paginated page of jobs, newest first.
+        `after` is the opaque cursor from the previous page. Returns (jobs, next_cursor);
+        next_cursor is None on the last page.
+        """
+        limit = max(1, min(int(limit), JOBS_PAGE_MAX))
+        clauses, params = [], []
         if status:
-            cursor.execute("SELECT * FROM jobs WHERE status = ? ORDER BY scouted_at DESC", (status,))
-        else:
-            cursor.execute("SELECT * FROM jobs ORDER BY scouted_at DESC")
-        return [dict(row) for row in cursor.fetchall()]
+            clauses.append("status = ?")
+            params.append(status)
+        if after:
+            scouted_at, job_id = _decode_cursor(after)
+            # SQLite sorts NULL lowest, so DESC puts rows without scouted_at after all the others
+            if scouted_at is None:
+                clauses.append("scouted_at IS NULL AND id < ?")
+                params.append(job_id)
+            else:
+                clauses.append("((scouted_at, id) < (?, ?) OR scouted_at IS NULL)")
+                params.extend([scouted_at, job_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT * FROM jobs {where} ORDER BY scouted_at DESC, id DESC LIMIT ?",
+                (*params, limit + 1)
+            )
+            rows = [dict(row) for row in cursor.fetchall()]
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1])
+        return rows, next_cursor
 
     def add_job(self, job_data: dict):
-        """Adds a new job to the database."""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            """INSERT INTO jobs (url, title, company, location, status, scouted_at)
-               VALUES (?, ?, ?, ?, 'scouted', ?)""",
-            (
-                job_data.get("url", ""),
-                job_data.get("title", ""),
-                job_data.get("company", ""),
-                job_data.get("location", ""),
-                time.time()
+        """Adds a job, or refreshes the existing row with the same canonical URL. Returns its id."""
+        key = canonical_url(job_data.get("url"))
+        if key:
+            self.add_jobs([job_data])
+            with self.pool.connection() as conn:
+                row = conn.execute("SELECT id FROM jobs WHERE url_key = ?", (key,)).fetchone()
+            return row["id"] if row else None
+        # Nothing to deduplicate on, so always a new row
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                """INSERT INTO jobs (url, title, company, location, status, scouted_at, url_key)
+                   VALUES (?, ?, ?, ?, 'scouted', ?, NULL)""",
+                (job_data.get("url", ""), job_data.get("title", ""), job_data.get("company", ""),
+                 job_data.get("location", ""), time.time())
             )
-        )
-        self.conn.commit()
-        return cursor.lastrowid
+            conn.commit()
+            return cursor.lastrowid
+
+    def add_jobs(self, jobs, batch_size: int = JOBS_BATCH_SIZE):
+        """
+        Bulk-ingests jobs in a single transaction, upserting on the canonical URL.
+        Accepts any iterable (including generators) and consumes it in batches,
+        so large scrape results never sit fully in memory.
+        Returns {"inserted": n, "updated": n}.
+        """
+        inserted = updated = 0
+        jobs = iter(jobs)
+        with self.pool.connection() as conn:
+            while True:
+                batch = list(islice(jobs, batch_size))
+                if not batch:
+                    break
+                
+                now = time.time()
+                rows = [
+                    (
+                        job.get("url", ""),
+                        job.get("title", ""),
+                        job.get("company", ""),
+                        job.get("location", ""),
+                        now,
+                        canonical_url(job.get("url"))
+                    )
+                    for job in batch
+                ]
+                
+                # Work out which keys already exist so we can report inserts vs updates
+                keys = {row[5] for row in rows if row[5]}
+                existing = set()
+                if keys:
+                    placeholders = ",".join("?" * len(keys))
+                    existing = {
+                        r[0] for r in conn.execute(
+                            f"SELECT url_key FROM jobs WHERE url_key IN ({placeholders})", tuple(keys)
+                        )
+                    }
+                seen = set()
+                for row in rows:
+                    key = row[5]
+                    if key and (key in existing or key in seen):
+                        updated += 1
+                    else:
+                        inserted += 1
+                    if key:
+                        seen.add(key)
+                
+                conn.executemany(
+                    """INSERT INTO jobs (url, title, company, location, status, scouted_at, url_key)
+                       VALUES (?, ?, ?, ?, 'scouted', ?, ?)
+                       ON CONFLICT (url_key) WHERE url_key IS NOT NULL DO UPDATE SET
+                           title = COALESCE(NULLIF(excluded.title, ''), jobs.title),
+                           company = COALESCE(NULLIF(excluded.company, ''), jobs.company),
+                           location = COALESCE(NULLIF(excluded.location, ''), jobs.location)""",
+                    rows
+                )
+            conn.commit()
+        return {"inserted": inserted, "updated": updated}
 
     def mark_applied(self, job_url: str):
         """Marks a job as applied."""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "UPDATE jobs SET status = 'applied', applied_at = ? WHERE url = ?",
-            (time.time(), job_url)
-        )
-        self.conn.commit()
+        with self.pool.connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'applied', applied_at = ? WHERE url_key = ? OR url = ?",
+                (time.time(), canonical_url(job_url), job_url)
+            )
+            conn.commit()
+
+    # ========================
+    # Decision Cache Methods
+    # ========================
+    def get_cached_decision(self, key: str, ttl: float):
+        """Returns the cached decision for `key` and marks it used, or None if absent or older than `ttl`."""
+        now = time.time()
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT decision, created_at FROM decision_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+            if row["created_at"] < now - ttl:
+                conn.execute("DELETE FROM decision_cache WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute(
+                "UPDATE decision_cache SET hits = hits + 1, last_used_at = ? WHERE key = ?", (now, key)
+            )
+            conn.commit()
+        return row["decision"]
+
+    def put_cached_decision(self, key: str, url: str, decision: str, ttl: float, max_entries: int):
+        """Stores a decision, then drops expired entries and the least recently used beyond `max_entries`."""
+        now = time.time()
+        with self.pool.connection() as conn:
+            conn.execute(
+                """INSERT INTO decision_cache (key, url, decision, hits, created_at, last_used_at)
+                   VALUES (?, ?, ?, 0, ?, ?)
+                   ON CONFLICT (key) DO UPDATE SET
+                       decision = excluded.decision, created_at = excluded.created_at,
+                       last_used_at = excluded.last_used_at""",
+                (key, url, decision, now, now)
+            )
+            conn.execute("DELETE FROM decision_cache WHERE created_at < ?", (now - ttl,))
+            conn.execute(
+                """DELETE FROM decision_cache WHERE key IN (
+                       SELECT key FROM decision_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                   )""",
+                (max_entries,)
+            )
+            conn.commit()
+
+    def delete_cached_decision(self, key: str):
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM decision_cache WHERE key = ?", (key,))
+            conn.commit()
+
+    def count_cached_decisions(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM decision_cache").fetchone()[0]
+
+    # ========================
+    # Resume Cache Methods
+    # ========================
+    def get_cached_resume(self, content_hash: str, prompt_version: str):
+        """Returns the profile parsed from this file with this prompt version, or None."""
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT profile_json FROM resume_cache WHERE content_hash = ? AND prompt_version = ?",
+                (content_hash, prompt_version)
+            ).fetchone()
+        return json.loads(row["profile_json"]) if row else None
+
+    def save_cached_resume(self, content_hash: str, prompt_version: str, profile: dict):
+        with self.pool.connection() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO resume_cache (content_hash, prompt_version, profile_json, created_at)
+                   VALUES (?, ?, ?, ?)""",
+                (content_hash, prompt_version, json.dumps(profile), time.time())
+            )
+            conn.commit()
+
+    # ========================
+    # Resume Job Methods
+    # ========================
+    def create_resume_job(self, job_id: str, data: bytes, content_hash: str, mime_type: str, filename: str = ""):
+        now = time.time()
+        with self.pool.connection() as conn:
+            conn.execute(
+                """INSERT INTO resume_jobs (id, status, stage, filename, mime_type, content_hash, data, created_at, updated_at)
+                   VALUES (?, 'queued', 'queued', ?, ?, ?, ?, ?, ?)""",
+                (job_id, filename, mime_type, content_hash, data, now, now)
+            )
+            conn.commit()
+
+    def get_resume_job(self, job_id: str, include_data: bool = False):
+        """Returns the job as a dict (result parsed, upload bytes only if asked for), or None."""
+        columns = "id, status, stage, filename, content_hash, mime_type, result_json, cached, error, created_at, updated_at"
+        if include_data:
+            columns += ", data"
+        with self.pool.connection() as conn:
+            row = conn.execute(f"SELECT {columns} FROM resume_jobs WHERE id = ?", (job_id,)).fetchone()
+        if not row:
+            return None
+        job = dict(row)
+        result_json = job.pop("result_json")
+        job["result"] = json.loads(result_json) if result_json else None
+        job["cached"] = bool(job["cached"])
+        return job
+
+    def update_resume_job(self, job_id: str, status: str = None, stage: str = None):
+        with self.pool.connection() as conn:
+            conn.execute(
+                """UPDATE resume_jobs SET status = COALESCE(?, status), stage = COALESCE(?, stage), updated_at = ?
+                   WHERE id = ?""",
+                (status, stage, time.time(), job_id)
+            )
+            conn.commit()
+
+    def finish_resume_job(self, job_id: str, result: dict = None, cached: bool = False, error: str = None):
+        """Marks a job done (with its result) or failed, and drops the stored upload."""
+        status = "error" if error else "done"
+        with self.pool.connection() as conn:
+            conn.execute(
+                """UPDATE resume_jobs SET status = ?, stage = ?, result_json = ?, cached = ?, error = ?,
+                       data = NULL, updated_at = ?
+                   WHERE id = ?""",
+                (status, status, json.dumps(result) if result is not None else None, 1 if cached else 0,
+                 error, time.time(), job_id)
+            )
+            conn.commit()
+
+    def get_unfinished_resume_jobs(self):
+        """Ids of jobs still queued or processing, oldest first."""
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT id FROM resume_jobs WHERE status IN ('queued', 'processing') ORDER BY created_at"
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    # ========================
+    # Run Ledger Methods
+    # ========================
+    def write_run_ledger(self, records, max_runs: int = 1000):
+        """
+        Writes a batch of ("run" | "step" | "finish", record) tuples from
+        RunLedger in one transaction, then prunes runs beyond the newest `max_runs`.
+        """
+        runs = [r for kind, r in records if kind == "run"]
+        steps = [r for kind, r in records if kind == "step"]
+        finishes = [r for kind, r in records if kind == "finish"]
+        with self.pool.connection() as conn:
+            if runs:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO runs (id, agent_id, task, started_at) VALUES (:id, :agent_id, :task, :started_at)",
+                    runs
+                )
+            if steps:
+                conn.executemany(
+                    """INSERT INTO run_steps (run_id, step, url, fingerprint, prompt_chars, cached, plan, actions,
+                                              outcome, success, capture_ms, brain_ms, execute_ms, created_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    [(s["run_id"], s.get("step"), s.get("url"), s.get("fingerprint"), s.get("prompt_chars"),
+                      1 if s.get("cached") else 0, s.get("plan"), json.dumps(s.get("actions") or []),
+                      s["outcome"], 1 if s["success"] else 0, s.get("capture_ms"), s.get("brain_ms"),
+                      s.get("execute_ms"), s["created_at"]) for s in steps]
+                )
+            if finishes:
+                conn.executemany(
+                    """UPDATE runs SET status = :status, actions = :actions, decisions = :decisions,
+                           last_plan = :last_plan, finished_at = :finished_at
+                       WHERE id = :id""",
+                    finishes
+                )
+                conn.execute(
+                    """DELETE FROM run_steps WHERE run_id IN (
+                           SELECT id FROM runs ORDER BY started_at DESC LIMIT -1 OFFSET ?
+                       )""",
+                    (max_runs,)
+                )
+                conn.execute(
+                    "DELETE FROM runs WHERE id IN (SELECT id FROM runs ORDER BY started_at DESC LIMIT -1 OFFSET ?)",
+                    (max_runs,)
+                )
+            conn.commit()
+
+    def get_runs(self, limit: int = 50, agent_id: str = None):
+        """Newest runs first, each with its step count and total capture / brain / execute time."""
+        sql = """SELECT r.id, r.agent_id, r.task, r.status, r.actions, r.decisions, r.started_at, r.finished_at,
+                        COUNT(s.id) AS steps, SUM(s.prompt_chars) AS prompt_chars, SUM(s.cached) AS cached,
+                        ROUND(SUM(s.capture_ms), 1) AS capture_ms, ROUND(SUM(s.brain_ms), 1) AS brain_ms,
+                        ROUND(SUM(s.execute_ms), 1) AS execute_ms
+                 FROM runs r LEFT JOIN run_steps s ON s.run_id = r.id"""
+        params = []
+        if agent_id:
+            sql += " WHERE r.agent_id = ?"
+            params.append(agent_id)
+        sql += " GROUP BY r.id ORDER BY r.started_at DESC LIMIT ?"
+        params.append(limit)
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_run(self, run_id: str):
+        """Returns the run with its steps in order, or None."""
+        with self.pool.connection() as conn:
+            run = conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+            if not run:
+                return None
+            steps = conn.execute(
+                """SELECT step, url, fingerprint, prompt_chars, cached, plan, actions, outcome, success,
+                          capture_ms, brain_ms, execute_ms, created_at
+                   FROM run_steps WHERE run_id = ? ORDER BY step, id""",
+                (run_id,)
+            ).fetchall()
+        result = dict(run)
+        result["steps"] = [
+            {**dict(row), "actions": json.loads(row["actions"] or "[]"), "cached": bool(row["cached"]),
+             "success": bool(row["success"])}
+            for row in steps
+        ]
+        return result
+
+    # ========================
+    # State Channel Methods
+    # ========================
+    def reset_state_channel(self):
+        """Clears mirrored state; called when a worker starts, since its event sequence restarts at 0."""
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM state_events")
+            conn.execute("DELETE FROM state_snapshot")
+            conn.execute("DELETE FROM state_frame")
+            conn.execute("DELETE FROM event_log")
+            conn.commit()
+
+    def publish_state(self, events, seq: int, state: dict, stats: dict = None, frame: dict = None, keep: int = 500,
+                      logs=None, keep_logs: int = 2000):
+        """
+        Writes a batch of (seq, kind, frame) events, the snapshot as of `seq`,
+        new log events and optionally stats and the latest screenshot frame
+        in one transaction, keeping only the newest `keep` events and
+        `keep_logs` log events. Stats are left as they were when None.
+        """
+        now = time.time()
+        with self.pool.connection() as conn:
+            if events:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO state_events (seq, kind, frame, created_at) VALUES (?, ?, ?, ?)",
+                    [(event_seq, kind, text, now) for event_seq, kind, text in events]
+                )
+                conn.execute("DELETE FROM state_events WHERE seq <= ?", (events[-1][0] - keep,))
+            conn.execute(
+                """INSERT INTO state_snapshot (id, seq, state_json, stats_json, updated_at)
+                   VALUES (1, ?, ?, ?, ?)
+                   ON CONFLICT (id) DO UPDATE SET
+                       seq = excluded.seq, state_json = excluded.state_json, updated_at = excluded.updated_at,
+                       stats_json = COALESCE(excluded.stats_json, stats_json)""",
+                (seq, json.dumps(state), json.dumps(stats) if stats is not None else None, now)
+            )
+            if logs:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO event_log (seq, ts, level, agent, message) VALUES (?, ?, ?, ?, ?)",
+                    [(e["seq"], e["ts"], e["level"], e["agent"], e["message"]) for e in logs]
+                )
+                conn.execute("DELETE FROM event_log WHERE seq <= ?", (logs[-1]["seq"] - keep_logs,))
+            if frame:
+                conn.execute(
+                    """INSERT OR REPLACE INTO state_frame (id, etag, mime_type, data, updated_at)
+                       VALUES (1, ?, ?, ?, ?)""",
+                    (frame["etag"], frame["mime_type"], frame["data"], now)
+                )
+            conn.commit()
+
+    def get_state_snapshot(self):
+        """Returns (seq, state, stats) as last published, or None before any worker has run."""
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT seq, state_json, stats_json FROM state_snapshot WHERE id = 1").fetchone()
+        if not row:
+            return None
+        return row["seq"], json.loads(row["state_json"]), json.loads(row["stats_json"] or "{}")
+
+    def get_state_seq(self) -> int:
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT seq FROM state_snapshot WHERE id = 1").fetchone()
+        return row["seq"] if row else 0
+
+    def get_state_events(self, after: int):
+        """Returns ([(seq, frame)] newer than `after`, oldest seq still stored)."""
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT seq, frame FROM state_events WHERE seq > ? ORDER BY seq", (after,)
+            ).fetchall()
+            oldest = conn.execute("SELECT MIN(seq) FROM state_events").fetchone()[0] if rows else None
+        return [(row["seq"], row["frame"]) for row in rows], oldest
+
+    def get_state_frame(self):
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT etag, mime_type, data FROM state_frame WHERE id = 1").fetchone()
+        return dict(row) if row else None
+
+    def get_log_events(self, after: int, agent_id: str = None, limit: int = 500):
+        """Same contract as EventLog.since: (events, next_seq, missed)."""
+        with self.pool.connection() as conn:
+            oldest, newest = conn.execute("SELECT MIN(seq), MAX(seq) FROM event_log").fetchone()
+            if newest is None:
+                return [], after, False
+            missed = False
+            if newest < after:
+                # A restarted worker's sequence began again
+                after, missed = 0, True
+            elif newest == after:
+                return [], after, False
+            sql = "SELECT seq, ts, level, agent, message FROM event_log WHERE seq > ?"
+            params = [after]
+            if agent_id:
+                sql += " AND agent = ?"
+                params.append(agent_id)
+            rows = conn.execute(sql + " ORDER BY seq LIMIT ?", params + [limit + 1]).fetchall()
+        events = [dict(row) for row in rows[:limit]]
+        next_seq = events[-1]["seq"] if len(rows) > limit else newest
+        return events, next_seq, missed or oldest > after + 1
+
+    def add_control_command(self, command: str, payload: dict = None) -> int:
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO control_commands (command, payload_json, created_at) VALUES (?, ?, ?)",
+                (command, json.dumps(payload or {}), time.time())
+            )
+            conn.commit()
+            return cursor.lastrowid
+
+    def take_control_commands(self):
+        """Removes and returns pending commands, oldest first, as {"command": ..., **payload}."""
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT id, command, payload_json FROM control_commands ORDER BY id").fetchall()
+            if not rows:
+                return []
+            conn.execute("DELETE FROM control_commands WHERE id <= ?", (rows[-1]["id"],))
+            conn.commit()
+        return [{**json.loads(row["payload_json"] or "{}"), "command": row["command"]} for row in rows]
 
     # ========================
     # Auth Methods
     # ========================
     def save_otp(self, email: str, otp_code: str, expires_at: float):
         """Saves an OTP code for email verification."""
-        cursor = self.conn.cursor()
-        # Invalidate any previous unused OTPs for this email
-        cursor.execute("UPDATE auth_tokens SET used = 1 WHERE email = ? AND used = 0", (email,))
-        # Insert new OTP
-        cursor.execute(
-            "INSERT INTO auth_tokens (email, otp_code, expires_at, created_at) VALUES (?, ?, ?, ?)",
-            (email, otp_code, expires_at, time.time())
-        )
-        self.conn.commit()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            # Invalidate any previous unused OTPs for this email
+            cursor.execute("UPDATE auth_tokens SET used = 1 WHERE email = ? AND used = 0", (email,))
+            # Insert new OTP
+            cursor.execute(
+                "INSERT INTO auth_tokens (email, otp_code, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                (email, otp_code, expires_at, time.time())
+            )
+            conn.commit()
 
     def verify_otp(self, email: str, otp_code: str) -> bool:
         """Verifies an OTP code. Returns True if valid, False otherwise."""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            """SELECT id FROM auth_tokens 
-               WHERE email = ? AND otp_code = ? AND used = 0 AND expires_at > ?""",
-            (email, otp_code, time.time())
-        )
-        row = cursor.fetchone()
-        if row:
-            # Mark as used
-            cursor.execute("UPDATE auth_tokens SET used = 1 WHERE id = ?", (row["id"],))
-            self.conn.commit()
-            return True
-        return False
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT id FROM auth_tokens 
+                   WHERE email = ? AND otp_code = ? AND used = 0 AND expires_at > ?""",
+                (email, otp_code, time.time())
+            )
+            row = cursor.fetchone()
+            if row:
+                # Mark as used
+                cursor.execute("UPDATE auth_tokens SET used = 1 WHERE id = ?", (row["id"],))
+                conn.commit()
+                return True
+            return False
 
     def close(self):
-        """Closes the database connection."""
-        self.conn.close()
+        """
+        No-op: connections belong to the process-wide pool, which other
+        Database instances share. close_pool() shuts it down on exit.
+        """
@@ -0,0 +1,102 @@
+"""
+Persistent cache of brain decisions.
+
+Agents keep revisiting the same listing pages with the same task, and the
+brain gives the same answer each time. The cache maps (task, normalised
+observation) to the action the brain chose, so a repeat skips the brain
+round trip. The observation part of the key covers the canonical URL, the
+interactive elements and the page text, so any change to the page is a new
+key - stale entries are never matched, only aged out by TTL/LRU.
+
+Scroll-only plans and anything that ends the task (done) are not cached:
+neither changes what the page observation shows, so replaying them would
+answer the same page with the same decision on every step.
+"""
+import os
+import re
+import json
+import hashlib
+import threading
+
+from database import canonical_url
+from actions import parse_plan, ActionValidationError
+
+DECISION_CACHE = os.getenv("DECISION_CACHE", "true").lower() == "true"
+DECISION_CACHE_TTL = float(os.getenv("DECISION_CACHE_TTL", str(24 * 3600)))  # seconds
+DECISION_CACHE_MAX_ENTRIES = int(os.getenv("DECISION_CACHE_MAX_ENTRIES", "5000"))
+
+_WHITESPACE = re.compile(r"\s+")
+ELEMENT_FIELDS = ("tag", "selector", "text", "type", "href")
+
+
+def _normalise(text):
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+def decision_key(task, observation):
+    """Cache key for a task on an observed page: hash of task, canonical URL, elements and text."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(_normalise(task).lower().encode("utf-8"))
+    h.update(b"\0" + (canonical_url(observation.get("url")) or "").encode("utf-8"))
+    elements = [[_normalise(str(el.get(field) or "")) for field in ELEMENT_FIELDS]
+                for el in observation.get("interactive_elements", [])]
+    h.update(b"\0" + json.dumps(elements).encode("utf-8"))
+    h.update(b"\0" + _normalise(observation.get("text_content")).encode("utf-8"))
+    return h.hexdigest()
+
+
+class DecisionCache:
+    """SQLite-backed decision cache with TTL/LRU eviction and hit/miss counters."""
+    def __init__(self, db, ttl=DECISION_CACHE_TTL, max_entries=DECISION_CACHE_MAX_ENTRIES, enabled=DECISION_CACHE):
+        self.db = db
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, task, observation):
+        """Returns the cached decision for this task on this page, or None."""
+        if not self.enabled:
+            return None
+        decision = self.db.get_cached_decision(decision_key(task, observation), self.ttl)
+        with self._lock:
+            if decision is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return decision
+
+    def put(self, task, observation, decision):
+        """Caches a decision, but only a valid action or plan that isn't scroll-only and doesn't end the task."""
+        if not self.enabled or not decision:
+            return
+        try:
+            plan = parse_plan(decision)
+        except ActionValidationError:
+            return
+        types = {action["type"] for action in plan}
+        if "done" in types or types <= {"scroll"}:
+            return
+        self.db.put_cached_decision(decision_key(task, observation), observation.get("url"), decision,
+                                    self.ttl, self.max_entries)
+
+    def forget(self, task, observation):
+        """Drops the entry for this page, e.g. after its action failed."""
+        if self.enabled:
+            self.db.delete_cached_decision(decision_key(task, observation))
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "enabled": self.enabled,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "entries": self.db.count_cached_decisions(),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+        }
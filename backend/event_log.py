@@ -0,0 +1,83 @@
+"""
+Structured event log - a fixed-size ring of log events shared by every agent.
+
+Each event carries a monotonic sequence number, its level, the agent that
+logged it (None for the orchestrator) and a timestamp. Clients poll
+GET /logs?since=<seq> and only get events they haven't seen; the /state
+snapshot still carries the last few lines as formatted strings.
+"""
+import os
+import time
+import threading
+from collections import deque
+from itertools import islice
+
+LOG_RING_SIZE = int(os.getenv("LOG_RING_SIZE", "2000"))
+LOG_SNAPSHOT_LINES = int(os.getenv("LOG_SNAPSHOT_LINES", "50"))  # lines per log in /state snapshots
+LEVELS = ("debug", "info", "warning", "error")
+
+
+def format_event(event):
+    """The classic one-line form: "[HH:MM:SS] [agent] message"."""
+    timestamp = time.strftime("%H:%M:%S", time.localtime(event["ts"]))
+    if event["agent"]:
+        return f"[{timestamp}] [{event['agent']}] {event['message']}"
+    return f"[{timestamp}] {event['message']}"
+
+
+class EventLog:
+    """Lock-protected, deque-backed ring of log events with sequence numbers."""
+    def __init__(self, size=LOG_RING_SIZE):
+        self._events = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.seq = 0
+
+    def append(self, message, level="info", agent_id=None):
+        """Records an event and returns it."""
+        if level not in LEVELS:
+            raise ValueError(f"unknown log level {level!r}")
+        with self._lock:
+            self.seq += 1
+            event = {"seq": self.seq, "ts": time.time(), "level": level, "agent": agent_id, "message": message}
+            self._events.append(event)
+            return event
+
+    def since(self, seq=0, agent_id=None, limit=None):
+        """
+        Events newer than `seq`, oldest first, optionally for one agent and
+        capped at `limit`. Returns (events, next_seq, missed): poll again
+        from next_seq; `missed` is True when events after `seq` have already
+        been overwritten, or when `seq` is ahead of this log (it was kept
+        across a restart) - then the events are returned from the oldest.
+        """
+        with self._lock:
+            restarted = seq > self.seq
+            if restarted:
+                seq = 0
+            if not self._events or self._events[-1]["seq"] <= seq:
+                return [], seq, restarted
+            oldest = self._events[0]["seq"]
+            missed = restarted or oldest > seq + 1
+            events = list(islice(self._events, max(0, seq + 1 - oldest), None))
+        next_seq = events[-1]["seq"]
+        if agent_id:
+            events = [event for event in events if event["agent"] == agent_id]
+        if limit and len(events) > limit:
+            events = events[:limit]
+            next_seq = events[-1]["seq"]
+        return events, next_seq, missed
+
+    def tail(self, count=LOG_SNAPSHOT_LINES, agent_id=None):
+        """The last `count` events (for one agent, if given), oldest first."""
+        with self._lock:
+            if agent_id is None:
+                events = list(islice(self._events, max(0, len(self._events) - count), None))
+            else:
+                events = []
+                for event in reversed(self._events):
+                    if event["agent"] == agent_id:
+                        events.append(event)
+                        if len(events) == count:
+                            break
+                events.reverse()
+        return events
@@ -0,0 +1,383 @@
+"""
+Browserless page fetching for server-rendered job boards.
+
+Most boards render their listings on the server, so a page can be read
+without starting Chrome: one HTTP request plus an HTML parse, instead of a
+navigation, a page-settle wait and a screenshot.
+
+* PageFetcher keeps one connection pool (a shared HTTPAdapter) for every
+  session it hands out, so agents reuse keep-alive connections to each
+  host, and revalidates pages that sent an ETag or Last-Modified with a
+  conditional GET - an unchanged listing comes back as a bodyless 304.
+* parse_page turns HTML into the observation JobSurfer.capture_state
+  returns (same keys, same element selectors as OBSERVE_SCRIPT).
+* needs_javascript tells when a page is a client-rendered shell or a bot
+  challenge that only a real browser can get past.
+* parse_listings pulls job postings (JSON-LD JobPosting, or job links and
+  their company / location) out of a listing page, and pagination_links
+  finds the listing's other pages.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from bs4 import BeautifulSoup, NavigableString
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import Counter, Histogram
+
+HTTP_FAST_PATH = os.getenv("HTTP_FAST_PATH", "true").lower() == "true"
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))  # keep-alive connections per host
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))  # seconds
+HTTP_CACHE_SIZE = int(os.getenv("HTTP_CACHE_SIZE", "500"))  # pages kept for conditional GETs
+HTTP_USER_AGENT = os.getenv(
+    "HTTP_USER_AGENT",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+# A page with scripts and less visible text than this is taken to be rendered client-side
+MIN_TEXT_CHARS = 80
+# Elements client-side frameworks render into
+APP_ROOTS = "#root, #app, #__next, #__nuxt, [ng-version], [data-reactroot]"
+CHALLENGE_MARKERS = ("captcha", "just a moment", "verify you are human", "checking your browser")
+
+# Same query and limits as OBSERVE_SCRIPT
+INTERACTIVE = 'a, button, input, textarea, select, [role="button"], [onclick]'
+MAX_ELEMENTS = 25
+MAX_TEXT = 3000
+SKIP_TEXT = ("script", "style", "noscript", "template")
+
+HTTP_FETCHES = Counter("xapply_http_fetches", "Browserless page fetches", ("result",))
+HTTP_FETCH_SECONDS = Histogram("xapply_http_fetch_seconds", "Time per browserless page fetch", ("method",))
+
+
+class PageFetcher:
+    """Pooled, revalidating HTTP client for HTML pages. Thread-safe; one per process is enough."""
+    def __init__(self, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT, cache_size=HTTP_CACHE_SIZE,
+                 user_agent=HTTP_USER_AGENT):
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.user_agent = user_agent
+        retry = Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504), allowed_methods=("GET", "HEAD"))
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self._session = self.session()
+        self._cache = OrderedDict()  # url -> page, least recently used first
+        self._lock = threading.Lock()
+        self._stats = {"fetched": 0, "not_modified": 0, "errors": 0}
+
+    def session(self):
+        """A session with its own cookies that shares this fetcher's connection pool."""
+        session = requests.Session()
+        session.headers.update({"User-Agent": self.user_agent,
+                                "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8"})
+        session.mount("http://", self.adapter)
+        session.mount("https://", self.adapter)
+        return session
+
+    def get(self, url, session=None):
+        """
+        Fetches a page: {"url" (after redirects), "status", "content_type",
+        "html", "not_modified"}. A cached page is revalidated, and returned
+        as is (not_modified=True) when the server answers 304.
+        Raises requests.RequestException.
+        """
+        with self._lock:
+            cached = self._cache.get(url)
+        headers = {}
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = self._request("GET", url, session, headers=headers)
+        if cached and response.status_code == 304:
+            self._count("not_modified")
+            with self._lock:
+                self._cache.move_to_end(url)
+            return {**cached, "not_modified": True}
+
+        page = self._page(response)
+        with self._lock:
+            if self._cacheable(response):
+                self._cache[url] = page
+                self._cache.move_to_end(url)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            else:
+                self._cache.pop(url, None)
+        return page
+
+    def post(self, url, data, session=None, files=None):
+        """Submits a form; never cached. Same return value as get()."""
+        return self._page(self._request("POST", url, session, data=data, files=files))
+
+    def _request(self, method, url, session, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = (session or self._session).request(method, url, timeout=self.timeout, **kwargs)
+        except requests.RequestException:
+            self._count("errors")
+            raise
+        finally:
+            HTTP_FETCH_SECONDS.observe(time.perf_counter() - start, method=method)
+        if response.status_code != 304:
+            self._count("fetched")
+        return response
+
+    def _count(self, result):
+        HTTP_FETCHES.inc(result=result)
+        with self._lock:
+            self._stats[result] += 1
+
+    @staticmethod
+    def _page(response):
+        return {
+            "url": response.url,
+            "status": response.status_code,
+            "content_type": response.headers.get("Content-Type", ""),
+            "html": response.text,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "not_modified": False,
+        }
+
+    @staticmethod
+    def _cacheable(response):
+        """Only what a shared cache may keep: a validated 200 that isn't private or setting cookies."""
+        cache_control = response.headers.get("Cache-Control", "").lower()
+        return (response.status_code == 200
+                and bool(response.headers.get("ETag") or response.headers.get("Last-Modified"))
+                and "no-store" not in cache_control and "private" not in cache_control
+                and "Set-Cookie" not in response.headers)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "cached_pages": len(self._cache)}
+
+
+def is_hidden(el):
+    """Hidden by markup (the hidden attribute, aria-hidden or an inline display:none) - el or an ancestor."""
+    for node in [el, *el.parents]:
+        if not getattr(node, "attrs", None):
+            continue
+        style = node.get("style", "").replace(" ", "").lower()
+        if (node.has_attr("hidden") or node.get("aria-hidden") == "true"
+                or "display:none" in style or "visibility:hidden" in style):
+            return True
+    return False
+
+
+def page_text(soup):
+    """Visible text, roughly as document.body.innerText: one line per text node."""
+    hidden = {}  # id(parent) -> bool, text nodes mostly share parents
+    lines = []
+    for string in (soup.body or soup).find_all(string=True):
+        if type(string) is not NavigableString:
+            continue  # Comments, CDATA, doctypes
+        text = string.strip()
+        parent = string.parent
+        if not text or parent.name in SKIP_TEXT:
+            continue
+        key = id(parent)
+        if key not in hidden:
+            hidden[key] = is_hidden(parent)
+        if not hidden[key]:
+            lines.append(text)
+    return "\n".join(lines)
+
+
+def element_selector(el):
+    """The selector OBSERVE_SCRIPT would pick: #id, tag[name], tag.firstClass, else tag:nth-of-type."""
+    tag = el.name
+    if el.get("id"):
+        return "#" + el["id"]
+    if el.get("name"):
+        return f'{tag}[name="{el["name"]}"]'
+    classes = [c for c in el.get("class", []) if ":" not in c]
+    if classes:
+        return f"{tag}.{classes[0]}"
+    siblings = el.parent.find_all(tag) if el.parent else []
+    index = next((i for i, sibling in enumerate(siblings) if sibling is el), -1) + 1
+    return f"{tag}:nth-of-type({index})"
+
+
+def element_type(el):
+    """The element's DOM .type property, or None where it has none."""
+    if el.name == "input":
+        return (el.get("type") or "text").lower()
+    if el.name == "button":
+        return (el.get("type") or "submit").lower()
+    if el.name == "textarea":
+        return "textarea"
+    if el.name == "select":
+        return "select-multiple" if el.has_attr("multiple") else "select-one"
+    return None
+
+
+def interactive_elements(soup, url):
+    elements = []
+    for el in soup.select(INTERACTIVE):
+        if len(elements) == MAX_ELEMENTS:
+            break
+        # Like OBSERVE_SCRIPT, hidden inputs are kept
+        if el.name != "input" and is_hidden(el):
+            continue
+        text = ((el.get_text(" ", strip=True) if el.name != "input" else "")
+                or el.get("value") or el.get("placeholder") or el.get("aria-label") or "")
+        href = urljoin(url, el["href"]) if el.name == "a" and el.get("href") is not None else None
+        elements.append({
+            "index": len(elements) + 1,
+            "tag": el.name,
+            "selector": element_selector(el),
+            "text": text.strip()[:40] or "[no text]",
+            "type": element_type(el),
+            "href": href[:60] if href else None,
+        })
+    return elements
+
+
+def fingerprint(text, elements):
+    """Changes whenever the visible page does, like OBSERVE_SCRIPT's (not the same values)."""
+    h = hashlib.blake2b(text.encode("utf-8"), digest_size=8)
+    h.update(json.dumps(elements, separators=(",", ":")).encode("utf-8"))
+    return h.hexdigest()
+
+
+def parse_page(html, url):
+    """
+    Returns (soup, observation) for an HTML page. The observation has the
+    keys capture_state returns except screenshot and timings; text_content
+    is the full visible text (capture_state's is cut to 3000 characters).
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    elements = interactive_elements(soup, url)
+    text = page_text(soup)
+    return soup, {
+        "url": url,
+        "text_content": text,
+        "interactive_elements": elements,
+        "fingerprint": fingerprint(text[:MAX_TEXT], elements),
+    }
+
+
+def needs_javascript(page, soup, observation):
+    """Why the page can't be used without a browser, or None if it can."""
+    content_type = page["content_type"].split(";")[0].strip().lower()
+    if content_type and content_type not in ("text/html", "application/xhtml+xml"):
+        return f"not an HTML page ({content_type})"
+    text = observation["text_content"]
+    if page["status"] in (403, 429, 503) and any(marker in text[:MAX_TEXT].lower() for marker in CHALLENGE_MARKERS):
+        return "bot challenge"
+    if not soup.find("script"):
+        return None
+    app_root = soup.select_one(APP_ROOTS)
+    if app_root is not None and not app_root.get_text(strip=True):
+        return "client-rendered app"
+    if len(text) < MIN_TEXT_CHARS:
+        return "almost no content without scripts"
+    noscript = " ".join(el.get_text(" ", strip=True) for el in soup.find_all("noscript")).lower()
+    if "javascript" in noscript and len(text) < MIN_TEXT_CHARS * 4:
+        return "page asks for JavaScript"
+    return None
+
+
+# ========================
+# Listings
+# ========================
+JOB_LINK = re.compile(r"/(jobs?|careers?|positions?|vacanc(y|ies)|openings?)/[^/?#]+|[?&](job_?id|jk|gh_jid)=", re.I)
+
+
+def _first_text(container, pattern):
+    el = container.find(class_=re.compile(pattern, re.I)) if container else None
+    return el.get_text(" ", strip=True) if el else None
+
+
+def _json_ld_postings(soup, url):
+    jobs = []
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            data = json.loads(script.string or "")
+        except ValueError:
+            continue
+        items = data if isinstance(data, list) else data.get("@graph", [data]) if isinstance(data, dict) else []
+        for item in items:
+            if not isinstance(item, dict) or item.get("@type") != "JobPosting":
+                continue
+            company = item.get("hiringOrganization") or {}
+            location = item.get("jobLocation") or {}
+            if isinstance(location, list):
+                location = location[0] if location else {}
+            address = (location.get("address") or {}) if isinstance(location, dict) else {}
+            jobs.append({
+                "title": item.get("title"),
+                "company": company.get("name") if isinstance(company, dict) else company,
+                "location": (address.get("addressLocality") if isinstance(address, dict) else address)
+                            or ("Remote" if item.get("jobLocationType") == "TELECOMMUTE" else None),
+                "url": urljoin(url, item.get("url") or url),
+            })
+    return jobs
+
+
+def parse_listings(soup, url):
+    """
+    Job postings on a listing page: {"title", "company", "location", "url"}.
+    JSON-LD JobPosting data is used when the page has it; otherwise links
+    that look like job pages, with the company and location taken from the
+    nearest element classed like one inside the link's container.
+    """
+    jobs = _json_ld_postings(soup, url)
+    if jobs:
+        return [job for job in jobs if job["title"]]
+
+    seen = set()
+    for link in soup.find_all("a", href=True):
+        job_url = urljoin(url, link["href"]).split("#")[0]
+        title = link.get_text(" ", strip=True)
+        if not title or job_url in seen or not JOB_LINK.search(job_url):
+            continue
+        container = link.find_parent(["li", "article", "tr"]) or link.find_parent(
+            class_=re.compile(r"job|listing|posting|result|card", re.I))
+        seen.add(job_url)
+        jobs.append({
+            "title": title,
+            "company": _first_text(container, r"company|employer|organi[sz]ation"),
+            "location": _first_text(container, r"location|city|place"),
+            "url": job_url,
+        })
+    return jobs
+
+
+NEXT_TEXT = ("next", "next page", "next »", "›", "»", ">", "more jobs", "load more")
+NEXT_MARKER = re.compile(r"(^|[-_ ])next($|[-_ ])", re.I)
+
+
+def pagination_links(soup, url):
+    """
+    Other pages of the same listing: rel="next", links that read or are
+    classed "next", and numbered page links. Same host only, in page order.
+    """
+    host = urlsplit(url).netloc
+    links = [el for el in soup.find_all(("a", "link"), href=True) if "next" in (el.get("rel") or [])]
+    for link in soup.find_all("a", href=True):
+        text = link.get_text(" ", strip=True).lower()
+        marker = " ".join([link.get("id", ""), *link.get("class", []), link.get("aria-label", "")])
+        if text in NEXT_TEXT or NEXT_MARKER.search(marker) or (
+                text.isdigit() and link.find_parent(class_=re.compile(r"pag", re.I))):
+            links.append(link)
+    urls = []
+    for link in links:
+        href = link["href"].strip()
+        if not href or href.startswith(("#", "javascript:")):
+            continue
+        page_url = urljoin(url, href).split("#")[0]
+        if urlsplit(page_url).netloc == host and page_url != url and page_url not in urls:
+            urls.append(page_url)
+    return urls
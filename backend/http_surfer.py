@@ -0,0 +1,325 @@
+"""
+Browserless surfing, with Chrome as the fallback.
+
+HttpSurfer has JobSurfer's interface (capture_state, check_preconditions,
+execute_action, navigate, close) but works over HTTP: links are followed
+with a GET, typed values are kept and sent when a form's submit button is
+clicked, and observations come from parsing the HTML (see fetcher.py).
+Whatever it can't do without running the page's scripts raises
+NeedsBrowser: a client-rendered page, a click on something that isn't a
+link or a submit button, a file upload.
+
+FallbackSurfer runs a task on an HttpSurfer and moves it to a Chrome
+browser leased from the BrowserPool at the first NeedsBrowser, carrying
+over cookies and typed values, then stays in Chrome for the rest of the
+task. Hosts that needed Chrome once are opened in Chrome from the start.
+"""
+import os
+import time
+from urllib.parse import urljoin, urlsplit, urlunsplit, urlencode
+
+import requests
+
+from fetcher import parse_page, needs_javascript, is_hidden, fingerprint, MAX_TEXT
+from metrics import Counter
+
+START_URL = os.getenv("SURFER_START_URL", "https://testdevjobs.com/")  # JobSurfer's default start page
+
+HTTP_ACTIONS = Counter("xapply_http_actions", "Actions executed by HttpSurfer", ("type", "result"))
+BROWSER_FALLBACKS = Counter("xapply_browser_fallbacks", "Tasks moved from HttpSurfer to Chrome", ("at",))
+
+SUBMIT_TYPES = ("submit", "image")
+SKIPPED_FIELD_TYPES = ("submit", "button", "image", "reset")
+
+
+class NeedsBrowser(Exception):
+    """
+    The page or action needs a real browser. `url` is where Chrome should
+    pick up. With pending=True the action wasn't run and Chrome must run it
+    on that page; otherwise the page at `url` is the action's result.
+    """
+    def __init__(self, reason, url, pending=False):
+        super().__init__(reason)
+        self.reason = reason
+        self.url = url
+        self.pending = pending
+
+
+class NoBrowserAvailable(Exception):
+    """A task needed Chrome and the BrowserPool had no instance to lease."""
+
+
+class HttpSurfer:
+    """A JobSurfer without the browser, for server-rendered pages."""
+    def __init__(self, fetcher, start_url=START_URL):
+        self.fetcher = fetcher
+        self.session = fetcher.session()  # Own cookies, shared connections
+        self.navigations = 0
+        self.last_timings = {}
+        self.url = None
+        self.soup = None
+        self.observation = None
+        self._typed = {}  # id(element) -> (element, selector, value) on the current page
+        if start_url:
+            self.navigate(start_url)
+
+    def navigate(self, url):
+        print(f"[*] Fetching {url}")
+        self._load(self.fetcher.get(url, self.session))
+
+    def _load(self, page):
+        start = time.perf_counter()
+        soup, observation = parse_page(page["html"], page["url"])
+        parse_ms = (time.perf_counter() - start) * 1000
+        reason = needs_javascript(page, soup, observation)
+        if reason:
+            raise NeedsBrowser(reason, page["url"])
+        self.navigations += 1
+        self.url, self.soup, self.observation = page["url"], soup, observation
+        self._typed = {}
+        # Parsing is this surfer's DOM read, so it is reported as script_ms
+        self.last_timings = {"script_ms": round(parse_ms, 1), "screenshot_ms": 0.0, "total_ms": round(parse_ms, 1),
+                             "not_modified": page["not_modified"]}
+
+    def capture_state(self, screenshot=True):
+        """
+        The current page in capture_state's shape. There is nothing to screenshot,
+        so "screenshot" is always None (the surf loop's "unchanged" value).
+        Typed values show up as the fields' text, as they would in Chrome.
+        """
+        elements = self.observation["interactive_elements"]
+        text = self.observation["text_content"][:MAX_TEXT]
+        page_fingerprint = self.observation["fingerprint"]
+        if self._typed:
+            typed = dict(self.typed_values())
+            elements = [{**el, "text": typed[el["selector"]][:40]} if el["selector"] in typed else el
+                        for el in elements]
+            page_fingerprint = fingerprint(text, elements)
+        return {
+            "url": self.url,
+            "screenshot": None,
+            "text_content": text,
+            "interactive_elements": elements,
+            "fingerprint": page_fingerprint,
+            "timings": dict(self.last_timings),
+        }
+
+    def _find(self, selector):
+        try:
+            return self.soup.select_one(selector)
+        except Exception:
+            return None  # Not a selector soupsieve understands
+
+    def check_preconditions(self, action):
+        """Same checks as JobSurfer's PRECONDITION_SCRIPT, against the parsed page."""
+        expect = action.get("expect") or {}
+        if expect.get("url_contains") and expect["url_contains"] not in self.url:
+            return f"url does not contain {expect['url_contains']}"
+        if expect.get("text") and expect["text"] not in self.observation["text_content"]:
+            return f"page text lacks {expect['text']!r}"
+        if expect.get("selector") and not self._find(expect["selector"]):
+            return f"no element matches {expect['selector']}"
+        if action["type"] in ("click", "type"):
+            el = self._find(action["selector"])
+            if not el:
+                return f"no element matches {action['selector']}"
+            if el.has_attr("disabled"):
+                return f"{action['selector']} is disabled"
+            if is_hidden(el):
+                return f"{action['selector']} is hidden"
+            if action["type"] == "type" and not (el.name in ("input", "textarea")
+                                                  or el.get("contenteditable") in ("", "true")):
+                return f"{action['selector']} is not a text field"
+        return None
+
+    def typed_values(self):
+        """(selector, value) typed on the current page and not yet submitted, in order."""
+        return [(selector, value) for _, selector, value in self._typed.values()]
+
+    def execute_action(self, action):
+        """
+        Runs an action over HTTP. Returns True/False like JobSurfer.execute_action;
+        raises NeedsBrowser when it takes a browser.
+        """
+        try:
+            if action["type"] == "navigate":
+                self.navigate(action.get("url", ""))
+            elif action["type"] == "click":
+                self._click(action["selector"])
+            elif action["type"] == "type":
+                el = self._find(action["selector"])
+                if el is None:
+                    raise ValueError(f"no element matches {action['selector']}")
+                if el.name not in ("input", "textarea"):
+                    raise NeedsBrowser(f"typing into <{el.name}>", self.url, pending=True)
+                self._typed[id(el)] = (el, action["selector"], action["value"])
+            # scroll: the whole page is already read
+            HTTP_ACTIONS.inc(type=action["type"], result="ok")
+            return True
+        except NeedsBrowser:
+            HTTP_ACTIONS.inc(type=action["type"], result="needs_browser")
+            raise
+        except (requests.RequestException, ValueError) as e:
+            print(f"[!] Action failed: {e}")
+            HTTP_ACTIONS.inc(type=action.get("type"), result="failed")
+            return False
+
+    def _click(self, selector):
+        el = self._find(selector)
+        if el is None:
+            raise ValueError(f"no element matches {selector}")
+        if el.has_attr("onclick"):
+            raise NeedsBrowser(f"{selector} has a click handler", self.url, pending=True)
+        if el.name == "a":
+            href = (el.get("href") or "").strip()
+            if not href or href.startswith(("#", "javascript:")):
+                raise NeedsBrowser(f"{selector} is a scripted link", self.url, pending=True)
+            print(f"[*] Following {selector}")
+            self.navigate(urljoin(self.url, href))
+            return
+        kind = (el.get("type") or ("submit" if el.name == "button" else "")).lower()
+        form = el.find_parent("form")
+        if el.name in ("button", "input") and kind in SUBMIT_TYPES and form is not None:
+            print(f"[*] Submitting the form of {selector}")
+            self._submit(form, el)
+            return
+        raise NeedsBrowser(f"{selector} is not a link or a submit button", self.url, pending=True)
+
+    def _submit(self, form, submitter):
+        """Submits `form` the way the browser would, with typed values and the submitter's name/value."""
+        if form.has_attr("onsubmit"):
+            raise NeedsBrowser("the form has a submit handler", self.url, pending=True)
+        typed = {key: value for key, (_, _, value) in self._typed.items()}
+        fields = []
+        for field in form.find_all(("input", "textarea", "select")):
+            name = field.get("name")
+            if not name or field.has_attr("disabled"):
+                continue
+            kind = (field.get("type") or "text").lower()
+            if field.name == "input" and kind == "file":
+                raise NeedsBrowser("the form uploads a file", self.url, pending=True)
+            if id(field) in typed:
+                fields.append((name, typed[id(field)]))
+            elif field.name == "textarea":
+                fields.append((name, field.get_text()))
+            elif field.name == "select":
+                options = field.find_all("option")
+                selected = [o for o in options if o.has_attr("selected")] or options[:1]
+                fields.extend((name, o.get("value", o.get_text(strip=True))) for o in selected)
+            elif kind in ("checkbox", "radio"):
+                if field.has_attr("checked"):
+                    fields.append((name, field.get("value", "on")))
+            elif kind not in SKIPPED_FIELD_TYPES:
+                fields.append((name, field.get("value", "")))
+        if submitter.get("name"):
+            fields.append((submitter["name"], submitter.get("value", "")))
+
+        action = urljoin(self.url, submitter.get("formaction") or form.get("action") or self.url)
+        method = (submitter.get("formmethod") or form.get("method") or "get").lower()
+        if method == "post":
+            if (form.get("enctype") or "").lower() == "multipart/form-data":
+                page = self.fetcher.post(action, None, self.session, files=[(k, (None, v)) for k, v in fields])
+            else:
+                page = self.fetcher.post(action, fields, self.session)
+        else:
+            # A GET form replaces the action's query string with its fields
+            parts = urlsplit(action)
+            page = self.fetcher.get(urlunsplit(parts._replace(query=urlencode(fields), fragment="")), self.session)
+        self._load(page)
+
+    def close(self):
+        self.session.cookies.clear()  # The connection pool is the fetcher's and stays open
+
+
+class FallbackSurfer:
+    """
+    Runs a task over HTTP and moves it to a pooled Chrome the first time it
+    needs JavaScript. Raises NoBrowserAvailable from the constructor when the
+    task has to start in Chrome and the pool has none to lease.
+    """
+    def __init__(self, fetcher, browser_pool, start_url=START_URL, js_hosts=None):
+        self.browser_pool = browser_pool
+        self.js_hosts = js_hosts if js_hosts is not None else set()  # Shared between tasks
+        self.http = HttpSurfer(fetcher, start_url=None)
+        self.browser = None
+        if urlsplit(start_url).hostname in self.js_hosts:
+            self._switch(NeedsBrowser("host needed a browser before", start_url), at="start")
+            return
+        try:
+            self.http.navigate(start_url)
+        except NeedsBrowser as e:
+            self._switch(e, at="start")
+        except requests.RequestException as e:
+            self._switch(NeedsBrowser(f"fetch failed: {e}", start_url), at="start")
+
+    @property
+    def surfer(self):
+        """Whichever surfer the task is on."""
+        return self.browser or self.http
+
+    def _switch(self, reason, at):
+        """Moves the task to a leased Chrome at reason.url. Raises NoBrowserAvailable."""
+        print(f"[*] Switching to Chrome at {reason.url}: {reason.reason}")
+        try:
+            browser = self.browser_pool.acquire()
+        except Exception as e:
+            raise NoBrowserAvailable(f"no browser available for {reason.url}: {e}") from e
+        self.browser = browser
+        BROWSER_FALLBACKS.inc(at=at)
+        host = urlsplit(reason.url).hostname
+        if host:
+            self.js_hosts.add(host)
+        try:
+            self.browser.navigate(reason.url)
+            cookies = list(self.http.session.cookies)
+            for cookie in cookies:
+                try:
+                    self.browser.driver.add_cookie({"name": cookie.name, "value": cookie.value,
+                                                    "path": cookie.path or "/", "secure": bool(cookie.secure)})
+                except Exception as e:
+                    print(f"[!] Chrome rejected cookie {cookie.name}: {e}")
+            if cookies:
+                self.browser.navigate(reason.url)  # Again, now with the session's cookies
+        except Exception as e:
+            print(f"[!] Carrying the session over to Chrome failed: {e}")
+
+    def navigate(self, url):
+        self.execute_action({"type": "navigate", "url": url})
+
+    def capture_state(self, screenshot=True):
+        return self.surfer.capture_state(screenshot)
+
+    def check_preconditions(self, action):
+        return self.surfer.check_preconditions(action)
+
+    def execute_action(self, action):
+        if self.browser:
+            return self.browser.execute_action(action)
+        if action["type"] == "navigate" and urlsplit(action.get("url", "")).hostname in self.js_hosts:
+            try:
+                self._switch(NeedsBrowser("host needed a browser before", action["url"]), at="page")
+            except NoBrowserAvailable as e:
+                print(f"[!] Action failed: {e}")
+                return False
+            return True
+        typed = self.http.typed_values()
+        try:
+            return self.http.execute_action(action)
+        except NeedsBrowser as e:
+            try:
+                self._switch(e, at="action" if e.pending else "page")
+            except NoBrowserAvailable as switch_error:
+                print(f"[!] Action failed: {switch_error}")
+                return False
+            if not e.pending:
+                return True  # The action ran; Chrome just shows its result
+            # Chrome is on the same page - redo the typing it missed, then the action
+            for selector, value in typed:
+                self.browser.execute_action({"type": "type", "selector": selector, "value": value})
+            return self.browser.execute_action(action)
+
+    def close(self):
+        if self.browser:
+            self.browser_pool.release(self.browser)
+            self.browser = None
+        self.http.close()
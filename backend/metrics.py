@@ -0,0 +1,221 @@
+"""
+Process-local metrics: counters and histograms, served in the Prometheus
+text format at GET /metrics.
+
+Recording a value is a dict lookup and an addition under the metric's own
+lock. Nothing is aggregated or formatted until /metrics is scraped, so
+unscraped metrics cost almost nothing; METRICS=false makes recording a
+no-op altogether.
+
+    REQUESTS = Counter("xapply_things", "Things done", ("kind",))
+    REQUESTS.inc(kind="a")
+
+    LATENCY = Histogram("xapply_thing_seconds", "Time per thing", ("kind",))
+    with LATENCY.time(kind="a"):
+        ...
+    @LATENCY.timed(kind="b")
+    def thing(): ...
+"""
+import os
+import time
+import math
+import functools
+import threading
+from bisect import bisect_left
+
+METRICS = os.getenv("METRICS", "true").lower() == "true"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Registry:
+    """The metrics of one process."""
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def collect(self):
+        """Current values as JSON-friendly families: {"name", "type", "help", "samples": [[name, labels, value]]}."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return [metric.collect() for metric in metrics]
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key):
+        return dict(zip(self.labelnames, key))
+
+    def _family(self, samples):
+        return {"name": self.name, "type": self.type, "help": self.documentation, "samples": samples}
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, exposed as <name>_total."""
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        if not METRICS:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            values = list(self._values.items())
+        return self._family([[f"{self.name}_total", self._labels(key), value] for key, value in values])
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, plus their sum and count."""
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label key -> [count per bucket..., count above the last bucket, sum]
+
+    def observe(self, value, **labels):
+        if not METRICS:
+            return
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, **labels):
+        """Context manager observing the seconds spent in the block."""
+        return _Timer(self, labels)
+
+    def timed(self, **labels):
+        """Decorator observing the seconds spent in each call."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, **labels)
+            return wrapper
+        return decorator
+
+    def phases(self, **labels):
+        """A PhaseTimer for code that moves through named phases, observed with a "phase" label."""
+        return PhaseTimer(self, labels)
+
+    def collect(self):
+        with self._lock:
+            series = [(key, list(values)) for key, values in self._series.items()]
+        samples = []
+        for key, values in series:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), values[:-1]):
+                cumulative += count
+                samples.append([f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative])
+            samples.append([f"{self.name}_sum", labels, values[-1]])
+            samples.append([f"{self.name}_count", labels, cumulative])
+        return self._family(samples)
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class PhaseTimer:
+    """
+    Times consecutive phases without re-indenting the code between them:
+    enter("navigate") ... enter("type") ... done(). Each phase is observed
+    when the next one starts.
+    """
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.phase = None
+        self.start = 0.0
+
+    def enter(self, phase):
+        now = time.perf_counter()
+        if self.phase:
+            self.histogram.observe(now - self.start, phase=self.phase, **self.labels)
+        self.phase, self.start = phase, now
+
+    def done(self):
+        self.enter(None)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render(*sources):
+    """
+    Prometheus text exposition of (families, extra_labels) sources, e.g. this
+    process's REGISTRY.collect() plus families published by another process.
+    Families with the same name are merged under one HELP/TYPE header.
+    """
+    merged = {}
+    for families, extra_labels in sources:
+        for family in families:
+            entry = merged.setdefault(family["name"], {**family, "samples": []})
+            for name, labels, value in family["samples"]:
+                entry["samples"].append((name, {**labels, **extra_labels}, value))
+
+    lines = []
+    for family in merged.values():
+        lines.append(f"# HELP {family['name']} {_escape(family['help'])}")
+        lines.append(f"# TYPE {family['name']} {family['type']}")
+        for name, labels, value in family["samples"]:
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text
+                         else f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,167 @@
+"""
+Observation formatting for brain prompts, plus incremental (diff) mode.
+
+In incremental mode the brain keeps one conversation per task. The first
+step sends the full page; later steps send only the text blocks and
+interactive elements that changed since the previous step, with a one-line
+summary of what stayed the same. Navigations, large changes and every
+Nth step fall back to a full observation so the brain never drifts.
+"""
+import os
+import json
+import time
+
+INCREMENTAL_OBSERVATIONS = os.getenv("INCREMENTAL_OBSERVATIONS", "true").lower() == "true"
+RESYNC_EVERY = int(os.getenv("OBSERVATION_RESYNC_EVERY", "8"))
+MAX_CHANGE_RATIO = 0.5  # above this share of changed blocks a full observation is smaller anyway
+RECORD_OBSERVATIONS_DIR = os.getenv("RECORD_OBSERVATIONS_DIR")
+
+RESPONSE_INSTRUCTIONS = """
+YOU MUST RESPOND WITH ONLY A JSON OBJECT. NO TEXT BEFORE OR AFTER.
+
+You are a web browsing agent. Based on the current page state and available elements, decide the next action,
+or a short plan of up to 5 actions when you can already see what comes next (e.g. type a search, click search, scroll).
+
+ACTIONS:
+{"action": "click", "selector": "EXACT_SELECTOR_FROM_LIST"}
+{"action": "type", "selector": "EXACT_SELECTOR_FROM_LIST", "value": "text to type"}
+{"action": "navigate", "url": "https://..."}
+{"action": "scroll"}
+{"action": "done", "reason": "brief reason"}
+
+RESPONSE FORMAT (pick one):
+A single action, e.g. {"action": "scroll"}
+A plan: {"plan": [ACTION, ACTION, ...]}
+
+A plan step may add "expect": {"url_contains": "...", "selector": "...", "text": "..."} - conditions that must
+hold before it runs. If one fails, the plan stops and you are asked again with the new page.
+
+RULES:
+1. Output ONLY the JSON object, nothing else
+2. Use selectors EXACTLY as shown in the AVAILABLE INTERACTIVE ELEMENTS list
+3. For job searching, look for search inputs or job listing links
+4. "done" may only be the last action of a plan"""
+
+INCREMENTAL_INSTRUCTIONS = """
+Elements not listed as removed are still available with the same selectors.
+Respond with ONLY the next JSON action or plan, in the same format as before."""
+
+
+def format_element(el):
+    el_desc = f"  [{el['index']}] {el['tag']} | selector: \"{el['selector']}\" | text: \"{el['text']}\""
+    if el.get('type'):
+        el_desc += f" | type: {el['type']}"
+    if el.get('href'):
+        el_desc += f" | href: {el['href']}"
+    return el_desc
+
+
+def format_observation(task, context):
+    """Full prompt: task, the whole page excerpt and every interactive element."""
+    full_prompt = task
+    elements_text = ""
+    if context.get('interactive_elements'):
+        elements_text = "\n\nAVAILABLE INTERACTIVE ELEMENTS (use these selectors exactly):\n"
+        for el in context['interactive_elements']:
+            elements_text += format_element(el) + "\n"
+
+    full_prompt += f"\n\nCURRENT BROWSER STATE:\nURL: {context['url']}\nPAGE TEXT (excerpt): {context['text_content'][:1500]}\n"
+    full_prompt += elements_text
+    full_prompt += RESPONSE_INSTRUCTIONS
+    return full_prompt
+
+
+def format_observation_diff(diff):
+    """Follow-up prompt for an ongoing conversation: only what changed."""
+    lines = [
+        f"PAGE UPDATE after your last action. URL: {diff['url']} (unchanged)",
+        f"UNCHANGED: {diff['unchanged_text']} text blocks, {diff['unchanged_elements']} elements",
+    ]
+    if diff["added_text"]:
+        lines.append("NEW/CHANGED TEXT:")
+        lines.extend(f"  {block}" for block in diff["added_text"])
+    if diff["removed_text"]:
+        lines.append(f"REMOVED: {diff['removed_text']} text blocks")
+    if diff["added_elements"]:
+        lines.append("NEW ELEMENTS (use these selectors exactly):")
+        lines.extend(format_element(el) for el in diff["added_elements"])
+    if diff["removed_elements"]:
+        lines.append("REMOVED ELEMENTS: " + ", ".join(f'"{sel}"' for sel in diff["removed_elements"]))
+    if not diff["added_text"] and not diff["removed_text"] and not diff["added_elements"] and not diff["removed_elements"]:
+        lines.append("NO VISIBLE CHANGE - the last action may not have worked.")
+    return "\n".join(lines) + "\n" + INCREMENTAL_INSTRUCTIONS
+
+
+def _text_blocks(context):
+    return [line.strip() for line in context.get("text_content", "").split("\n") if line.strip()]
+
+
+def _element_key(el):
+    return (el.get("tag"), el.get("selector"), el.get("text"), el.get("href"))
+
+
+class ObservationTracker:
+    """Keeps the previous observation of one task and turns new ones into diffs."""
+    def __init__(self, resync_every=RESYNC_EVERY, max_change_ratio=MAX_CHANGE_RATIO):
+        self.resync_every = resync_every
+        self.max_change_ratio = max_change_ratio
+        self._previous = None
+        self._since_full = 0
+
+    def update(self, observation):
+        """
+        Returns the diff against the previous observation, or None when a full
+        observation should be sent (first step, navigation, big change, resync).
+        """
+        previous, self._previous = self._previous, observation
+        if previous is None or previous["url"] != observation["url"] or self._since_full >= self.resync_every:
+            self._since_full = 0
+            return None
+
+        old_blocks, new_blocks = _text_blocks(previous), _text_blocks(observation)
+        old_set, new_set = set(old_blocks), set(new_blocks)
+        added_text = [block for block in new_blocks if block not in old_set]
+        removed_text = sum(1 for block in old_blocks if block not in new_set)
+
+        old_elements = {_element_key(el): el for el in previous.get("interactive_elements", [])}
+        new_elements = {_element_key(el): el for el in observation.get("interactive_elements", [])}
+        added_elements = [el for key, el in new_elements.items() if key not in old_elements]
+        # An element whose text changed shows up as new; don't also report its selector as gone
+        new_selectors = {el["selector"] for el in new_elements.values()}
+        removed_elements = [
+            el["selector"] for key, el in old_elements.items()
+            if key not in new_elements and el["selector"] not in new_selectors
+        ]
+
+        changed = len(added_text) + len(added_elements)
+        total = max(1, len(new_blocks) + len(new_elements))
+        if changed / total > self.max_change_ratio:
+            self._since_full = 0
+            return None
+
+        self._since_full += 1
+        return {
+            "url": observation["url"],
+            "added_text": added_text,
+            "removed_text": removed_text,
+            "unchanged_text": len(new_blocks) - len(added_text),
+            "added_elements": added_elements,
+            "removed_elements": removed_elements,
+            "unchanged_elements": len(new_elements) - len(added_elements),
+        }
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) - enough to compare prompt sizes."""
+    return (len(text) + 3) // 4
+
+
+def record_observation(agent_id, observation):
+    """Appends an observation (minus the screenshot) to RECORD_OBSERVATIONS_DIR/<agent>.jsonl."""
+    if not RECORD_OBSERVATIONS_DIR:
+        return
+    os.makedirs(RECORD_OBSERVATIONS_DIR, exist_ok=True)
+    record = {k: v for k, v in observation.items() if k != "screenshot"}
+    record["recorded_at"] = time.time()
+    with open(os.path.join(RECORD_OBSERVATIONS_DIR, f"{agent_id}.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
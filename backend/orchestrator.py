@@ -1,17 +1,40 @@
 import os
 import time
+import re
 import json
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import undetected_chromedriver as uc
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, g
 from flask_cors import CORS
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from utils.file_patcher import FilePatcher
-from database import Database
+from utils.page_waits import wait_for_document_ready, wait_for_dom_quiet, wait_for_page_settled
+from utils.text_injection import inject_text
+from utils.reply_watcher import wait_for_reply, collect_texts
+from database import Database, init_db, close_pool
 from surfer import JobSurfer
-import google.generativeai as genai
+from browser_pool import BrowserPool
+from fetcher import PageFetcher, HTTP_FAST_PATH
+from http_surfer import FallbackSurfer, NoBrowserAvailable
+from crawler import start_crawl, CRAWL_BOARDS
+from state_stream import StateStream, ObservableState, format_frame
+from state_channel import StateMirror, RemoteState
+from event_log import EventLog, format_event
+from screenshots import LatestFrame
+from task_watcher import TaskWatcher
+from brain_client import BrainClient, BrainAPIError, BRAIN_MODE
+from decision_cache import DecisionCache
+from run_ledger import RunLedger
+from metrics import Counter, Histogram, REGISTRY, render as render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from actions import parse_plan, validate_plan, describe_action, ActionValidationError
+from utils.json_stream import iter_json, extract_json
+from resume_parser import read_upload, ResumeError, PROMPT_VERSION
+from resume_jobs import ResumeJobQueue, RemoteResumeJobQueue, QueueFullError, QueueClosedError
+from observations import (ObservationTracker, format_observation, format_observation_diff,
+                          record_observation, INCREMENTAL_OBSERVATIONS)
 from dotenv import load_dotenv
 from auth import generate_otp, send_otp_email, create_token, verify_token, require_auth, OTP_EXPIRY_SECONDS
 
@@ -22,44 +45,214 @@ load_dotenv()
 AGENTS_DIR = os.path.join(os.path.dirname(__file__), "agents")
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
 PROFILE_DIR = os.path.join(os.path.dirname(__file__), "data", "profiles")
+MAX_CONCURRENT_AGENTS = int(os.getenv("MAX_CONCURRENT_AGENTS", "3"))
+AGENT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+# all: API and agents in one process; api / worker: each on its own, sharing state through SQLite
+XAPPLY_ROLE = os.getenv("XAPPLY_ROLE", "all")
+if XAPPLY_ROLE not in ("all", "api", "worker"):
+    raise ValueError(f"XAPPLY_ROLE must be all, api or worker, not {XAPPLY_ROLE!r}")
 
 # --- Shared State ---
-agent_state = {
+# Mutations are pushed to /state/stream subscribers as deltas
+state_stream = StateStream()
+agent_state = ObservableState(state_stream, {
     "active": False,
     "status": "Idle",
-    "logs": [],
-    "latest_screenshot": None,
-    "current_task": None
-}
-
-def log_event(message):
-    timestamp = time.strftime("%H:%M:%S")
-    entry = f"[{timestamp}] {message}"
-    print(entry)
-    agent_state["logs"].append(entry)
-    if len(agent_state["logs"]) > 50:
-        agent_state["logs"].pop(0)
+    "latest_screenshot": None,  # ETag of the frame served by /screenshot
+    "current_task": None,
+    "agents": {}  # Per-agent status, task and active flag
+}, events=EventLog())  # Log lines, see /logs
+latest_frame = LatestFrame()
+task_watcher = TaskWatcher()  # Wakes run_loop when an *_input.txt changes
+
+# Agent worker threads set this so their log lines are attributed to them
+_log_context = threading.local()
+
+def log_event(message, level="info"):
+    agent_id = getattr(_log_context, "agent_id", None)
+    event = agent_state.log(message, level=level, agent_id=agent_id)
+    print(format_event(event))
 
 # --- Flask API ---
 app = Flask(__name__)
 CORS(app)
 
+HTTP_REQUESTS = Counter("xapply_http_requests", "HTTP requests served", ("method", "route", "status"))
+HTTP_SECONDS = Histogram("xapply_http_request_seconds", "Time to produce an HTTP response", ("method", "route"),
+                         buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+BRAIN_PHASE_SECONDS = Histogram("xapply_brain_phase_seconds", "Time per phase of a brain call", ("mode", "phase"),
+                                buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0))
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # The matched rule, not the path, so ids in URLs don't multiply the series
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    HTTP_SECONDS.observe(time.perf_counter() - g.request_start, method=request.method, route=route)
+    HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+    return response
+
+# Shared handle - connections come from the process-wide pool
+db = Database()
+decision_cache = DecisionCache(db)
+run_ledger = RunLedger(db)  # Per-step timings of surfing runs, see /runs
+page_fetcher = PageFetcher()  # Browserless fast path for server-rendered boards, shared by every agent
+if XAPPLY_ROLE == "api":
+    # Agents run in the worker process: read the state it mirrors, send it commands and resume jobs
+    remote_state = RemoteState(db, agent_state.snapshot()[1])
+    resume_jobs = RemoteResumeJobQueue(db, remote_state)
+else:
+    remote_state = None
+    # Resume parsing runs off the request threads; progress goes out on /state/stream too
+    resume_jobs = ResumeJobQueue(db, on_update=lambda job: state_stream.publish("resume_job", job))
+
 @app.route('/state', methods=['GET'])
 def get_state():
-    return jsonify(agent_state)
+    return jsonify((remote_state or agent_state).snapshot()[1])
+
+@app.route('/logs', methods=['GET'])
+def get_logs():
+    """
+    Log events newer than ?since=<seq> (default 0), oldest first, optionally
+    for one ?agent= and capped at ?limit=. Returns {"events", "next", "missed"}:
+    poll again with since=next; "missed" means older events were overwritten.
+    """
+    try:
+        since = int(request.args.get("since", 0))
+        limit = int(request.args.get("limit", 500))
+    except ValueError:
+        return jsonify({"error": "since and limit must be integers"}), 400
+    agent_id = request.args.get("agent")
+    if agent_id and not AGENT_ID_PATTERN.match(agent_id):
+        return jsonify({"error": "Invalid agent id"}), 400
+    
+    events, next_seq, missed = (remote_state or agent_state.events).since(since, agent_id=agent_id, limit=max(1, limit))
+    return jsonify({"events": events, "next": next_seq, "missed": missed})
+
+@app.route('/screenshot', methods=['GET'])
+def get_screenshot():
+    """Serves the latest frame as binary. Honours If-None-Match so unchanged frames cost a 304."""
+    frame = remote_state.get_frame() if remote_state else latest_frame.get()
+    if not frame:
+        return jsonify({"error": "No screenshot yet"}), 404
+    
+    etag = f'"{frame["etag"]}"'
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers={"ETag": etag})
+    return Response(frame["data"], mimetype=frame["mime_type"], headers={
+        "ETag": etag,
+        "Cache-Control": "no-cache"
+    })
+
+@app.route('/state/stream', methods=['GET'])
+def stream_state():
+    """
+    Server-Sent Events feed of agent state. Sends a snapshot on connect, then
+    only deltas: "log", "status" and "screenshot" (a notice, not the image).
+    Reconnecting clients resume from Last-Event-ID (or ?since=).
+    """
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("since")
+    stream = remote_state or state_stream
+    
+    def snapshot_frame():
+        seq, state = (remote_state or agent_state).snapshot()
+        return seq, format_frame(seq, "snapshot", state)
+    
+    def generate():
+        seq = int(last_id) if last_id and last_id.isdigit() else None
+        yield "retry: 2000\n\n"
+        if seq is None or seq > stream.seq:
+            seq, frame = snapshot_frame()
+            yield frame
+        
+        while True:
+            frames, new_seq, missed = stream.frames_since(seq, timeout=15)
+            if missed:
+                # Fell behind the history window - resync from a fresh snapshot
+                seq, frame = snapshot_frame()
+                yield frame
+                continue
+            if not frames:
+                yield ": keepalive\n\n"
+                continue
+            seq = new_seq
+            yield "".join(frames)
+    
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text format. In the split deployment, the worker's metrics come along with process="worker"."""
+    if remote_state:
+        worker = remote_state.stats().get("metrics") or []
+        text = render_metrics((REGISTRY.collect(), {"process": "api"}), (worker, {"process": "worker"}))
+    else:
+        text = render_metrics((REGISTRY.collect(), {}))
+    return Response(text, content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/decision_cache', methods=['GET'])
+def get_decision_cache_stats():
+    if remote_state:
+        # Hit/miss counters live in the worker
+        return jsonify(remote_state.stats().get("decision_cache") or decision_cache.stats())
+    return jsonify(decision_cache.stats())
+
+@app.route('/runs', methods=['GET'])
+def get_runs():
+    """Recent surfing runs (?agent=, ?limit=) with total capture / brain / execute time."""
+    try:
+        limit = int(request.args.get("limit", 50))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify({"runs": db.get_runs(limit=max(1, min(limit, 500)), agent_id=request.args.get("agent"))})
+
+@app.route('/runs/<run_id>', methods=['GET'])
+def get_run(run_id):
+    """One run with every step: URL, fingerprint, prompt size, plan, actions, outcome and timings."""
+    run = db.get_run(run_id)
+    if not run:
+        return jsonify({"error": "Unknown run"}), 404
+    return jsonify(run)
 
 @app.route('/jobs', methods=['GET'])
 def get_jobs():
-    db = Database()
+    """
+    Keyset-paginated job listing, filtered in SQL.
+    ?status=scouted|applied&after=<cursor>&limit=N returns {"jobs": [...], "next": cursor}.
+    Without a status, returns the first page of each status as {"scouted", "applied", "next"}.
+    """
+    status = request.args.get("status")
+    after = request.args.get("after")
+    try:
+        limit = int(request.args.get("limit", 50))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    
     try:
-        jobs = db.get_jobs()
-        return jsonify({"scouted": [j for j in jobs if j['status'] == 'scouted'], "applied": [j for j in jobs if j['status'] == 'applied']})
+        if status:
+            jobs, next_cursor = db.get_jobs_page(status=status, after=after, limit=limit)
+            return jsonify({"jobs": jobs, "next": next_cursor})
+        
+        scouted, next_scouted = db.get_jobs_page(status="scouted", limit=limit)
+        applied, next_applied = db.get_jobs_page(status="applied", limit=limit)
+        return jsonify({
+            "scouted": scouted,
+            "applied": applied,
+            "next": {"scouted": next_scouted, "applied": next_applied}
+        })
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
     except Exception as e:
-        return jsonify({"error": str(e)})
+        return jsonify({"error": str(e)}), 500
 
 @app.route('/profile', methods=['GET', 'POST'])
 def handle_profile():
-    db = Database()
     if request.method == 'GET':
         try:
             return jsonify(db.get_profile())
@@ -77,7 +270,6 @@ def handle_profile():
 @app.route('/onboarding', methods=['GET', 'POST'])
 def handle_onboarding():
     """Check or update onboarding status."""
-    db = Database()
     if request.method == 'GET':
         return jsonify({"hasOnboarded": db.has_onboarded()})
     elif request.method == 'POST':
@@ -100,7 +292,6 @@ def send_otp():
     otp_code = generate_otp()
     expires_at = time.time() + OTP_EXPIRY_SECONDS
     
-    db = Database()
     db.save_otp(email, otp_code, expires_at)
     
     # Send email
@@ -122,7 +313,6 @@ def verify_otp_endpoint():
     if not email or not otp_code:
         return jsonify({"error": "Email and OTP required"}), 400
     
-    db = Database()
     is_valid = db.verify_otp(email, otp_code)
     
     if is_valid:
@@ -139,6 +329,11 @@ def get_current_user():
 
 @app.route('/upload_resume', methods=['POST'])
 def upload_resume():
+    """
+    Starts parsing a CV. A file parsed before comes straight back (200 with
+    the profile); otherwise returns 202 with a job id to poll at
+    GET /upload_resume/<id>.
+    """
     if 'file' not in request.files:
         return jsonify({"error": "No file part"}), 400
     file = request.files['file']
@@ -146,127 +341,166 @@ def upload_resume():
         return jsonify({"error": "No selected file"}), 400
     
     try:
-        # Save temp file
-        # Save temp file
-        db = Database()
-        data_dir = os.path.join(os.path.dirname(__file__), "data")
-        os.makedirs(data_dir, exist_ok=True)
-        temp_path = os.path.join(data_dir, f"temp_{file.filename}")
-        file.save(temp_path)
-        
-        # Configure Gemini
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-             return jsonify({"error": "Missing GEMINI_API_KEY"}), 500
-        
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # Upload to Gemini (or pass as data)
-        # For simplicity with the SDK, we'll assume image/pdf support via mime_type
+        # Hash while reading - identical re-uploads are served from the resume cache
+        file_data, content_hash = read_upload(file.stream)
         mime_type = file.content_type or "application/pdf"
         
-        with open(temp_path, "rb") as f:
-            file_data = f.read()
-
-        prompt = """
-        Extract the resume information from this document into the following JSON structure:
-        {
-            "personalInfo": {
-                "name": "Full Name",
-                "title": "Current Job Title",
-                "address": "Location/City",
-                "phone": "Phone Number",
-                "email": "Email Address"
-            },
-            "summary": "Professional summary text",
-            "skills": [
-                { "category": "Category Name (e.g. Languages)", "items": ["Skill1", "Skill2"] }
-            ],
-            "experience": [
-                {
-                    "company": "Company Name",
-                    "location": "Location",
-                    "role": "Job Title",
-                    "dates": "Date Range",
-                    "bullets": ["Achievement 1", "Achievement 2"]
-                }
-            ],
-            "education": [
-                {
-                    "degree": "Degree Name",
-                    "institution": "University Name",
-                    "location": "Location",
-                    "dates": "Date Range",
-                    "details": ["Honors", "GPA"]
-                }
-            ]
-        }
-        Return ONLY valid JSON.
-        """
-        
-        content = [
-            {"mime_type": mime_type, "data": file_data},
-            prompt
-        ]
-        
-        response = model.generate_content(content)
-        cleaned_json = response.text.replace("```json", "").replace("```", "").strip()
-        resume_data = json.loads(cleaned_json)
-        
-        # Save to DB
-        db = Database()
-        db.save_profile(resume_data)
-        db.set_onboarded(True)  # Mark onboarding complete after successful upload
-            
-        # Clean up
-        os.remove(temp_path)
+        cached = db.get_cached_resume(content_hash, PROMPT_VERSION)
+        if cached is not None:
+            db.save_profile(cached)
+            db.set_onboarded(True)  # Mark onboarding complete after successful upload
+            response = jsonify(cached)
+            response.headers["X-Resume-Cache"] = "HIT"
+            return response
         
-        return jsonify(resume_data)
+        job_id = resume_jobs.submit(file_data, content_hash, mime_type, file.filename)
+        return jsonify({"job_id": job_id, "status": "queued", "status_url": f"/upload_resume/{job_id}"}), 202, {
+            "Location": f"/upload_resume/{job_id}"
+        }
 
+    except ResumeError as e:
+        return jsonify({"error": str(e)}), e.status
+    except QueueFullError:
+        return jsonify({"error": "Too many resumes being processed, try again shortly"}), 503, {"Retry-After": "10"}
+    except QueueClosedError:
+        return jsonify({"error": "Server is shutting down, try again shortly"}), 503, {"Retry-After": "10"}
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/upload_resume/<job_id>', methods=['GET'])
+def get_resume_job(job_id):
+    """Status of a resume job: queued, processing, done (with "result") or error."""
+    job = resume_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
+
 @app.route('/control', methods=['POST'])
 def control_agent():
+    """
+    start/stop the agents. Pass "agent" to target a single agent; stops are
+    cooperative and take effect at that agent's next step.
+    """
     data = request.json
     command = data.get("command")
+    agent_id = data.get("agent")
+    if agent_id and not AGENT_ID_PATTERN.match(agent_id):
+        return jsonify({"error": "Invalid agent id"}), 400
+    boards = data.get("boards")
+    if boards is not None and not (isinstance(boards, list) and all(
+            isinstance(url, str) and url.startswith(("http://", "https://")) for url in boards)):
+        return jsonify({"error": "boards must be a list of http(s) URLs"}), 400
     
+    if remote_state:
+        if command in ("start", "stop", "crawl"):
+            remote_state.send_command(command, agent=agent_id, task=data.get("task"), boards=boards)
+        return jsonify({"success": True})
+    apply_control(command, agent_id, data.get("task"), boards)
+    return jsonify({"success": True})
+
+def apply_control(command, agent_id=None, task=None, boards=None):
+    """
+    Applies a start/stop/crawl command - from /control, or from the state
+    channel in the worker. A stop without an agent also stops a running crawl.
+    """
     if command == "start":
         agent_state["active"] = True
         agent_state["status"] = "Starting..."
-        log_event("Received START command from frontend.")
+        if agent_id:
+            agent_state.update_agent(agent_id, active=True)
+            log_event(f"Received START command for {agent_id}.")
+        else:
+            for known_id in list(agent_state["agents"]):
+                agent_state.update_agent(known_id, active=True)
+            log_event("Received START command from frontend.")
         
-        task_file = os.path.join(AGENTS_DIR, "a1_frontend_input.txt")
-        if not os.path.exists(task_file) or os.path.getsize(task_file) == 0 or data.get("task"):
+        task_file = os.path.join(AGENTS_DIR, f"{agent_id or 'a1_frontend'}_input.txt")
+        if not os.path.exists(task_file) or os.path.getsize(task_file) == 0 or task:
             with open(task_file, 'w') as f:
-                task_content = data.get("task") or "Browse https://testdevjobs.com/ for 'Software Engineer' jobs and apply."
+                task_content = task or "Browse https://testdevjobs.com/ for 'Software Engineer' jobs and apply."
                 f.write(task_content)
             log_event(f"Injected browsing task: {task_content[:50]}...")
+        task_watcher.notify()
             
     elif command == "stop":
-        agent_state["active"] = False
-        agent_state["status"] = "Stopping..."
-        log_event("Received STOP command.")
-        
-    return jsonify({"success": True})
+        if agent_id:
+            agent_state.update_agent(agent_id, active=False, status="Stopping...")
+            log_event(f"Received STOP command for {agent_id}.")
+        else:
+            agent_state["active"] = False
+            agent_state["status"] = "Stopping..."
+            crawl_stop.set()
+            log_event("Received STOP command.")
+    
+    elif command == "crawl":
+        start_scouting_crawl(boards)
+
+# The scouting crawler runs on its own thread, one crawl at a time
+crawl_thread = None
+crawl_stop = threading.Event()
+
+def start_scouting_crawl(boards=None):
+    """Starts crawling `boards` (default CRAWL_BOARDS) into the jobs table, unless a crawl is running."""
+    global crawl_thread
+    boards = boards or CRAWL_BOARDS
+    if not boards:
+        log_event("Crawl requested, but no boards were given and CRAWL_BOARDS is empty.", level="warning")
+        return
+    if crawl_thread and crawl_thread.is_alive():
+        log_event("A crawl is already running.", level="warning")
+        return
+    crawl_stop.clear()
+    log_event(f"Crawling {len(boards)} board(s) for listings...")
+    crawl_thread = start_crawl(db, boards, fetcher=page_fetcher, should_stop=crawl_stop.is_set, log=log_crawl)
+
+def log_crawl(message, level="info"):
+    # Called on the crawler thread, so its lines are attributed to "crawler"
+    _log_context.agent_id = "crawler"
+    log_event(message, level=level)
+
+def worker_stats():
+    """What the worker publishes for the API processes' /decision_cache and /metrics."""
+    return {"decision_cache": decision_cache.stats(), "metrics": REGISTRY.collect()}
+
+def handle_command(command):
+    """Worker side of the state channel: commands queued by the API processes."""
+    if command["command"] == "resume_job":
+        resume_jobs.adopt(command["job_id"])
+    else:
+        apply_control(command["command"], command.get("agent"), command.get("task"), command.get("boards"))
 
 def run_api():
-    app.run(port=5000, debug=False, use_reloader=False)
+    app.run(port=5000, debug=False, use_reloader=False, threaded=True)
 
 # --- Agent Logic ---
 
 class AgentOrchestrator:
     def __init__(self):
-        self.brain_mode = "browser" # 'browser' or 'api'
+        self.brain_mode = BRAIN_MODE # 'browser' or 'api'
         self.brain_driver = None
         self.brain_model = None
-        self.surfer = None
-        self.db = Database()
+        self.brain_client = None  # BrainClient in api mode
+        self.brain_lock = threading.Lock()  # One brain browser serves every agent
+        self.brain_conversation = None  # agent_id whose chat is open in the brain, if any
+        # Warm, profile-isolated surfer browsers leased per task
+        self.browser_pool = BrowserPool(factory=lambda slot: JobSurfer(profile_name=f"surfer_{slot}"))
+        self.page_fetcher = page_fetcher
+        self.js_hosts = set()  # Hosts the fast path had to hand to Chrome; later tasks start there in Chrome
+        self.running = set()  # agent ids with a task submitted to the scheduler
+        self.running_lock = threading.Lock()
+        self.db = db
+        self.decision_cache = decision_cache
+        self.ledger = run_ledger
+        self.last_ask = threading.local()  # Prompt size of this thread's last ask_ai, for the ledger
         self.ensure_agent_files()
         
     def setup_brain(self):
-        """Initializes the AI Interface (Brain) using Outlier AI Playground."""
+        """Initializes the AI Interface (Brain): the API client, or the Outlier AI Playground."""
+        if self.brain_mode == "api":
+            if not self.brain_client:
+                self.brain_client = BrainClient(pool_size=MAX_CONCURRENT_AGENTS)
+                log_event(f"Brain API client ready ({self.brain_client.model}).")
+            return
         if self.brain_driver: 
             return
         
@@ -286,7 +520,7 @@ class AgentOrchestrator:
         
         # Navigate to Outlier playground
         self.brain_driver.get("https://app.outlier.ai/playground")
-        time.sleep(3)
+        wait_for_page_settled(self.brain_driver)
         
         driver = self.brain_driver
         
@@ -352,7 +586,7 @@ class AgentOrchestrator:
                         pass
                         
                 except Exception as e:
-                    log_event(f"Google login form error (may be already logged in): {e}")
+                    log_event(f"Google login form error (may be already logged in): {e}", level="warning")
                 
                 # Wait for redirect back to Outlier
                 for _ in range(30):
@@ -363,28 +597,30 @@ class AgentOrchestrator:
                 # Skip onboarding by going directly to playground
                 driver.get("https://app.outlier.ai/playground")
                 log_event("Navigated to playground (skipping onboarding)")
-                time.sleep(2)
+                wait_for_page_settled(driver)
                         
             except Exception as e:
-                log_event(f"Login automation error: {e}")
+                log_event(f"Login automation error: {e}", level="warning")
         
         # If we're on onboarding, go to playground directly
         if "onboarding" in driver.current_url:
             driver.get("https://app.outlier.ai/playground")
             log_event("Skipped onboarding - went to playground")
-            time.sleep(2)
+            wait_for_page_settled(driver)
         
         # Ensure we're on playground
         if "playground" not in driver.current_url:
             driver.get("https://app.outlier.ai/playground")
-            time.sleep(2)
+            wait_for_page_settled(driver)
         
         log_event("Outlier AI Playground Ready.")
 
     def setup_body(self):
-        """Initializes the browser for Job Surfing (Body)."""
-        if self.surfer: return
-        self.surfer = JobSurfer()
+        """Pre-launches the pool of Job Surfing browsers (Bodies)."""
+        self.browser_pool.start()
+
+    def close_bodies(self):
+        self.browser_pool.close()
 
     def ensure_agent_files(self):
         config_path = os.path.join(AGENTS_DIR, "config.json")
@@ -400,84 +636,149 @@ class AgentOrchestrator:
         with open(os.path.join(AGENTS_DIR, "a1_frontend_input.txt"), 'w') as f: f.write("")
         with open(os.path.join(AGENTS_DIR, "a1_frontend_output.txt"), 'w') as f: f.write("")
 
-    def ask_ai(self, prompt, context=None):
-        """Sends prompt + context to AI Brain."""
-        self.setup_brain()
+    def ask_ai(self, prompt, context=None, diff=None, keep_conversation=False, use_cache=True):
+        """
+        Sends prompt + context to AI Brain.
+        With keep_conversation, the brain conversation stays open for the calling
+        agent and later calls may pass just a `diff` of the page (incremental mode).
+        A diff is only sent if that agent's conversation is still the open one;
+        otherwise the full observation starts a new conversation.
+        Observations the brain has already answered for this task are served
+        from the decision cache without a brain call, unless use_cache=False.
+        """
+        agent_id = getattr(_log_context, "agent_id", None)
         
-        full_prompt = prompt
-        if context:
-            # Build interactive elements list
-            elements_text = ""
-            if context.get('interactive_elements'):
-                elements_text = "\n\nAVAILABLE INTERACTIVE ELEMENTS (use these selectors exactly):\n"
-                for el in context['interactive_elements']:
-                    el_desc = f"  [{el['index']}] {el['tag']} | selector: \"{el['selector']}\" | text: \"{el['text']}\""
-                    if el.get('type'):
-                        el_desc += f" | type: {el['type']}"
-                    if el.get('href'):
-                        el_desc += f" | href: {el['href']}"
-                    elements_text += el_desc + "\n"
-            
-            full_prompt += f"\n\nCURRENT BROWSER STATE:\nURL: {context['url']}\nPAGE TEXT (excerpt): {context['text_content'][:1500]}\n"
-            full_prompt += elements_text
-            full_prompt += """
-YOU MUST RESPOND WITH ONLY A JSON OBJECT. NO TEXT BEFORE OR AFTER.
-
-You are a web browsing agent. Based on the current page state and available elements, decide the next action.
+        if context is not None and use_cache:
+            cached = self.decision_cache.get(prompt, context)
+            if cached:
+                self.last_ask.prompt_chars, self.last_ask.cached = 0, True
+                log_event(f"Decision cache hit: {cached[:80]}...")
+                # The brain never saw this page, so the next step must not send it a diff
+                self.end_brain_conversation(agent_id)
+                return cached
+        
+        self.last_ask.cached = False
+        if self.brain_mode == "api":
+            response = self.ask_api_brain(prompt, context, diff, keep_conversation, agent_id)
+        else:
+            # Agents run concurrently but share one brain browser
+            waited = time.perf_counter()
+            with self.brain_lock:
+                BRAIN_PHASE_SECONDS.observe(time.perf_counter() - waited, mode="browser", phase="lock_wait")
+                self.setup_brain()
+                if diff is not None and agent_id and self.brain_conversation == agent_id:
+                    full_prompt = format_observation_diff(diff)
+                    self.last_ask.prompt_chars = len(full_prompt)
+                    response = self.ask_browser_brain(full_prompt, new_conversation=False)
+                else:
+                    full_prompt = format_observation(prompt, context) if context else prompt
+                    self.last_ask.prompt_chars = len(full_prompt)
+                    self.brain_conversation = agent_id if keep_conversation else None
+                    response = self.ask_browser_brain(full_prompt)
+        
+        if context is not None:
+            self.decision_cache.put(prompt, context, response)
+        return response
 
-RESPONSE FORMAT (pick one):
-{"action": "click", "selector": "EXACT_SELECTOR_FROM_LIST"}
-{"action": "type", "selector": "EXACT_SELECTOR_FROM_LIST", "value": "text to type"}
-{"action": "navigate", "url": "https://..."}
-{"action": "scroll"}
-{"action": "done", "reason": "brief reason"}
+    def end_brain_conversation(self, agent_id):
+        """Makes the agent's next brain call start a new conversation with a full observation."""
+        if self.brain_client:
+            self.brain_client.end_conversation(agent_id)
+        # A plain assignment - taking brain_lock here would make cache hits wait behind brain calls
+        if agent_id and self.brain_conversation == agent_id:
+            self.brain_conversation = None
 
-RULES:
-1. Output ONLY the JSON object, nothing else
-2. Use selectors EXACTLY as shown in the AVAILABLE INTERACTIVE ELEMENTS list
-3. For job searching, look for search inputs or job listing links"""
+    def ask_api_brain(self, prompt, context, diff, keep_conversation, agent_id):
+        """API mode: no shared browser, so agents ask concurrently, each in its own conversation."""
+        self.setup_brain()
+        conversation = agent_id if keep_conversation else None
+        if diff is not None and conversation and self.brain_client.has_conversation(conversation):
+            full_prompt, new_conversation = format_observation_diff(diff), False
+        else:
+            full_prompt, new_conversation = (format_observation(prompt, context) if context else prompt), True
+        self.last_ask.prompt_chars = len(full_prompt)
+        
+        try:
+            # Observations are answered with a JSON action; plain prompts (coding mode) with free text
+            with BRAIN_PHASE_SECONDS.time(mode="api", phase="request"):
+                response = self.brain_client.ask(full_prompt, conversation=conversation,
+                                                 new_conversation=new_conversation,
+                                                 stop_on_json=context is not None or diff is not None)
+        except BrainAPIError as e:
+            log_event(f"Brain API Error: {e}", level="error")
+            if conversation:
+                self.brain_client.end_conversation(conversation)
+            return None
+        
+        timings = self.brain_client.last_timings
+        log_event(f"AI responded in {timings.get('total_ms')} ms: {response[:80]}...")
+        return response
 
+    def ask_browser_brain(self, full_prompt, new_conversation=True):
+        """
+        Sends a fully built prompt to the Outlier AI Playground and returns the raw reply.
+        With new_conversation=False the prompt is sent as a follow-up in the open chat.
+        """
         # --- BROWSER MODE (Outlier AI Playground) ---
         driver = self.brain_driver
+        phases = BRAIN_PHASE_SECONDS.phases(mode="browser")
         try:
             log_event("Consulting AI Brain (Outlier)...")
             
-            # Start a new conversation by navigating to playground
-            driver.get("https://app.outlier.ai/playground")
-            time.sleep(3)
+            response_selectors = [
+                "[class*='response']",
+                "[class*='message']",
+                "[class*='output']",
+                "[class*='answer']",
+                "[class*='assistant']",
+                "pre",
+                "code"
+            ]
+            stale_texts = set()
+            if not new_conversation:
+                # Earlier replies in this chat must not be mistaken for the new one
+                stale_texts.update(collect_texts(driver, response_selectors))
             
-            # Step 1: Click model picker button using data-testid
-            try:
-                model_picker = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, "[data-testid='model-picker-button']"))
-                )
-                model_picker.click()
-                log_event("Opened model picker")
-                time.sleep(2)
+            if new_conversation:
+                # Start a new conversation by navigating to playground
+                phases.enter("navigate")
+                driver.get("https://app.outlier.ai/playground")
+                wait_for_document_ready(driver)
                 
-                # Step 2: Select Claude Opus 4.5
-                claude_card = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, "[data-testid='model-card-claude-opus-4-5-20251101']"))
-                )
-                claude_card.click()
-                log_event("Selected Claude Opus 4.5")
-                time.sleep(2)
-            except Exception as e:
-                log_event(f"Model selection issue: {e}")
-            
-            # Filter out non-BMP characters
-            clean_prompt = ''.join(c for c in full_prompt if ord(c) <= 0xFFFF)
+                # Step 1: Click model picker button using data-testid
+                phases.enter("model_pick")
+                try:
+                    model_picker = WebDriverWait(driver, 10).until(
+                        EC.element_to_be_clickable((By.CSS_SELECTOR, "[data-testid='model-picker-button']"))
+                    )
+                    model_picker.click()
+                    log_event("Opened model picker")
+                
+                    # Step 2: Select Claude Opus 4.5
+                    claude_card = WebDriverWait(driver, 10).until(
+                        EC.element_to_be_clickable((By.CSS_SELECTOR, "[data-testid='model-card-claude-opus-4-5-20251101']"))
+                    )
+                    claude_card.click()
+                    log_event("Selected Claude Opus 4.5")
+                    wait_for_dom_quiet(driver, timeout=2)
+                except Exception as e:
+                    log_event(f"Model selection issue: {e}", level="warning")
             
-            # Step 3: Type message in textarea
+            # Step 3: Put the message in the textarea in one go (send_keys is a fallback)
+            phases.enter("type")
             textarea = WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.TAG_NAME, "textarea"))
             )
-            textarea.clear()
-            textarea.send_keys(clean_prompt + " ")  # Add space to activate button
-            log_event("Typed message")
-            time.sleep(1)
+            inject_start = time.perf_counter()
+            method = inject_text(driver, textarea, full_prompt + " ")  # Trailing space activates the button
+            inject_ms = (time.perf_counter() - inject_start) * 1000
+            if method:
+                log_event(f"Entered message ({len(full_prompt)} chars via {method}, {inject_ms:.0f} ms)")
+            else:
+                log_event("Message may be incomplete - textarea value didn't match after every method", level="warning")
             
             # Step 4: Wait for send button to be enabled and click it
+            phases.enter("send")
             send_button = None
             for attempt in range(10):
                 try:
@@ -518,51 +819,33 @@ RULES:
                     driver.execute_script("arguments[0].click();", parent)
                     log_event("Clicked send button (JS fallback)")
                 except:
-                    log_event("Could not click send button")
+                    log_event("Could not click send button", level="warning")
             
-            # Wait for response (poll until response appears or timeout)
+            # Wait in the page for the reply to finish streaming and hold a JSON object
             log_event("Waiting for AI response...")
+            phases.enter("wait")
             response = None
-            for _ in range(30):  # Max 30 seconds
-                time.sleep(1)
-                
-                # Try to find response content
-                response_selectors = [
-                    "[class*='response']",
-                    "[class*='message']",
-                    "[class*='output']",
-                    "[class*='answer']",
-                    "[class*='assistant']",
-                    "pre",
-                    "code"
-                ]
-                
-                for sel in response_selectors:
-                    try:
-                        elements = driver.find_elements(By.CSS_SELECTOR, sel)
-                        for el in reversed(elements):
-                            text = el.text.strip()
-                            if text and len(text) > 10 and "{" in text:
-                                response = text
-                                break
-                        if response:
-                            break
-                    except:
-                        continue
-                
-                if response:
-                    break
+            reply = wait_for_reply(driver, response_selectors, stale_texts, full_prompt)
+            if reply and reply.get("json"):
+                response = reply["json"]
+                if not reply["complete"]:
+                    log_event("AI response still changing at timeout - using the JSON found so far")
+            elif reply and reply.get("text"):
+                response = reply["text"]
                     
             if not response:
                 # Fallback: get any div with JSON-like content
                 all_text = driver.execute_script("return document.body.innerText;")
-                import re
-                json_match = re.search(r'\{[^{}]*"action"[^{}]*\}', all_text)
-                if json_match:
-                    response = json_match.group(0)
+                # Last valid action/plan - earlier ones are the prompt's examples or older replies
+                for value in iter_json(all_text):
+                    try:
+                        validate_plan(value)
+                        response = json.dumps(value)
+                    except ActionValidationError:
+                        continue
             
             if not response:
-                log_event("No response from Outlier AI")
+                log_event("No response from Outlier AI", level="warning")
                 return None
                 
             log_event(f"AI responded: {response[:80]}...")
@@ -572,122 +855,278 @@ RULES:
             
             # Extract JSON if mixed with text
             if not response.startswith("{"):
-                import re
-                json_match = re.search(r'\{[^{}]*\}', response)
-                if json_match:
-                    response = json_match.group(0)
+                value = extract_json(response)
+                if value is not None:
+                    response = json.dumps(value)
             
             return response
             
         except Exception as e:
-            log_event(f"Brain Browser Error: {e}")
+            log_event(f"Brain Browser Error: {e}", level="error")
             return None
+        finally:
+            phases.done()
 
     def run_loop(self):
         log_event("Orchestrator Active. Waiting for command...")
         
         # Pre-initialize brain to check for API key
         self.setup_brain()
+        self.setup_body()
 
-        while True:
-            if not agent_state["active"]:
-                time.sleep(1)
+        scheduler = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_AGENTS, thread_name_prefix="agent")
+        task_watcher.start(AGENTS_DIR)
+        try:
+            while True:
+                # Woken by file events or /control; falls back to a slow poll.
+                # Cleared before the scan so a signal during it isn't lost.
+                task_watcher.clear()
+                if not agent_state["active"]:
+                    task_watcher.wait()
+                    continue
+
+                self.dispatch_pending(scheduler)
+                task_watcher.wait()
+        finally:
+            # Running agents stop at their next step; don't block shutdown on them
+            agent_state["active"] = False
+            scheduler.shutdown(wait=False, cancel_futures=True)
+            task_watcher.stop()
+
+    def dispatch_pending(self, scheduler):
+        """Submits every agent with a pending task that isn't already running."""
+        for filename in sorted(os.listdir(AGENTS_DIR)):
+            if not filename.endswith("_input.txt"):
                 continue
+            agent_id = filename.replace("_input.txt", "")
+            file_path = os.path.join(AGENTS_DIR, filename)
+            
+            with self.running_lock:
+                if agent_id in self.running or not agent_state.agent_active(agent_id):
+                    continue
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        content = f.read().strip()
+                except Exception as e:
+                    log_event(f"Error: {e}", level="error")
+                    continue
+                if not content:
+                    continue
+                self.running.add(agent_id)
+            
+            agent_state.update_agent(agent_id, status="Queued", current_task=content)
+            scheduler.submit(self.run_agent_task, agent_id, file_path, content)
+
+    def agent_should_run(self, agent_id):
+        """Cooperative stop check - global STOP or a per-agent stop."""
+        return agent_state["active"] and agent_state.agent_active(agent_id)
+
+    def run_agent_task(self, agent_id, file_path, content):
+        """Runs one agent's task on a scheduler thread."""
+        _log_context.agent_id = agent_id
+        agent_state["current_task"] = content
+        agent_state.update_agent(agent_id, status="Running", current_task=content)
+        try:
+            log_event(f"Processing Task: {content[:50]}...")
 
-            # Process Tasks
-            for filename in os.listdir(AGENTS_DIR):
-                if filename.endswith("_input.txt"):
-                    file_path = os.path.join(AGENTS_DIR, filename)
+            if "browse" in content.lower() or "apply" in content.lower() or "job" in content.lower():
+                # === SURFING MODE ===
+                self.run_surfing_task(agent_id, content)
+            else:
+                # === CODING MODE ===
+                response = self.ask_ai(content)
+                if response:
+                    FilePatcher.apply_xml_changes(response, root_dir=ROOT_DIR)
+                    with open(os.path.join(AGENTS_DIR, f"{agent_id}_output.txt"), 'w') as f:
+                        f.write(response)
+
+            # Clear input
+            with open(file_path, 'w') as f: f.write("")
                     
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read().strip()
-                        
-                        if content:
-                            agent_id = filename.replace("_input.txt", "")
-                            agent_state["current_task"] = content
-                            log_event(f"Processing Task: {content[:50]}...")
-
-                            if "browse" in content.lower() or "apply" in content.lower() or "job" in content.lower():
-                                # === SURFING MODE ===
-                                self.setup_body()
-                                agent_state["status"] = "Surfing"
-                                
-                                max_steps = 20  # Safety limit
-                                step = 0
-                                
-                                while agent_state["active"] and step < max_steps:
-                                    step += 1
-                                    log_event(f"Step {step}/{max_steps}: Observing...")
-                                    
-                                    # 1. Observe
-                                    observation = self.surfer.capture_state()
-                                    agent_state["latest_screenshot"] = observation["screenshot"]
-                                    
-                                    # 2. Orient - Ask AI what to do
-                                    plan = self.ask_ai(content, context=observation)
-                                    
-                                    # 3. Act
-                                    if not plan:
-                                        log_event("No plan from AI. Stopping.")
-                                        break
-                                        
-                                    log_event(f"AI Plan: {plan[:80]}...")
-                                    
-                                    try:
-                                        action_data = json.loads(plan)
-                                        
-                                        # Check for done action
-                                        action_type = action_data.get("action") or action_data.get("type")
-                                        if action_type == "done":
-                                            log_event(f"Task complete: {action_data.get('reason', 'No reason given')}")
-                                            break
-                                        
-                                        # Normalize keys for execute_action
-                                        if "action" in action_data:
-                                            action_data["type"] = action_data["action"]
-                                        
-                                        success = self.surfer.execute_action(action_data)
-                                        if not success:
-                                            log_event("Action failed. Continuing anyway...")
-                                        
-                                        time.sleep(2)  # Wait for page to update
-                                        
-                                    except json.JSONDecodeError as e:
-                                        log_event(f"Failed to parse AI Plan as JSON: {e}")
-                                        break
-                                
-                                if step >= max_steps:
-                                    log_event(f"Reached max steps ({max_steps}). Stopping.")
-                                
-                                with open(os.path.join(AGENTS_DIR, f"{agent_id}_output.txt"), 'w') as f:
-                                    f.write(f"Completed {step} steps.\nLast AI Plan: {plan if plan else 'None'}")
-                                    
-                            else:
-                                # === CODING MODE ===
-                                self.setup_brain()
-                                response = self.ask_ai(content)
-                                if response:
-                                    FilePatcher.apply_xml_changes(response, root_dir=ROOT_DIR)
-                                    with open(os.path.join(AGENTS_DIR, f"{agent_id}_output.txt"), 'w') as f:
-                                        f.write(response)
-
-                            # Clear input
-                            with open(file_path, 'w') as f: f.write("")
-                            agent_state["status"] = "Idle"
-                                
-                    except Exception as e:
-                        log_event(f"Error: {e}")
-
-            time.sleep(2)
+        except Exception as e:
+            log_event(f"Error: {e}", level="error")
+        finally:
+            agent_state.update_agent(agent_id, status="Idle", current_task=None)
+            with self.running_lock:
+                self.running.discard(agent_id)
+                if not self.running:
+                    agent_state["status"] = "Idle"
+            _log_context.agent_id = None
+            # A new task may have been queued for this agent while it was busy
+            task_watcher.notify()
+
+    def run_surfing_task(self, agent_id, content):
+        agent_state["status"] = "Surfing"
+        agent_state.update_agent(agent_id, status="Surfing")
+        if not HTTP_FAST_PATH:
+            with self.browser_pool.lease() as surfer:
+                self.surf(agent_id, content, surfer)
+            return
+        # Over HTTP while pages are server-rendered; a pooled Chrome takes over if one needs JavaScript
+        try:
+            surfer = FallbackSurfer(self.page_fetcher, self.browser_pool, js_hosts=self.js_hosts)
+        except NoBrowserAvailable as e:
+            log_event(f"Task failed: {e}", level="error")
+            run_id = self.ledger.start_run(agent_id, content)
+            self.ledger.finish_run(run_id, "no_browser", actions=0, decisions=0)
+            return
+        try:
+            self.surf(agent_id, content, surfer)
+        finally:
+            surfer.close()
+
+    def surf(self, agent_id, content, surfer):
+        """
+        Observe / ask / act loop for one task on a leased browser.
+        Each brain decision may be a multi-step plan, which runs locally until
+        it finishes or a step's precondition fails; then the page is observed
+        and the brain asked again. Every cycle is recorded in the run ledger.
+        """
+        max_steps = 20  # Safety limit on actions, and on brain decisions
+        step = 0
+        decisions = 0
+        reply = None
+        finished = False
+        last_fingerprint = None  # Of the previous step's observation
+        status = "error"  # Kept if the loop raises
+        tracker = ObservationTracker() if INCREMENTAL_OBSERVATIONS else None
+        run_id = self.ledger.start_run(agent_id, content)
+        
+        try:
+            while not finished and self.agent_should_run(agent_id) and step < max_steps and decisions < max_steps:
+                log_event(f"Step {step + 1}/{max_steps}: Observing...")
+                
+                # 1. Observe
+                started = time.perf_counter()
+                observation = surfer.capture_state()
+                capture_ms = (time.perf_counter() - started) * 1000
+                frame = observation["screenshot"]
+                if frame:
+                    latest_frame.update(frame)
+                    agent_state["latest_screenshot"] = frame["etag"]
+                
+                record_observation(agent_id, observation)
+                
+                # 2. Orient - Ask AI what to do (only the page diff in incremental mode)
+                decisions += 1
+                # The last actions left the page as it was: the cached answer is what led here,
+                # so the brain has to see the (unchanged) page to decide something else
+                fingerprint = observation.get("fingerprint")
+                use_cache = fingerprint is None or fingerprint != last_fingerprint
+                last_fingerprint = fingerprint
+                started = time.perf_counter()
+                if tracker:
+                    diff = tracker.update(observation)
+                    reply = self.ask_ai(content, context=observation, diff=diff, keep_conversation=True,
+                                        use_cache=use_cache)
+                else:
+                    reply = self.ask_ai(content, context=observation, use_cache=use_cache)
+                record = {
+                    "step": decisions,
+                    "url": observation.get("url"),
+                    "fingerprint": observation.get("fingerprint"),
+                    "prompt_chars": getattr(self.last_ask, "prompt_chars", None),
+                    "cached": getattr(self.last_ask, "cached", False),
+                    "plan": reply,
+                    "actions": [],
+                    "capture_ms": round(capture_ms, 1),
+                    "brain_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "execute_ms": 0.0,
+                }
+                
+                if not reply:
+                    log_event("No plan from AI. Stopping.")
+                    self.ledger.record_step(run_id, record, "no_reply")
+                    status = "no_reply"
+                    break
+                    
+                log_event(f"AI Plan: {reply[:80]}...")
+                
+                try:
+                    plan = parse_plan(reply)
+                except ActionValidationError as e:
+                    log_event(f"Invalid AI Plan: {e}")
+                    self.ledger.record_step(run_id, record, "invalid")
+                    status = "invalid_plan"
+                    break
+                
+                # 3. Act - run the plan locally, back to the brain when it ends or stops applying
+                outcome = "ok"
+                started = time.perf_counter()
+                for index, action in enumerate(plan):
+                    if not self.agent_should_run(agent_id) or step >= max_steps:
+                        outcome = "stopped"
+                        break
+                    if action["type"] == "done":
+                        log_event(f"Task complete: {action.get('reason', 'No reason given')}")
+                        finished = True
+                        outcome = "done"
+                        break
+                    
+                    reason = surfer.check_preconditions(action)
+                    if reason:
+                        # Don't replay a cached plan that doesn't fit this page
+                        self.decision_cache.forget(content, observation)
+                        log_event(f"Plan step {index + 1}/{len(plan)} no longer applies ({reason}). Re-planning...")
+                        outcome = "replan"
+                        break
+                    
+                    step += 1
+                    record["actions"].append(describe_action(action))
+                    if len(plan) > 1:
+                        log_event(f"Step {step}/{max_steps}: plan step {index + 1}/{len(plan)}: {describe_action(action)}")
+                    if not surfer.execute_action(action):
+                        self.decision_cache.forget(content, observation)
+                        log_event("Action failed. Re-planning...", level="warning")
+                        outcome = "failed"
+                        break
+                record["execute_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                self.ledger.record_step(run_id, record, outcome)
+            
+            if finished:
+                status = "done"
+            elif not self.agent_should_run(agent_id):
+                status = "stopped"
+                log_event("Stopped.")
+            elif step >= max_steps or decisions >= max_steps:
+                status = "max_steps"
+                log_event(f"Reached max steps ({max_steps}). Stopping.")
+        finally:
+            self.ledger.finish_run(run_id, status, actions=step, decisions=decisions, last_plan=reply)
+        
+        with open(os.path.join(AGENTS_DIR, f"{agent_id}_output.txt"), 'w') as f:
+            f.write(f"Completed {step} steps with {decisions} AI decisions.\nLast AI Plan: {reply if reply else 'None'}")
 
 if __name__ == "__main__":
-    api_thread = threading.Thread(target=run_api, daemon=True)
-    api_thread.start()
-    
-    orchestrator = AgentOrchestrator()
-    try:
-        orchestrator.run_loop()
-    except KeyboardInterrupt:
-        if orchestrator.brain_driver: orchestrator.brain_driver.quit()
-        if orchestrator.surfer: orchestrator.surfer.close()
+    init_db()
+    if XAPPLY_ROLE == "api":
+        # A single API process; serve api.py with a WSGI server to run several
+        try:
+            run_api()
+        finally:
+            close_pool()
+    else:
+        resume_jobs.start()  # Also resumes jobs interrupted by the last shutdown
+        mirror = None
+        if XAPPLY_ROLE == "worker":
+            mirror = StateMirror(db, state_stream, agent_state, latest_frame, on_command=handle_command,
+                                 stats=worker_stats)
+            mirror.start()
+            print("[*] Worker mode: state and commands go through SQLite, the API runs separately")
+        else:
+            api_thread = threading.Thread(target=run_api, daemon=True)
+            api_thread.start()
+        
+        orchestrator = AgentOrchestrator()
+        try:
+            orchestrator.run_loop()
+        except KeyboardInterrupt:
+            if orchestrator.brain_driver: orchestrator.brain_driver.quit()
+            if orchestrator.brain_client: orchestrator.brain_client.close()
+            orchestrator.close_bodies()
+        finally:
+            if mirror:
+                mirror.stop()
+            run_ledger.close()
+            resume_jobs.close()
+            close_pool()
@@ -0,0 +1,154 @@
+"""
+Background resume parsing.
+
+/upload_resume used to hold a Flask thread for the whole Gemini call
+(10-30 s for a multi-page PDF), so a few concurrent onboardings starved
+every other endpoint. Uploads now become jobs in SQLite, processed by a
+small bounded worker pool; the endpoint answers 202 with a job id and the
+client polls GET /upload_resume/<id> (each change is also published on
+/state/stream as a "resume_job" event). Queued and interrupted jobs keep
+their upload in the table and are picked up again on restart.
+
+When the API runs in its own processes (XAPPLY_ROLE=api), RemoteResumeJobQueue
+only stores the job and hands its id to the agent worker, whose queue runs it.
+"""
+import os
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from resume_parser import parse_resume, ResumeError
+
+RESUME_WORKERS = int(os.getenv("RESUME_WORKERS", "2"))
+RESUME_MAX_PENDING = int(os.getenv("RESUME_MAX_PENDING", "20"))
+
+
+class QueueFullError(Exception):
+    """Too many resume jobs are already waiting."""
+
+
+class QueueClosedError(Exception):
+    """The queue has been closed (the process is shutting down) and takes no new jobs."""
+
+
+class ResumeJobQueue:
+    """Runs resume parsing jobs on a bounded pool, with their state in SQLite."""
+    def __init__(self, db, workers=RESUME_WORKERS, max_pending=RESUME_MAX_PENDING, on_update=None):
+        self.db = db
+        self.workers = workers
+        self.max_pending = max_pending
+        self.on_update = on_update  # on_update(job_summary) after every state change
+        self._executor = None
+        self._queued = set()  # Ids queued or running here
+        self._reserved = 0  # Slots taken by submit() before the job's row exists
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Starts the pool and re-queues jobs left queued or processing by a previous run.
+        Raises QueueClosedError after close().
+        """
+        with self._lock:
+            if self._closed:
+                raise QueueClosedError("Resume job queue is closed")
+            if self._executor:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="resume")
+        for job_id in self.db.get_unfinished_resume_jobs():
+            self.db.update_resume_job(job_id, status="queued", stage="requeued after restart")
+            self._enqueue(job_id)
+
+    def submit(self, data, content_hash, mime_type, filename=""):
+        """Creates a job for an upload and queues it. Returns the job id. Raises QueueFullError or QueueClosedError."""
+        self.start()  # Before the new row exists, so a first start doesn't re-queue it as a leftover
+        with self._lock:
+            pending = len(self._queued) + self._reserved
+            if pending >= self.max_pending:
+                raise QueueFullError(f"{pending} resume jobs already pending")
+            self._reserved += 1
+        job_id = uuid.uuid4().hex
+        try:
+            self.db.create_resume_job(job_id, data, content_hash, mime_type, filename)
+            self._notify(job_id)
+            self._enqueue(job_id)
+        finally:
+            with self._lock:
+                self._reserved -= 1
+        return job_id
+
+    def adopt(self, job_id):
+        """Runs a job created by another process (the API, in the split deployment)."""
+        self.start()
+        self._enqueue(job_id)
+
+    def _enqueue(self, job_id):
+        with self._lock:
+            if self._executor is None:
+                # Closed meanwhile; the job stays queued in SQLite for the next start
+                raise QueueClosedError("Resume job queue is closed")
+            if job_id in self._queued:
+                return  # Already picked up, e.g. by start() and then by adopt()
+            self._queued.add(job_id)
+            self._executor.submit(self._run, job_id)
+
+    def _run(self, job_id):
+        try:
+            job = self.db.get_resume_job(job_id, include_data=True)
+            if not job or job["status"] not in ("queued", "processing"):
+                return
+            self.db.update_resume_job(job_id, status="processing", stage="extracting")
+            self._notify(job_id)
+            profile, cached = parse_resume(self.db, job["data"], job["content_hash"], job["mime_type"])
+
+            self.db.update_resume_job(job_id, stage="saving profile")
+            self.db.save_profile(profile)
+            self.db.set_onboarded(True)  # Mark onboarding complete after successful upload
+            self.db.finish_resume_job(job_id, result=profile, cached=cached)
+        except Exception as e:
+            message = str(e) if isinstance(e, ResumeError) else f"{type(e).__name__}: {e}"
+            self.db.finish_resume_job(job_id, error=message)
+        finally:
+            with self._lock:
+                self._queued.discard(job_id)
+            self._notify(job_id)
+
+    def get(self, job_id):
+        return self.db.get_resume_job(job_id)
+
+    def _notify(self, job_id):
+        if self.on_update:
+            job = self.db.get_resume_job(job_id)
+            if job:
+                self.on_update({k: job[k] for k in ("id", "status", "stage", "error")})
+
+    def close(self):
+        """Stops taking work. Running jobs finish; queued ones resume on the next start."""
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class RemoteResumeJobQueue(ResumeJobQueue):
+    """API-process side: stores jobs and sends them to the agent worker over the state channel."""
+    def __init__(self, db, channel, max_pending=RESUME_MAX_PENDING):
+        super().__init__(db, max_pending=max_pending)
+        self.channel = channel
+
+    def start(self):
+        pass  # Jobs run, and are resumed after a restart, in the worker
+
+    def submit(self, data, content_hash, mime_type, filename=""):
+        # Counted in SQLite, since every API process takes uploads
+        pending = len(self.db.get_unfinished_resume_jobs())
+        if pending >= self.max_pending:
+            raise QueueFullError(f"{pending} resume jobs already pending")
+        job_id = uuid.uuid4().hex
+        self.db.create_resume_job(job_id, data, content_hash, mime_type, filename)
+        self.channel.send_command("resume_job", job_id=job_id)
+        return job_id
+
+    def close(self):
+        pass
@@ -0,0 +1,127 @@
+"""
+Resume extraction with Gemini, cached by content hash.
+
+Uploads are hashed while they are read - no temp file - and the parsed
+profile is cached in SQLite under (sha256 of the file, prompt version), so
+a re-upload of the same CV during onboarding returns without a Gemini
+call. The prompt version is derived from the prompt text and model name,
+so changing either invalidates old entries. The configured model client is
+created once and reused.
+"""
+import os
+import json
+import hashlib
+import threading
+
+import google.generativeai as genai
+
+from utils.json_stream import extract_json
+
+RESUME_MODEL = os.getenv("RESUME_MODEL", "gemini-2.5-flash")
+RESUME_MAX_BYTES = int(os.getenv("RESUME_MAX_BYTES", str(10 * 1024 * 1024)))
+READ_CHUNK = 64 * 1024
+
+RESUME_PROMPT = """
+Extract the resume information from this document into the following JSON structure:
+{
+    "personalInfo": {
+        "name": "Full Name",
+        "title": "Current Job Title",
+        "address": "Location/City",
+        "phone": "Phone Number",
+        "email": "Email Address"
+    },
+    "summary": "Professional summary text",
+    "skills": [
+        { "category": "Category Name (e.g. Languages)", "items": ["Skill1", "Skill2"] }
+    ],
+    "experience": [
+        {
+            "company": "Company Name",
+            "location": "Location",
+            "role": "Job Title",
+            "dates": "Date Range",
+            "bullets": ["Achievement 1", "Achievement 2"]
+        }
+    ],
+    "education": [
+        {
+            "degree": "Degree Name",
+            "institution": "University Name",
+            "location": "Location",
+            "dates": "Date Range",
+            "details": ["Honors", "GPA"]
+        }
+    ]
+}
+Return ONLY valid JSON.
+"""
+
+PROMPT_VERSION = hashlib.blake2b(f"{RESUME_MODEL}\0{RESUME_PROMPT}".encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ResumeError(Exception):
+    """The resume can't be parsed: missing API key, upload too large, or a reply that isn't JSON."""
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+
+def read_upload(stream, max_bytes=RESUME_MAX_BYTES):
+    """Reads an upload stream in chunks, hashing as it goes. Returns (data, sha256 hex)."""
+    digest = hashlib.sha256()
+    chunks, size = [], 0
+    while True:
+        chunk = stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise ResumeError(f"File too large (max {max_bytes // (1024 * 1024)} MB)", status=413)
+        digest.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks), digest.hexdigest()
+
+
+_model = None
+_model_key = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """The shared Gemini model client, configured on first use (and again if the key changes)."""
+    global _model, _model_key
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ResumeError("Missing GEMINI_API_KEY")
+    with _model_lock:
+        if _model is None or _model_key != api_key:
+            genai.configure(api_key=api_key)
+            _model = genai.GenerativeModel(RESUME_MODEL)
+            _model_key = api_key
+        return _model
+
+
+def extract_resume(data, mime_type):
+    """Sends the document to Gemini and returns the parsed profile dict."""
+    response = get_model().generate_content([{"mime_type": mime_type, "data": data}, RESUME_PROMPT])
+    cleaned = response.text.replace("```json", "").replace("```", "").strip()
+    try:
+        return json.loads(cleaned)
+    except ValueError:
+        profile = extract_json(cleaned)
+        if not isinstance(profile, dict):
+            raise ResumeError("Model reply was not valid JSON", status=502)
+        return profile
+
+
+def parse_resume(db, data, content_hash, mime_type):
+    """
+    Returns (profile, cached). Served from the resume cache when this exact
+    file was parsed before with the current prompt version.
+    """
+    cached = db.get_cached_resume(content_hash, PROMPT_VERSION)
+    if cached is not None:
+        return cached, True
+    profile = extract_resume(data, mime_type)
+    db.save_cached_resume(content_hash, PROMPT_VERSION, profile)
+    return profile, False
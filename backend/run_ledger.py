@@ -0,0 +1,99 @@
+"""
+Per-step record of surfing runs, for finding where a slow task spends its time.
+
+Every run gets a row in `runs` and every observe / ask / act cycle a row in
+`run_steps`: URL, DOM fingerprint, prompt size, the brain's plan, the
+actions run, the outcome and the time spent in capture, brain and execute.
+Records are buffered in memory and written by a background thread in one
+transaction per batch, so the surf loop never waits on a commit.
+"""
+import os
+import uuid
+import time
+import threading
+
+RUN_LEDGER = os.getenv("RUN_LEDGER", "true").lower() == "true"
+RUN_LEDGER_FLUSH_INTERVAL = float(os.getenv("RUN_LEDGER_FLUSH_INTERVAL", "1.0"))  # seconds
+RUN_LEDGER_BATCH_SIZE = int(os.getenv("RUN_LEDGER_BATCH_SIZE", "100"))  # records that trigger an early flush
+RUN_LEDGER_MAX_RUNS = int(os.getenv("RUN_LEDGER_MAX_RUNS", "1000"))  # older runs and their steps are pruned
+
+# Step outcomes that count as a success
+SUCCESS_OUTCOMES = ("ok", "done")
+
+
+class RunLedger:
+    """Buffers run and step records and writes them to SQLite in batches."""
+    def __init__(self, db, flush_interval=RUN_LEDGER_FLUSH_INTERVAL, batch_size=RUN_LEDGER_BATCH_SIZE,
+                 max_runs=RUN_LEDGER_MAX_RUNS, enabled=RUN_LEDGER):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_runs = max_runs
+        self.enabled = enabled
+        self._buffer = []  # (kind, record) in the order they happened
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start_run(self, agent_id, task):
+        """Records the start of a run and returns its id."""
+        run_id = uuid.uuid4().hex
+        self._add("run", {"id": run_id, "agent_id": agent_id, "task": task, "started_at": time.time()})
+        return run_id
+
+    def record_step(self, run_id, step, outcome):
+        """
+        Records one observe / ask / act cycle. `step` holds step, url,
+        fingerprint, prompt_chars, cached, plan, actions and capture_ms /
+        brain_ms / execute_ms.
+        """
+        self._add("step", {**step, "run_id": run_id, "outcome": outcome,
+                           "success": outcome in SUCCESS_OUTCOMES, "created_at": time.time()})
+
+    def finish_run(self, run_id, status, actions, decisions, last_plan=None):
+        self._add("finish", {"id": run_id, "status": status, "actions": actions, "decisions": decisions,
+                             "last_plan": last_plan, "finished_at": time.time()})
+
+    def _add(self, kind, record):
+        if not self.enabled:
+            return
+        self._ensure_started()
+        with self._lock:
+            self._buffer.append((kind, record))
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def _ensure_started(self):
+        if self._thread:
+            return
+        with self._lock:
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name="run-ledger", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Writes everything buffered so far."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        try:
+            self.db.write_run_ledger(batch, max_runs=self.max_runs)
+        except Exception as e:
+            print(f"[!] Run ledger write failed ({len(batch)} records dropped): {e}")
+
+    def close(self):
+        """Stops the writer and flushes what is left."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.flush()
@@ -0,0 +1,76 @@
+"""
+Screenshot pipeline - turns full-resolution PNG captures into small frames.
+
+Frames are downsized and re-encoded (JPEG or WebP), and a capture whose
+content matches the previous one is skipped before it is even decoded.
+The latest frame is served as binary from /screenshot with an ETag, so
+screenshots never ride along in the JSON state payloads.
+"""
+import io
+import os
+import hashlib
+import threading
+from PIL import Image
+
+SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "JPEG").upper()
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", "60"))
+SCREENSHOT_MAX_WIDTH = int(os.getenv("SCREENSHOT_MAX_WIDTH", "960"))
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+class ScreenshotPipeline:
+    """Downsizes, re-encodes and de-duplicates screenshots for one browser."""
+    def __init__(self, fmt=SCREENSHOT_FORMAT, quality=SCREENSHOT_QUALITY, max_width=SCREENSHOT_MAX_WIDTH):
+        if fmt not in MIME_TYPES:
+            raise ValueError(f"Unsupported screenshot format: {fmt}")
+        self.format = fmt
+        self.quality = quality
+        self.max_width = max_width
+        self._last_hash = None
+
+    def process(self, png_bytes):
+        """
+        Returns a frame dict {"data", "mime_type", "etag", "size"}, or None
+        when the capture is identical to the previous one.
+        """
+        digest = hashlib.blake2b(png_bytes, digest_size=16).hexdigest()
+        if digest == self._last_hash:
+            return None
+        self._last_hash = digest
+
+        image = Image.open(io.BytesIO(png_bytes))
+        if image.width > self.max_width:
+            height = round(image.height * self.max_width / image.width)
+            image = image.resize((self.max_width, height), Image.BILINEAR)
+        if self.format == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+
+        out = io.BytesIO()
+        image.save(out, format=self.format, quality=self.quality)
+        data = out.getvalue()
+        return {
+            "data": data,
+            "mime_type": MIME_TYPES[self.format],
+            "etag": digest,
+            "size": image.size
+        }
+
+    def reset(self):
+        """Forgets the previous frame so the next capture is always emitted."""
+        self._last_hash = None
+
+
+class LatestFrame:
+    """Thread-safe holder for the most recent frame served by /screenshot."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+
+    def update(self, frame):
+        with self._lock:
+            self._frame = frame
+
+    def get(self):
+        with self._lock:
+            return self._frame
@@ -0,0 +1,160 @@
+"""
+State channel for running the API and the agents as separate processes.
+
+With XAPPLY_ROLE=all (the default) the Flask threads share one interpreter
+with the agents. Every request then competes for the GIL with Selenium
+calls, screenshot encoding and prompt building, so API latency follows
+whatever the agents are doing. With XAPPLY_ROLE=worker the agents run on
+their own, and the API (XAPPLY_ROLE=api, see api.py) can run as several
+processes. The two sides only talk through SQLite (WAL, so readers never
+wait on the writer):
+
+* the worker's StateMirror writes StateStream events, log events, a state
+  snapshot and the latest screenshot frame, batched into one transaction
+  per STATE_MIRROR_INTERVAL;
+* the API reads them back through RemoteState, which offers the same
+  snapshot / seq / frames_since / since calls as ObservableState,
+  StateStream and EventLog;
+* /control and resume uploads become rows in control_commands. The mirror
+  thread picks those up and applies them in the worker.
+"""
+import os
+import time
+import queue
+import threading
+
+from event_log import LOG_RING_SIZE
+
+STATE_MIRROR_INTERVAL = float(os.getenv("STATE_MIRROR_INTERVAL", "0.1"))  # seconds
+STATE_POLL_INTERVAL = float(os.getenv("STATE_POLL_INTERVAL", "0.25"))  # seconds, per /state/stream client
+STATE_CHANNEL_HISTORY = int(os.getenv("STATE_CHANNEL_HISTORY", "500"))  # events kept for reconnecting clients
+STATE_STATS_INTERVAL = float(os.getenv("STATE_STATS_INTERVAL", "5"))  # seconds between worker stats/metrics updates
+
+
+class StateMirror:
+    """Worker side: writes local state out to SQLite and applies commands sent by the API."""
+    def __init__(self, db, stream, state, latest_frame, on_command, stats=None,
+                 interval=STATE_MIRROR_INTERVAL, history=STATE_CHANNEL_HISTORY, stats_interval=STATE_STATS_INTERVAL):
+        self.db = db
+        self.stream = stream
+        self.state = state
+        self.latest_frame = latest_frame
+        self.on_command = on_command  # on_command({"command": ..., **payload})
+        self.stats = stats  # stats() -> dict published with the snapshot, at most every stats_interval
+        self.interval = interval
+        self.history = history
+        self.stats_interval = stats_interval
+        self._stats_at = 0.0
+        self._events = queue.SimpleQueue()
+        self._log_seq = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.db.reset_state_channel()
+        self.stream.listeners.append(self._on_event)
+        self._flush(force=True)
+        self._thread = threading.Thread(target=self._run, name="state-mirror", daemon=True)
+        self._thread.start()
+
+    def _on_event(self, seq, kind, frame):
+        # Called under the stream lock - only hand the event over
+        self._events.put((seq, kind, frame))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._flush()
+                for command in self.db.take_control_commands():
+                    self._apply(command)
+            except Exception as e:
+                print(f"[!] State mirror error: {e}")
+
+    def _apply(self, command):
+        try:
+            self.on_command(command)
+        except Exception as e:
+            print(f"[!] Control command {command.get('command')!r} failed: {e}")
+
+    def _flush(self, force=False):
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                break
+        now = time.monotonic()
+        stats = None
+        if self.stats and (force or now - self._stats_at >= self.stats_interval):
+            stats, self._stats_at = self.stats(), now
+        if not events and not force and stats is None:
+            return
+        # Taken after draining, so the snapshot covers at least every event written with it
+        seq, state = self.state.snapshot()
+        frame = None
+        if force or any(kind == "screenshot" for _, kind, _ in events):
+            frame = self.latest_frame.get()
+        logs, self._log_seq, _ = self.state.events.since(self._log_seq)
+        self.db.publish_state(events, seq, state, stats=stats, frame=frame, keep=self.history,
+                              logs=logs, keep_logs=LOG_RING_SIZE)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._on_event in self.stream.listeners:
+            self.stream.listeners.remove(self._on_event)
+        try:
+            self._flush()
+        except Exception as e:
+            print(f"[!] State mirror error: {e}")
+
+
+class RemoteState:
+    """API side: reads the state a worker's StateMirror publishes, and queues commands for it."""
+    def __init__(self, db, initial_state, poll_interval=STATE_POLL_INTERVAL):
+        self.db = db
+        self.initial_state = initial_state  # Served until a worker has published anything
+        self.poll_interval = poll_interval
+
+    @property
+    def seq(self):
+        return self.db.get_state_seq()
+
+    def snapshot(self):
+        """Returns (seq, state) as last published by the worker."""
+        published = self.db.get_state_snapshot()
+        if not published:
+            return 0, self.initial_state
+        seq, state, _ = published
+        return seq, state
+
+    def stats(self):
+        published = self.db.get_state_snapshot()
+        return published[2] if published else {}
+
+    def get_frame(self):
+        return self.db.get_state_frame()
+
+    def frames_since(self, seq, timeout=15.0):
+        """Same contract as StateStream.frames_since, polling the events table."""
+        deadline = time.monotonic() + timeout
+        while True:
+            events, oldest = self.db.get_state_events(seq)
+            if events:
+                return [frame for _, frame in events], events[-1][0], oldest > seq + 1
+            if self.seq < seq:
+                # The worker restarted and its sequence began again - resync
+                return [], seq, True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return [], seq, False
+            time.sleep(min(self.poll_interval, remaining))
+
+    def since(self, seq=0, agent_id=None, limit=None):
+        """Log events, with the same contract as EventLog.since."""
+        return self.db.get_log_events(seq, agent_id=agent_id, limit=limit or LOG_RING_SIZE)
+
+    def send_command(self, command, **payload):
+        """Queues a command for the worker; it is applied within STATE_MIRROR_INTERVAL."""
+        return self.db.add_control_command(command, payload)
@@ -0,0 +1,122 @@
+"""
+Push channel for agent state - feeds the /state/stream Server-Sent Events endpoint.
+
+Every change to agent_state becomes a small sequenced event (a new log line,
+a status change, a "new screenshot" notice carrying the frame's ETag).
+Each event is serialised once and the same frame is written to every
+connected dashboard, so watchers don't multiply the serialisation cost.
+"""
+import json
+import threading
+from collections import deque
+from itertools import islice
+
+from event_log import EventLog, format_event
+
+# agent_state keys that are pushed as "status" deltas
+STATUS_KEYS = ("active", "status", "current_task")
+
+
+class StateStream:
+    """Bounded, sequenced history of SSE frames with blocking reads."""
+    def __init__(self, history=500):
+        self._events = deque(maxlen=history)
+        self.lock = threading.RLock()
+        self._cond = threading.Condition(self.lock)
+        self.seq = 0
+        self.listeners = []  # listener(seq, kind, frame) for every event, called under the lock
+
+    def publish(self, kind, data):
+        """Appends an event and wakes every waiting subscriber. Returns its sequence number."""
+        with self._cond:
+            self.seq += 1
+            frame = format_frame(self.seq, kind, data)
+            self._events.append((self.seq, frame))
+            for listener in self.listeners:
+                listener(self.seq, kind, frame)
+            self._cond.notify_all()
+            return self.seq
+
+    def frames_since(self, seq, timeout=15.0):
+        """
+        Blocks until there are events newer than `seq` (or timeout).
+        Returns (frames, last_seq, missed); `missed` is True when events the
+        caller never saw have already fallen out of the history.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > seq, timeout)
+            if self.seq <= seq:
+                return [], seq, False
+            oldest = self._events[0][0]
+            missed = oldest > seq + 1
+            start = max(0, seq + 1 - oldest)
+            frames = [frame for _, frame in islice(self._events, start, None)]
+            return frames, self.seq, missed
+
+
+class ObservableState(dict):
+    """
+    agent_state that publishes deltas to a StateStream as it is mutated,
+    so existing `agent_state["status"] = ...` assignments stay as they are.
+    Log lines live in an EventLog rather than in the dict.
+    """
+    def __init__(self, stream, *args, events=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stream = stream
+        self.events = events or EventLog()
+
+    def __setitem__(self, key, value):
+        with self.stream.lock:
+            changed = self.get(key) != value
+            super().__setitem__(key, value)
+            if not changed:
+                return
+            if key in STATUS_KEYS:
+                self.stream.publish("status", {key: value})
+            elif key == "latest_screenshot" and value:
+                self.stream.publish("screenshot", {"etag": value})
+
+    def log(self, message, level="info", agent_id=None):
+        """Records a log event and publishes it as a single delta. Returns the event."""
+        with self.stream.lock:
+            event = self.events.append(message, level=level, agent_id=agent_id)
+            self.stream.publish("log", {"entry": format_event(event), **event})
+            return event
+
+    def update_agent(self, agent_id, **fields):
+        """Updates one agent's status/task/active flag and publishes the changed fields."""
+        with self.stream.lock:
+            agent = self._agent(agent_id)
+            changed = {k: v for k, v in fields.items() if agent.get(k) != v}
+            if not changed:
+                return
+            agent.update(changed)
+            self.stream.publish("agent", {"id": agent_id, **changed})
+
+    def agent_active(self, agent_id):
+        """False once the agent has been sent a per-agent stop."""
+        with self.stream.lock:
+            return self.get("agents", {}).get(agent_id, {}).get("active", True)
+
+    def _agent(self, agent_id):
+        agents = self.setdefault("agents", {})
+        if agent_id not in agents:
+            agents[agent_id] = {"active": True, "status": "Idle", "current_task": None}
+        return agents[agent_id]
+
+    def snapshot(self):
+        """Returns (seq, state) atomically."""
+        with self.stream.lock:
+            state = {key: self.get(key) for key in STATUS_KEYS}
+            state["logs"] = [format_event(event) for event in self.events.tail()]
+            state["log_seq"] = self.events.seq
+            state["latest_screenshot"] = self.get("latest_screenshot")
+            state["agents"] = {
+                agent_id: {**agent, "logs": [format_event(event) for event in self.events.tail(agent_id=agent_id)]}
+                for agent_id, agent in self.get("agents", {}).items()
+            }
+            return self.stream.seq, state
+
+
+def format_frame(seq, kind, data):
+    return f"id: {seq}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
@@ -3,19 +3,112 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time
 import base64
+import time
 
 import os
+from concurrent.futures import ThreadPoolExecutor
+from screenshots import ScreenshotPipeline
+from utils.page_waits import wait_for_page_settled, ACTION_SETTLE_TIMEOUT
+from metrics import Counter, Histogram
+
+SURFER_SECONDS = Histogram("xapply_surfer_seconds", "Time spent in JobSurfer calls", ("op",))
+SURFER_ACTIONS = Counter("xapply_surfer_actions", "Actions executed by JobSurfer", ("type", "result"))
+
+# Plan-step preconditions, checked in one round trip. Returns a reason string if unmet, else null.
+PRECONDITION_SCRIPT = """
+    const [action, expect] = arguments;
+    if (expect.url_contains && !location.href.includes(expect.url_contains))
+        return 'url does not contain ' + expect.url_contains;
+    if (expect.text && !(document.body.innerText || '').includes(expect.text))
+        return 'page text lacks ' + JSON.stringify(expect.text);
+    if (expect.selector && !document.querySelector(expect.selector))
+        return 'no element matches ' + expect.selector;
+    if (action.type === 'click' || action.type === 'type') {
+        const el = document.querySelector(action.selector);
+        if (!el) return 'no element matches ' + action.selector;
+        if (el.disabled) return action.selector + ' is disabled';
+        if (el.offsetParent === null && getComputedStyle(el).position !== 'fixed') return action.selector + ' is hidden';
+        if (action.type === 'type' && !(el.matches('input, textarea, [contenteditable=""], [contenteditable="true"]')))
+            return action.selector + ' is not a text field';
+    }
+    return null;
+"""
 
 PROFILE_DIR = os.path.join(os.path.dirname(__file__), "data", "profiles")
+SCREENSHOT_VIA_CDP = os.getenv("SCREENSHOT_VIA_CDP", "true").lower() == "true"
+
+# One round trip per observation: text, interactive elements, URL and a DOM fingerprint
+OBSERVE_SCRIPT = """
+    function observe() {
+        const elements = [];
+        const allInteractive = document.querySelectorAll('a, button, input, textarea, select, [role="button"], [onclick]');
+    
+        allInteractive.forEach((el, i) => {
+            // Skip hidden elements
+            if (el.offsetParent === null && el.tagName !== 'INPUT') return;
+        
+            const tag = el.tagName.toLowerCase();
+            const id = el.id ? '#' + el.id : null;
+            const name = el.name ? tag + '[name="' + el.name + '"]' : null;
+            const text = (el.innerText || el.value || el.placeholder || el.ariaLabel || '').trim().substring(0, 40);
+            const href = el.href || null;
+            const type = el.type || null;
+        
+            // Build best selector
+            let selector = id || name || null;
+            if (!selector && el.className) {
+                const classes = el.className.split(' ').filter(c => c && !c.includes(':'));
+                if (classes.length > 0) {
+                    selector = tag + '.' + classes[0];
+                }
+            }
+            if (!selector) {
+                // Use nth-of-type as fallback
+                const siblings = el.parentElement ? el.parentElement.querySelectorAll(tag) : [];
+                const index = Array.from(siblings).indexOf(el) + 1;
+                selector = tag + ':nth-of-type(' + index + ')';
+            }
+        
+            elements.push({ 
+                index: elements.length + 1,
+                tag, 
+                selector, 
+                text: text || '[no text]',
+                type,
+                href: href ? href.substring(0, 60) : null
+            });
+        });
+        return elements.slice(0, 25); // Limit to 25 most relevant
+    }
+
+    // FNV-1a over page text + elements - changes whenever the visible page does
+    function fingerprint(str) {
+        let h = 0x811c9dc5;
+        for (let i = 0; i < str.length; i++) {
+            h ^= str.charCodeAt(i);
+            h = Math.imul(h, 0x01000193);
+        }
+        return (h >>> 0).toString(16);
+    }
+
+    const text = document.body ? document.body.innerText : '';
+    const elements = observe();
+    return {
+        url: location.href,
+        text: text.substring(0, 3000), // Reduced to make room for elements
+        elements: elements,
+        fingerprint: fingerprint(text + JSON.stringify(elements))
+    };
+"""
+
 
 class JobSurfer:
-    def __init__(self, headless=False, start_url="https://testdevjobs.com/"):
+    def __init__(self, headless=False, start_url="https://testdevjobs.com/", profile_name="surfer"):
         print("[*] Initializing JobSurfer Body...")
         
-        # Use persistent profile to save login sessions
-        surfer_profile_dir = os.path.join(PROFILE_DIR, "surfer")
+        # Use persistent profile to save login sessions (one per concurrent browser)
+        surfer_profile_dir = os.path.join(PROFILE_DIR, profile_name)
         
         # Auto-manage profile compatibility
         from utils.profile_manager import ensure_profile_compatibility
@@ -27,83 +120,92 @@ class JobSurfer:
             options.add_argument('--headless')
         self.driver = uc.Chrome(options=options)
         self.driver.set_window_size(1280, 900)
+        self.screenshots = ScreenshotPipeline()
+        self.navigations = 0  # Used by BrowserPool to recycle long-lived instances
+        self._screenshot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screenshot")
+        self.last_timings = {}
         
         # Navigate to start URL immediately
         if start_url:
             print(f"[*] Starting at {start_url}")
             self.driver.get(start_url)
-            time.sleep(2)
+            wait_for_page_settled(self.driver)
 
     def navigate(self, url):
         print(f"[*] Navigating to {url}")
+        self.navigations += 1
         self.driver.get(url)
-        time.sleep(3) # Wait for load
+        wait_for_page_settled(self.driver)
 
-    def capture_state(self):
+    @SURFER_SECONDS.timed(op="capture_state")
+    def capture_state(self, screenshot=True):
         """
         Returns the current visual and structural state of the page.
+        Text, elements, URL and a DOM fingerprint come back from a single
+        execute_script call while the screenshot is taken concurrently.
+        "screenshot" is a compact frame dict, or None if the page looks unchanged.
+        "timings" holds per-call milliseconds.
         """
-        # 1. Take Screenshot (Vision)
-        screenshot_b64 = self.driver.get_screenshot_as_base64()
+        start = time.perf_counter()
         
-        # 2. Extract Text/DOM (Reading)
-        clean_text = self.driver.execute_script("""
-            return document.body.innerText;
-        """)
+        # 1. Take Screenshot (Vision) - in parallel with the DOM read
+        shot = self._screenshot_executor.submit(self._grab_screenshot) if screenshot else None
         
-        # 3. Extract interactive elements with selectors
-        interactive_elements = self.driver.execute_script("""
-            const elements = [];
-            const allInteractive = document.querySelectorAll('a, button, input, textarea, select, [role="button"], [onclick]');
-            
-            allInteractive.forEach((el, i) => {
-                // Skip hidden elements
-                if (el.offsetParent === null && el.tagName !== 'INPUT') return;
-                
-                const tag = el.tagName.toLowerCase();
-                const id = el.id ? '#' + el.id : null;
-                const name = el.name ? tag + '[name="' + el.name + '"]' : null;
-                const text = (el.innerText || el.value || el.placeholder || el.ariaLabel || '').trim().substring(0, 40);
-                const href = el.href || null;
-                const type = el.type || null;
-                
-                // Build best selector
-                let selector = id || name || null;
-                if (!selector && el.className) {
-                    const classes = el.className.split(' ').filter(c => c && !c.includes(':'));
-                    if (classes.length > 0) {
-                        selector = tag + '.' + classes[0];
-                    }
-                }
-                if (!selector) {
-                    // Use nth-of-type as fallback
-                    const siblings = el.parentElement ? el.parentElement.querySelectorAll(tag) : [];
-                    const index = Array.from(siblings).indexOf(el) + 1;
-                    selector = tag + ':nth-of-type(' + index + ')';
-                }
-                
-                elements.push({ 
-                    index: elements.length + 1,
-                    tag, 
-                    selector, 
-                    text: text || '[no text]',
-                    type,
-                    href: href ? href.substring(0, 60) : null
-                });
-            });
-            
-            return elements.slice(0, 25); // Limit to 25 most relevant
-        """)
+        # 2. Extract Text/DOM + interactive elements (Reading)
+        script_start = time.perf_counter()
+        page = self.driver.execute_script(OBSERVE_SCRIPT)
+        script_ms = (time.perf_counter() - script_start) * 1000
         
-        url = self.driver.current_url
+        # 3. Downsize, re-encode, skip if unchanged
+        frame, screenshot_ms = None, 0.0
+        if shot:
+            png, screenshot_ms = shot.result()
+            frame = self.screenshots.process(png)
+        
+        timings = {
+            "script_ms": round(script_ms, 1),
+            "screenshot_ms": round(screenshot_ms, 1),
+            "total_ms": round((time.perf_counter() - start) * 1000, 1)
+        }
+        self.last_timings = timings
         
         return {
-            "url": url,
-            "screenshot": screenshot_b64,
-            "text_content": clean_text[:3000], # Reduced to make room for elements
-            "interactive_elements": interactive_elements
+            "url": page["url"],
+            "screenshot": frame,
+            "text_content": page["text"],
+            "interactive_elements": page["elements"],
+            "fingerprint": page["fingerprint"],
+            "timings": timings
         }
 
+    @SURFER_SECONDS.timed(op="screenshot")
+    def _grab_screenshot(self):
+        """Returns (png_bytes, ms). Uses CDP Page.captureScreenshot when enabled, else WebDriver."""
+        start = time.perf_counter()
+        png = None
+        if SCREENSHOT_VIA_CDP:
+            try:
+                result = self.driver.execute_cdp_cmd("Page.captureScreenshot", {"format": "png"})
+                png = base64.b64decode(result["data"])
+            except Exception:
+                png = None  # CDP unavailable - fall back to WebDriver
+        if png is None:
+            png = self.driver.get_screenshot_as_png()
+        return png, (time.perf_counter() - start) * 1000
+
+    @SURFER_SECONDS.timed(op="check_preconditions")
+    def check_preconditions(self, action):
+        """
+        Checks that a plan step can run on the current page: its "expect" block
+        plus, for click/type, that the target exists and is usable.
+        Returns None if it can, else the reason it can't.
+        """
+        try:
+            return self.driver.execute_script(PRECONDITION_SCRIPT, action, action.get("expect") or {})
+        except Exception as e:
+            return f"precondition check failed: {e}"
+
+    @SURFER_SECONDS.timed(op="execute_action")
     def execute_action(self, action):
         """
         Executes a human-like action dictated by the agent.
@@ -113,11 +215,13 @@ class JobSurfer:
             if action["type"] == "navigate":
                 url = action.get("url", "")
                 print(f"[*] Navigating to {url}")
+                self.navigations += 1
                 self.driver.get(url)
-                time.sleep(3)  # Wait for page load
+                wait_for_page_settled(self.driver)
                 
             elif action["type"] == "click":
                 print(f"[*] Clicking {action.get('selector')}")
+                self.navigations += 1  # Clicks usually navigate
                 el = WebDriverWait(self.driver, 5).until(
                     EC.element_to_be_clickable((By.CSS_SELECTOR, action["selector"]))
                 )
@@ -131,12 +235,17 @@ class JobSurfer:
                 
             elif action["type"] == "scroll":
                 self.driver.execute_script("window.scrollBy(0, 500);")
-                
-            time.sleep(1) # Human pause
+            
+            # Wait for whatever the action triggered (navigation, re-render) to settle
+            if action["type"] != "navigate":
+                wait_for_page_settled(self.driver, timeout=ACTION_SETTLE_TIMEOUT)
+            SURFER_ACTIONS.inc(type=action["type"], result="ok")
             return True
         except Exception as e:
             print(f"[!] Action failed: {e}")
+            SURFER_ACTIONS.inc(type=action.get("type"), result="failed")
             return False
 
     def close(self):
+        self._screenshot_executor.shutdown(wait=False)
         self.driver.quit()
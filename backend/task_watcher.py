@@ -0,0 +1,83 @@
+"""
+Task intake for the orchestrator - wakes run_loop as soon as an agent's
+*_input.txt changes, instead of re-listing the agents directory every few
+seconds. Uses watchdog file events when available and falls back to a
+slow poll otherwise (the poll also covers any event watchdog misses).
+"""
+import os
+import threading
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # watchdog missing - polling only
+    Observer = None
+    FileSystemEventHandler = object
+
+TASK_POLL_INTERVAL = float(os.getenv("TASK_POLL_INTERVAL", "5"))
+INPUT_SUFFIX = "_input.txt"
+
+
+class _InputFileHandler(FileSystemEventHandler):
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        paths = (event.src_path, getattr(event, "dest_path", "") or "")
+        if any(str(path).endswith(INPUT_SUFFIX) for path in paths):
+            self.callback()
+
+
+class TaskWatcher:
+    """Signals run_loop when there may be new work to dispatch."""
+    def __init__(self, poll_interval=TASK_POLL_INTERVAL, use_events=True):
+        self.poll_interval = poll_interval
+        self.use_events = use_events
+        self._wakeup = threading.Event()
+        self._observer = None
+
+    @property
+    def event_driven(self):
+        return self._observer is not None
+
+    def start(self, directory):
+        """Starts watching `directory`. Falls back to polling if watchdog can't be used."""
+        if self._observer or not self.use_events or Observer is None:
+            return
+        try:
+            observer = Observer()
+            observer.schedule(_InputFileHandler(self._wakeup.set), directory, recursive=False)
+            observer.daemon = True
+            observer.start()
+            self._observer = observer
+        except Exception as e:
+            print(f"[!] File watcher unavailable, polling every {self.poll_interval}s: {e}")
+
+    def clear(self):
+        """
+        Starts a dispatch cycle: call before scanning for work, then wait().
+        A signal that arrives during the scan stays set, so the next wait()
+        returns straight away instead of sitting out the poll interval.
+        """
+        self._wakeup.clear()
+
+    def wait(self, timeout=None):
+        """
+        Blocks until a change is signalled (since the last clear()) or the poll
+        interval elapses. Returns True if woken by a signal rather than the
+        fallback timeout.
+        """
+        return self._wakeup.wait(self.poll_interval if timeout is None else timeout)
+
+    def notify(self):
+        """Wakes run_loop immediately (e.g. after /control start)."""
+        self._wakeup.set()
+
+    def stop(self):
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=2)
+            self._observer = None
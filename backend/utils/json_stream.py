@@ -0,0 +1,86 @@
+"""
+Incremental extraction of JSON values from LLM output.
+
+Replies mix JSON with prose and code fences and may arrive in pieces.
+JsonScanner tracks bracket depth outside of strings as text is fed in, so
+nested objects, arrays and braces inside strings are handled - unlike the
+old `\\{[^{}]*\\}` regexes - and each chunk costs only its own length.
+"""
+import json
+
+OPENERS = {"{": "}", "[": "]"}
+
+
+def _wanted(value):
+    # A bare list of numbers/strings is prose like "[1]", not an answer
+    return isinstance(value, dict) or (isinstance(value, list) and value and all(isinstance(v, dict) for v in value))
+
+
+class JsonScanner:
+    """
+    Finds complete top-level JSON objects (or arrays of objects) in text fed
+    in pieces. feed() returns the first one once it is complete.
+    """
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._start = None
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk):
+        """Adds a chunk; returns the next complete value, or None if there isn't one yet."""
+        self.text += chunk
+        return self._scan()
+
+    def _scan(self):
+        while self._pos < len(self.text):
+            ch = self.text[self._pos]
+            self._pos += 1
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch in OPENERS:
+                if self._start is None:
+                    self._start = self._pos - 1
+                self._stack.append(OPENERS[ch])
+            elif self._start is None:
+                continue  # Prose between values - quotes here don't open strings
+            elif ch == '"':
+                self._in_string = True
+            elif self._stack and ch == self._stack[-1]:
+                self._stack.pop()
+                if not self._stack:
+                    start, self._start = self._start, None
+                    try:
+                        value = json.loads(self.text[start:self._pos])
+                    except ValueError:
+                        self._pos = start + 1  # Rescan from just after the bad opener
+                        continue
+                    if _wanted(value):
+                        return value
+            elif ch in "}]":
+                # Mismatched bracket - whatever we were in wasn't JSON
+                self._pos = self._start + 1
+                self._start = None
+                self._stack = []
+        return None
+
+
+def iter_json(text):
+    """Yields every top-level JSON object / array of objects in `text`, in order."""
+    scanner = JsonScanner()
+    value = scanner.feed(text)
+    while value is not None:
+        yield value
+        value = scanner._scan()
+
+
+def extract_json(text):
+    """First JSON object / array of objects in `text`, or None."""
+    return next(iter_json(text), None)
@@ -0,0 +1,119 @@
+"""
+Readiness-based waits for Selenium drivers.
+
+Each wait returns as soon as the page is actually ready and is capped by a
+timeout, replacing fixed time.sleep() calls. They never raise: on timeout
+(or a driver error) they return False and the caller carries on, which is
+what the old fixed sleeps did anyway.
+"""
+import os
+import time
+
+PAGE_LOAD_TIMEOUT = float(os.getenv("PAGE_LOAD_TIMEOUT", "10"))
+ACTION_SETTLE_TIMEOUT = float(os.getenv("ACTION_SETTLE_TIMEOUT", "3"))
+DOM_QUIET_MS = int(os.getenv("DOM_QUIET_MS", "300"))
+NETWORK_IDLE_MS = int(os.getenv("NETWORK_IDLE_MS", "500"))
+POLL_INTERVAL = 0.05
+
+# Resolves once no DOM mutation has been seen for `quietMs`, or at `timeoutMs`.
+_DOM_QUIET_JS = """
+const [quietMs, timeoutMs, done] = arguments;
+const start = performance.now();
+let last = start;
+const observer = new MutationObserver(() => { last = performance.now(); });
+observer.observe(document.documentElement, {subtree: true, childList: true, attributes: true, characterData: true});
+(function check() {
+    const now = performance.now();
+    if (now - last >= quietMs || now - start >= timeoutMs) {
+        observer.disconnect();
+        done(now - last >= quietMs);
+    } else {
+        setTimeout(check, 50);
+    }
+})();
+"""
+
+# Resolves once no resource has finished loading for `idleMs`, or at `timeoutMs`.
+# Resource Timing only reports finished requests, so one still in flight is not
+# seen until it completes. Entries are read through a PerformanceObserver, which
+# gets them even once the buffer behind getEntriesByType (250 by default) is full;
+# the buffer is raised too, for pages that have already filled it.
+_NETWORK_IDLE_JS = """
+const [idleMs, timeoutMs, done] = arguments;
+const start = performance.now();
+let lastEnd = 0;
+const track = entries => { for (const e of entries) lastEnd = Math.max(lastEnd, e.responseEnd); };
+performance.setResourceTimingBufferSize(5000);
+track(performance.getEntriesByType('resource'));
+const observer = new PerformanceObserver(list => track(list.getEntries()));
+observer.observe({type: 'resource'});
+(function check() {
+    const now = performance.now();
+    const idle = now - lastEnd >= idleMs;
+    if (idle || now - start >= timeoutMs) {
+        observer.disconnect();
+        done(idle);
+    } else {
+        setTimeout(check, 50);
+    }
+})();
+"""
+
+
+def wait_for_document_ready(driver, timeout=PAGE_LOAD_TIMEOUT):
+    """Waits for document.readyState == 'complete'."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if driver.execute_script("return document.readyState") == "complete":
+                return True
+        except Exception:
+            pass  # Mid-navigation - the old document is gone
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(POLL_INTERVAL)
+
+
+def wait_for_dom_quiet(driver, quiet_ms=DOM_QUIET_MS, timeout=ACTION_SETTLE_TIMEOUT):
+    """Waits until the DOM has stopped mutating for `quiet_ms` (MutationObserver)."""
+    try:
+        return bool(driver.execute_async_script(_DOM_QUIET_JS, quiet_ms, int(timeout * 1000)))
+    except Exception:
+        return False
+
+
+def wait_for_network_idle(driver, idle_ms=NETWORK_IDLE_MS, timeout=PAGE_LOAD_TIMEOUT):
+    """
+    Waits until no resource has finished loading for `idle_ms` (Resource Timing
+    API, so requests still in flight are only seen once they finish).
+    """
+    try:
+        return bool(driver.execute_async_script(_NETWORK_IDLE_JS, idle_ms, int(timeout * 1000)))
+    except Exception:
+        return False
+
+
+def wait_for_page_settled(driver, timeout=PAGE_LOAD_TIMEOUT, quiet_ms=DOM_QUIET_MS, idle_ms=NETWORK_IDLE_MS):
+    """
+    Document loaded, DOM quiet and network idle - the usual replacement for a
+    post-navigation sleep. If a navigation replaces the document mid-wait
+    (e.g. after a click), waits for the new document too. The whole wait is
+    capped by `timeout`.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not wait_for_document_ready(driver, remaining):
+            return False
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        try:
+            if not driver.execute_async_script(_DOM_QUIET_JS, quiet_ms, int(remaining * 1000)):
+                return False
+        except Exception:
+            continue  # Document was replaced while we watched it
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        return wait_for_network_idle(driver, idle_ms, remaining)
@@ -0,0 +1,123 @@
+"""
+In-page detection of a finished chat reply.
+
+Instead of polling the page from Python (find_elements + .text per match,
+every second), one execute_async_script call installs a MutationObserver
+and resolves when the newest reply has stopped changing for `stable_ms`
+and contains a parseable JSON object - so the answer comes back as soon as
+it is complete, and never half-streamed.
+"""
+import os
+
+REPLY_TIMEOUT = float(os.getenv("BRAIN_REPLY_TIMEOUT", "30"))
+REPLY_STABLE_MS = int(os.getenv("BRAIN_REPLY_STABLE_MS", "400"))
+
+# Shared by both scripts: newest text under `selectors` that isn't stale or part of the prompt
+_CANDIDATE_JS = """
+function candidate(selectors, ignore, prompt) {
+    for (const sel of selectors) {
+        const els = document.querySelectorAll(sel);
+        for (let i = els.length - 1; i >= 0; i--) {
+            const text = (els[i].innerText || '').trim();
+            if (!text || ignore.has(text) || prompt.includes(text)) continue;
+            if (text.length > 10 && text.includes('{')) return text;
+        }
+    }
+    return null;
+}
+"""
+
+_TEXTS_JS = """
+const [selectors] = arguments;
+const texts = [];
+for (const sel of selectors) {
+    document.querySelectorAll(sel).forEach(el => texts.push((el.innerText || '').trim()));
+}
+return texts;
+"""
+
+_WATCH_JS = _CANDIDATE_JS + """
+const [selectors, ignoreList, prompt, stableMs, timeoutMs, done] = arguments;
+const ignore = new Set(ignoreList);
+
+// First complete, parseable top-level {...} in the text, or null
+function firstJson(text) {
+    text = text.replace(/```json/g, '').replace(/```/g, '');
+    for (let start = text.indexOf('{'); start !== -1; start = text.indexOf('{', start + 1)) {
+        let depth = 0, inString = false, escaped = false;
+        for (let i = start; i < text.length; i++) {
+            const ch = text[i];
+            if (inString) {
+                if (escaped) escaped = false;
+                else if (ch === '\\\\') escaped = true;
+                else if (ch === '"') inString = false;
+            } else if (ch === '"') inString = true;
+            else if (ch === '{') depth++;
+            else if (ch === '}' && --depth === 0) {
+                const json = text.slice(start, i + 1);
+                try { JSON.parse(json); return json; } catch (e) { break; }
+            }
+        }
+    }
+    return null;
+}
+
+let last = null, lastChange = performance.now(), timer = null, finished = false;
+const started = performance.now();
+const observer = new MutationObserver(schedule);
+observer.observe(document.body, {subtree: true, childList: true, characterData: true});
+
+function finish(result) {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearTimeout(timer);
+    clearTimeout(deadline);
+    done(result);
+}
+
+function check() {
+    const now = performance.now();
+    const text = candidate(selectors, ignore, prompt);
+    if (text !== last) { last = text; lastChange = now; }
+    if (text && now - lastChange >= stableMs) {
+        const json = firstJson(text);
+        if (json) return finish({text: text, json: json, complete: true, ms: now - started});
+    }
+    schedule();
+}
+
+// Re-check once the page has been quiet for stableMs; every mutation pushes it back
+function schedule() {
+    clearTimeout(timer);
+    timer = setTimeout(check, stableMs);
+}
+
+const deadline = setTimeout(() => finish({text: last, json: last && firstJson(last), complete: false,
+                                          ms: performance.now() - started}), timeoutMs);
+check();
+"""
+
+
+def collect_texts(driver, selectors):
+    """Texts of every element matching `selectors`, in one round trip."""
+    try:
+        return driver.execute_script(_TEXTS_JS, selectors) or []
+    except Exception:
+        return []
+
+
+def wait_for_reply(driver, selectors, ignore_texts=(), prompt="", timeout=REPLY_TIMEOUT, stable_ms=REPLY_STABLE_MS):
+    """
+    Waits in the page for a new reply under `selectors` (skipping `ignore_texts`
+    and anything contained in `prompt`) that is stable and holds a JSON object.
+    Returns {"text", "json", "complete", "ms"}; "complete" is False on timeout,
+    with whatever text was there. Returns None if the script itself failed.
+    """
+    try:
+        driver.set_script_timeout(timeout + 5)
+        return driver.execute_async_script(
+            _WATCH_JS, list(selectors), list(ignore_texts), prompt, stable_ms, int(timeout * 1000)
+        )
+    except Exception:
+        return None
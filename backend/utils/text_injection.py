@@ -0,0 +1,86 @@
+"""
+Bulk text entry for Selenium drivers.
+
+send_keys() dispatches a key event per character, which takes seconds for
+a multi-KB prompt. These helpers put the whole text into a textarea/input
+in one call instead, and verify that it landed:
+
+* native - sets the value through the prototype's native setter (so React
+  and similar frameworks notice) and dispatches input/change events.
+* cdp    - focuses the element and inserts the text with CDP
+  Input.insertText, which the page sees as a single paste-like edit.
+* keys   - plain send_keys(); the slow last resort.
+"""
+import os
+import re
+
+PROMPT_INJECTION = os.getenv("PROMPT_INJECTION", "auto").lower()  # auto, native, cdp or keys
+
+# chromedriver's send_keys can't type characters outside the BMP
+_NON_BMP = re.compile(r"[^\u0000-\uFFFF]")
+
+_NATIVE_SET_JS = """
+const [el, text] = arguments;
+const proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, text);
+el.dispatchEvent(new InputEvent('input', {bubbles: true, inputType: 'insertFromPaste', data: text}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+el.focus();
+"""
+
+_CLEAR_AND_FOCUS_JS = """
+const el = arguments[0];
+el.focus();
+el.select();
+"""
+
+
+def strip_non_bmp(text):
+    return _NON_BMP.sub("", text)
+
+
+def element_value(driver, element):
+    return driver.execute_script("return arguments[0].value;", element)
+
+
+def _matches(value, text):
+    # Textareas normalise line endings
+    return value is not None and value.replace("\r\n", "\n") == text.replace("\r\n", "\n")
+
+
+def _inject_native(driver, element, text):
+    driver.execute_script(_NATIVE_SET_JS, element, text)
+
+
+def _inject_cdp(driver, element, text):
+    # Selecting the old content first makes the insert replace it
+    driver.execute_script(_CLEAR_AND_FOCUS_JS, element)
+    driver.execute_cdp_cmd("Input.insertText", {"text": text})
+
+
+def _inject_keys(driver, element, text):
+    element.clear()
+    element.send_keys(text)
+
+
+INJECTORS = {"native": _inject_native, "cdp": _inject_cdp, "keys": _inject_keys}
+
+
+def inject_text(driver, element, text, method=PROMPT_INJECTION):
+    """
+    Replaces the element's value with `text`. Tries the requested method (for
+    'auto': native, then CDP, then send_keys) and checks the value after each
+    attempt. Returns the name of the method that worked, or None.
+    """
+    methods = ["native", "cdp", "keys"] if method == "auto" else [method]
+    if "keys" not in methods:
+        methods.append("keys")  # Always keep the slow path as the final fallback
+    for name in methods:
+        expected = strip_non_bmp(text) if name == "keys" else text
+        try:
+            INJECTORS[name](driver, element, expected)
+            if _matches(element_value(driver, element), expected):
+                return name
+        except Exception:
+            continue  # e.g. CDP unavailable on this driver
+    return None
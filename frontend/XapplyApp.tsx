@@ -37,6 +37,7 @@ import ResumePaper from './components/ResumePaper';
 import OnboardingWizard from './components/OnboardingWizard';
 import ProfileView from './components/ProfileView';
 import { ResumeData } from './types';
+import { uploadResume } from './uploadResume';
 
 // --- Types & Interfaces ---
 
@@ -225,17 +226,8 @@ const ResumeTailorView = () => {
     if (!file) return;
 
     setIsUploading(true);
-    const formData = new FormData();
-    formData.append('file', file);
-
     try {
-      const res = await fetch('http://127.0.0.1:5000/upload_resume', {
-        method: 'POST',
-        body: formData,
-      });
-      const data = await res.json();
-
-      if (data.error) throw new Error(data.error);
+      const data = await uploadResume(file);
 
       setResume(data);
       alert("Resume parsed successfully!");
@@ -679,21 +671,36 @@ const LiveAgentView = () => {
   const logsEndRef = useRef<HTMLDivElement>(null);
 
   useEffect(() => {
-    const interval = setInterval(async () => {
-      try {
-        const res = await fetch('http://127.0.0.1:5000/state');
-        const data = await res.json();
-        setIsLive(data.active);
-        setAgentStatus(data.status);
-        setLogs(data.logs || []);
-        if (data.latest_screenshot) {
-          setScreenshot(data.latest_screenshot);
-        }
-      } catch (e) {
-        setAgentStatus("Backend Disconnected");
-      }
-    }, 1000);
-    return () => clearInterval(interval);
+    // Server-Sent Events: one snapshot on connect, then only deltas
+    const source = new EventSource('http://127.0.0.1:5000/state/stream');
+
+    // Screenshots are fetched as binary from /screenshot, keyed by ETag
+    const showScreenshot = (etag: string | null) => {
+      if (etag) setScreenshot(`http://127.0.0.1:5000/screenshot?v=${etag}`);
+    };
+
+    source.addEventListener('snapshot', (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      setIsLive(data.active);
+      setAgentStatus(data.status);
+      setLogs(data.logs || []);
+      showScreenshot(data.latest_screenshot);
+    });
+    source.addEventListener('status', (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      if ('active' in data) setIsLive(data.active);
+      if ('status' in data) setAgentStatus(data.status);
+    });
+    source.addEventListener('log', (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      setLogs(prev => [...prev, data.entry].slice(-50));
+    });
+    source.addEventListener('screenshot', (e) => {
+      showScreenshot(JSON.parse((e as MessageEvent).data).etag);
+    });
+    source.onerror = () => setAgentStatus("Backend Disconnected");
+
+    return () => source.close();
   }, []);
 
   useEffect(() => {
@@ -764,7 +771,7 @@ const LiveAgentView = () => {
             </div>
             <div className="flex-1 bg-black relative flex items-center justify-center overflow-hidden">
               {screenshot ? (
-                <img src={`data:image/png;base64,${screenshot}`} alt="Live Agent View" className="w-full h-full object-contain" />
+                <img src={screenshot} alt="Live Agent View" className="w-full h-full object-contain" />
               ) : (
                 <div className="text-gray-600 flex flex-col items-center gap-3">
                   {isLive ? (
@@ -1,6 +1,7 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Upload, User, CheckCircle, ArrowRight, ArrowLeft, Loader2, Mail, Shield, Sparkles } from 'lucide-react';
 import { ResumeData } from '../types';
+import { uploadResume } from '../uploadResume';
 
 interface OnboardingWizardProps {
     onComplete: (data: ResumeData, token: string) => void;
@@ -110,17 +111,10 @@ const OnboardingWizard: React.FC<OnboardingWizardProps> = ({ onComplete }) => {
 
         setIsLoading(true);
         setError('');
-        const formData = new FormData();
-        formData.append('file', file);
-
         try {
-            const res = await fetch('http://127.0.0.1:5000/upload_resume', {
-                method: 'POST',
-                headers: { 'Authorization': `Bearer ${authToken || localStorage.getItem('xapply_token')}` },
-                body: formData,
+            const data = await uploadResume(file, {
+                'Authorization': `Bearer ${authToken || localStorage.getItem('xapply_token')}`
             });
-            const data = await res.json();
-            if (data.error) throw new Error(data.error);
 
             setProfileData(data);
             setStep('review');
@@ -0,0 +1,26 @@
+// Uploads a CV to /upload_resume and resolves with the parsed profile.
+// The backend answers 200 straight away for a file it has parsed before,
+// otherwise 202 with a job id that is polled until the job is done, or
+// rejects once MAX_WAIT_MS has passed (e.g. no worker is draining the queue).
+const API = 'http://127.0.0.1:5000';
+const POLL_MS = 1000;
+const MAX_WAIT_MS = 3 * 60 * 1000;
+
+export async function uploadResume(file: File, headers: Record<string, string> = {}): Promise<any> {
+  const formData = new FormData();
+  formData.append('file', file);
+
+  const res = await fetch(`${API}/upload_resume`, { method: 'POST', headers, body: formData });
+  const data = await res.json();
+  if (data.error) throw new Error(data.error);
+  if (res.status !== 202) return data;
+
+  const deadline = Date.now() + MAX_WAIT_MS;
+  while (Date.now() < deadline) {
+    await new Promise(resolve => setTimeout(resolve, POLL_MS));
+    const job = await (await fetch(`${API}/upload_resume/${data.job_id}`, { headers })).json();
+    if (job.status === 'done') return job.result;
+    if (job.status === 'error' || job.error) throw new Error(job.error || 'Failed to parse resume');
+  }
+  throw new Error(`Resume parsing timed out after ${MAX_WAIT_MS / 1000}s`);
+}